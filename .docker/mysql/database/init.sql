@@ -41,7 +41,7 @@ CREATE TABLE `almacenes` (
 --
 
 INSERT INTO `almacenes` (`id`, `nombre`, `ubicacion`, `capacidad`, `activo`, `created_at`) VALUES
-(1, 'Almacen Principal', 'Calle Principal 123, Centro', 1000, 1, '2025-11-25 00:26:43'),
+(1, 'Almacen Principal', 'Calle Principal 123, Centro', 15000, 1, '2025-11-25 00:26:43'),
 (2, 'Almacen Secundario', 'Av. Comercio 456, Norte', 500, 1, '2025-11-25 00:26:43'),
 (3, 'Almacen Zona Sur', 'Calle Los Olivos 789, Sur', 750, 1, '2025-11-25 00:26:43');
 
@@ -88,6 +88,19 @@ CREATE TABLE `chatbot_messages` (
 
 -- --------------------------------------------------------
 
+--
+-- Estructura de tabla para la tabla `chatbot_summaries`
+--
+
+CREATE TABLE `chatbot_summaries` (
+  `user_id` int NOT NULL,
+  `summary` text NOT NULL,
+  `last_message_id` int NOT NULL DEFAULT '0',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Estructura de tabla para la tabla `clientes`
 --
@@ -583,6 +596,34 @@ INSERT INTO `proveedores` (`id`, `nombre`, `ruc`, `telefono`, `email`, `direccio
 
 -- --------------------------------------------------------
 
+--
+-- Estructura de tabla para la tabla `resumen_diario`
+--
+
+CREATE TABLE `resumen_diario` (
+  `documento` enum('venta','compra') NOT NULL,
+  `fecha` date NOT NULL,
+  `estado` varchar(20) NOT NULL DEFAULT '',
+  `cantidad` int NOT NULL DEFAULT '0',
+  `total` decimal(14,2) NOT NULL DEFAULT '0.00'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Estructura de tabla para la tabla `resumen_mensual`
+--
+
+CREATE TABLE `resumen_mensual` (
+  `documento` enum('venta','compra') NOT NULL,
+  `mes` date NOT NULL,
+  `estado` varchar(20) NOT NULL DEFAULT '',
+  `cantidad` int NOT NULL DEFAULT '0',
+  `total` decimal(14,2) NOT NULL DEFAULT '0.00'
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Estructura de tabla para la tabla `roles`
 --
@@ -606,6 +647,19 @@ INSERT INTO `roles` (`id`, `nombre`, `descripcion`, `created_at`) VALUES
 
 -- --------------------------------------------------------
 
+--
+-- Estructura de tabla para la tabla `stock_almacen`
+--
+
+CREATE TABLE `stock_almacen` (
+  `almacen_id` int NOT NULL,
+  `producto_id` int NOT NULL,
+  `cantidad` int NOT NULL DEFAULT '0',
+  `updated_at` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+
+-- --------------------------------------------------------
+
 --
 -- Estructura de tabla para la tabla `usuarios`
 --
@@ -715,7 +769,14 @@ ALTER TABLE `categorias`
 -- Indices de la tabla `chatbot_messages`
 --
 ALTER TABLE `chatbot_messages`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `idx_chatbot_messages_user` (`user_id`,`id`);
+
+--
+-- Indices de la tabla `chatbot_summaries`
+--
+ALTER TABLE `chatbot_summaries`
+  ADD PRIMARY KEY (`user_id`);
 
 --
 -- Indices de la tabla `clientes`
@@ -740,7 +801,8 @@ ALTER TABLE `compras`
 ALTER TABLE `detalle_compras`
   ADD PRIMARY KEY (`id`),
   ADD KEY `compra_id` (`compra_id`),
-  ADD KEY `producto_id` (`producto_id`);
+  ADD KEY `producto_id` (`producto_id`),
+  ADD KEY `idx_detalle_compras_compra_producto` (`compra_id`,`producto_id`);
 
 --
 -- Indices de la tabla `detalle_ventas`
@@ -748,7 +810,8 @@ ALTER TABLE `detalle_compras`
 ALTER TABLE `detalle_ventas`
   ADD PRIMARY KEY (`id`),
   ADD KEY `venta_id` (`venta_id`),
-  ADD KEY `producto_id` (`producto_id`);
+  ADD KEY `producto_id` (`producto_id`),
+  ADD KEY `idx_detalle_ventas_venta_producto` (`venta_id`,`producto_id`);
 
 --
 -- Indices de la tabla `django_content_type`
@@ -777,7 +840,13 @@ ALTER TABLE `movimientos_inventario`
   ADD PRIMARY KEY (`id`),
   ADD KEY `producto_id` (`producto_id`),
   ADD KEY `almacen_id` (`almacen_id`),
-  ADD KEY `usuario_id` (`usuario_id`);
+  ADD KEY `usuario_id` (`usuario_id`),
+  ADD KEY `idx_movimientos_fecha` (`fecha`),
+  ADD KEY `idx_movimientos_producto_fecha` (`producto_id`,`fecha`),
+  ADD KEY `idx_movimientos_almacen_fecha` (`almacen_id`,`fecha`),
+  ADD KEY `idx_movimientos_usuario_fecha` (`usuario_id`,`fecha`),
+  ADD KEY `idx_movimientos_tipo_fecha` (`tipo_movimiento`,`fecha`),
+  ADD KEY `idx_movimientos_referencia` (`referencia`);
 
 --
 -- Indices de la tabla `productos`
@@ -796,6 +865,18 @@ ALTER TABLE `proveedores`
   ADD PRIMARY KEY (`id`),
   ADD UNIQUE KEY `ruc` (`ruc`);
 
+--
+-- Indices de la tabla `resumen_diario`
+--
+ALTER TABLE `resumen_diario`
+  ADD PRIMARY KEY (`documento`,`fecha`,`estado`);
+
+--
+-- Indices de la tabla `resumen_mensual`
+--
+ALTER TABLE `resumen_mensual`
+  ADD PRIMARY KEY (`documento`,`mes`,`estado`);
+
 --
 -- Indices de la tabla `roles`
 --
@@ -803,6 +884,13 @@ ALTER TABLE `roles`
   ADD PRIMARY KEY (`id`),
   ADD UNIQUE KEY `nombre` (`nombre`);
 
+--
+-- Indices de la tabla `stock_almacen`
+--
+ALTER TABLE `stock_almacen`
+  ADD PRIMARY KEY (`almacen_id`,`producto_id`),
+  ADD KEY `idx_stock_almacen_producto` (`producto_id`);
+
 --
 -- Indices de la tabla `usuarios`
 --
@@ -821,7 +909,8 @@ ALTER TABLE `ventas`
   ADD UNIQUE KEY `numero_factura` (`numero_factura`),
   ADD KEY `cliente_id` (`cliente_id`),
   ADD KEY `usuario_id` (`usuario_id`),
-  ADD KEY `idx_ventas_fecha` (`fecha`);
+  ADD KEY `idx_ventas_fecha` (`fecha`),
+  ADD KEY `idx_ventas_estado_fecha` (`estado`,`fecha`);
 
 --
 -- AUTO_INCREMENT de las tablas volcadas
@@ -0,0 +1,27 @@
+#!/bin/bash
+set -e
+
+## ----------------------------------------------------------------------------
+## Usuario de solo lectura para las consultas SQL generadas por el chatbot
+## Solo SELECT sobre las tablas de negocio (SqlSandbox.ALLOWED_TABLES): no puede
+## leer usuarios, sesiones ni el historial del chat. Corre al final (zz_) porque
+## los permisos por tabla exigen que las tablas ya existan.
+## ----------------------------------------------------------------------------
+
+if [ -z "$MYSQL_READONLY_USER" ]; then
+    echo "MYSQL_READONLY_USER no definido: se omite el usuario de solo lectura"
+    exit 0
+fi
+
+GRANTS=""
+for tabla in almacenes categorias clientes compras detalle_compras detalle_ventas \
+             movimientos_inventario productos proveedores resumen_diario resumen_mensual \
+             roles stock_almacen ventas; do
+    GRANTS="$GRANTS GRANT SELECT ON \`$MYSQL_DATABASE\`.\`$tabla\` TO '$MYSQL_READONLY_USER'@'%';"
+done
+
+mysql -u $MYSQL_ROOT -p"$MYSQL_ROOT_PASSWORD" <<-EOSQL
+    CREATE USER IF NOT EXISTS '$MYSQL_READONLY_USER'@'%' IDENTIFIED BY '$MYSQL_READONLY_PASSWORD';
+    $GRANTS
+    FLUSH PRIVILEGES;
+EOSQL
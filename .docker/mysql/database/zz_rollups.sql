@@ -0,0 +1,120 @@
+-- ----------------------------------------------------------------
+-- Tablas derivadas: resúmenes de ventas/compras y saldos por almacén
+-- Se ejecuta al final (docker-entrypoint-initdb.d corre los scripts en
+-- orden alfabético), después de init.sql y seed_data.sql, para que los
+-- resúmenes y saldos incluyan todos los datos cargados.
+-- ----------------------------------------------------------------
+
+START TRANSACTION;
+
+-- Resúmenes de ventas y compras (mismo cálculo que Rollup.rebuild)
+DELETE FROM `resumen_diario`;
+DELETE FROM `resumen_mensual`;
+
+INSERT INTO `resumen_diario` (`documento`, `fecha`, `estado`, `cantidad`, `total`)
+SELECT 'venta', `fecha`, COALESCE(`estado`, ''), COUNT(*), COALESCE(SUM(`total`), 0) FROM `ventas` GROUP BY `fecha`, COALESCE(`estado`, '')
+UNION ALL
+SELECT 'compra', `fecha`, COALESCE(`estado`, ''), COUNT(*), COALESCE(SUM(`total`), 0) FROM `compras` GROUP BY `fecha`, COALESCE(`estado`, '');
+
+INSERT INTO `resumen_mensual` (`documento`, `mes`, `estado`, `cantidad`, `total`)
+SELECT `documento`, DATE_FORMAT(`fecha`, '%Y-%m-01'), `estado`, SUM(`cantidad`), SUM(`total`)
+FROM `resumen_diario`
+GROUP BY `documento`, DATE_FORMAT(`fecha`, '%Y-%m-01'), `estado`;
+
+-- Saldos por almacén desde el ledger (mismo cálculo que Stock.post_opening_balances
+-- y Stock.rebuild); ventas y compras se imputan al almacén por defecto (primer
+-- almacén activo) y los movimientos que solo documentan una venta o compra no
+-- se cuentan
+SET @almacen_defecto := (SELECT MIN(`id`) FROM `almacenes` WHERE `activo` = 1);
+SET @usuario_saldo := (SELECT MIN(`id`) FROM `usuarios`);
+
+-- Saldo inicial 1: los almacenes que no son el de por defecto no quedan en
+-- negativo por salidas cargadas sin su entrada
+INSERT INTO `movimientos_inventario` (`producto_id`, `almacen_id`, `tipo_movimiento`, `cantidad`, `usuario_id`, `referencia`, `motivo`)
+SELECT b.`producto_id`, b.`almacen_id`, 'ajuste', -b.`cantidad`, @usuario_saldo,
+       'SALDO-INICIAL', 'Saldo inicial: salidas cargadas sin su entrada'
+FROM (
+    SELECT `almacen_id`, `producto_id`, SUM(`delta`) AS `cantidad`
+    FROM (
+        SELECT mi.`almacen_id`, mi.`producto_id`,
+               CASE WHEN mi.`tipo_movimiento` = 'salida' THEN -mi.`cantidad` ELSE mi.`cantidad` END AS `delta`
+        FROM `movimientos_inventario` mi
+        WHERE NOT EXISTS (SELECT 1 FROM `ventas` dv_doc WHERE dv_doc.`numero_factura` = mi.`referencia`)
+          AND NOT EXISTS (SELECT 1 FROM `compras` dc_doc WHERE dc_doc.`numero_factura` = mi.`referencia`)
+        UNION ALL
+        SELECT @almacen_defecto, dv.`producto_id`, -dv.`cantidad`
+        FROM `detalle_ventas` dv
+        INNER JOIN `ventas` v ON dv.`venta_id` = v.`id`
+        WHERE v.`estado` = 'completada'
+        UNION ALL
+        SELECT @almacen_defecto, dc.`producto_id`, dc.`cantidad`
+        FROM `detalle_compras` dc
+        INNER JOIN `compras` c ON dc.`compra_id` = c.`id`
+        WHERE c.`estado` = 'completada'
+    ) ledger
+    GROUP BY `almacen_id`, `producto_id`
+) b
+WHERE b.`cantidad` < 0 AND b.`almacen_id` <> @almacen_defecto;
+
+-- Saldo inicial 2: lo que el stock cargado en productos no explica el ledger
+-- entra como ajuste en el almacén por defecto
+INSERT INTO `movimientos_inventario` (`producto_id`, `almacen_id`, `tipo_movimiento`, `cantidad`, `usuario_id`, `referencia`, `motivo`)
+SELECT p.`id`, @almacen_defecto, 'ajuste', p.`stock_actual` - COALESCE(l.`cantidad`, 0), @usuario_saldo,
+       'SALDO-INICIAL', 'Saldo inicial: stock cargado antes del ledger'
+FROM `productos` p
+LEFT JOIN (
+    SELECT `producto_id`, SUM(`delta`) AS `cantidad`
+    FROM (
+        SELECT mi.`almacen_id`, mi.`producto_id`,
+               CASE WHEN mi.`tipo_movimiento` = 'salida' THEN -mi.`cantidad` ELSE mi.`cantidad` END AS `delta`
+        FROM `movimientos_inventario` mi
+        WHERE NOT EXISTS (SELECT 1 FROM `ventas` dv_doc WHERE dv_doc.`numero_factura` = mi.`referencia`)
+          AND NOT EXISTS (SELECT 1 FROM `compras` dc_doc WHERE dc_doc.`numero_factura` = mi.`referencia`)
+        UNION ALL
+        SELECT @almacen_defecto, dv.`producto_id`, -dv.`cantidad`
+        FROM `detalle_ventas` dv
+        INNER JOIN `ventas` v ON dv.`venta_id` = v.`id`
+        WHERE v.`estado` = 'completada'
+        UNION ALL
+        SELECT @almacen_defecto, dc.`producto_id`, dc.`cantidad`
+        FROM `detalle_compras` dc
+        INNER JOIN `compras` c ON dc.`compra_id` = c.`id`
+        WHERE c.`estado` = 'completada'
+    ) ledger
+    GROUP BY `producto_id`
+) l ON l.`producto_id` = p.`id`
+WHERE p.`stock_actual` <> COALESCE(l.`cantidad`, 0);
+
+-- Saldos desde el ledger, ya con los ajustes de saldo inicial
+DELETE FROM `stock_almacen`;
+
+INSERT INTO `stock_almacen` (`almacen_id`, `producto_id`, `cantidad`)
+SELECT `almacen_id`, `producto_id`, SUM(`delta`)
+FROM (
+    SELECT mi.`almacen_id`, mi.`producto_id`,
+           CASE WHEN mi.`tipo_movimiento` = 'salida' THEN -mi.`cantidad` ELSE mi.`cantidad` END AS `delta`
+    FROM `movimientos_inventario` mi
+    WHERE NOT EXISTS (SELECT 1 FROM `ventas` dv_doc WHERE dv_doc.`numero_factura` = mi.`referencia`)
+      AND NOT EXISTS (SELECT 1 FROM `compras` dc_doc WHERE dc_doc.`numero_factura` = mi.`referencia`)
+    UNION ALL
+    SELECT @almacen_defecto, dv.`producto_id`, -dv.`cantidad`
+    FROM `detalle_ventas` dv
+    INNER JOIN `ventas` v ON dv.`venta_id` = v.`id`
+    WHERE v.`estado` = 'completada'
+    UNION ALL
+    SELECT @almacen_defecto, dc.`producto_id`, dc.`cantidad`
+    FROM `detalle_compras` dc
+    INNER JOIN `compras` c ON dc.`compra_id` = c.`id`
+    WHERE c.`estado` = 'completada'
+) ledger
+GROUP BY `almacen_id`, `producto_id`;
+
+UPDATE `productos` p
+LEFT JOIN (
+    SELECT `producto_id`, SUM(`cantidad`) AS `cantidad`
+    FROM `stock_almacen`
+    GROUP BY `producto_id`
+) s ON s.`producto_id` = p.`id`
+SET p.`stock_actual` = COALESCE(s.`cantidad`, 0);
+
+COMMIT;
@@ -1,8 +1,14 @@
-from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
+from django.http import (
+    HttpResponse,
+    HttpResponseRedirect,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.views.decorators.csrf import csrf_exempt
 from app.models.user import User
 from app.models.chatbot_message import ChatbotMessage
 from app.services.ai_service import AIService
+from app.services.conversation_memory import ConversationMemory
 from app.views.chatbot_view import ChatbotView
 import json
 
@@ -27,18 +33,19 @@ class ChatbotController:
         # Obtener historial de conversación
         history = ChatbotMessage.get_history(user_id, limit=20)
 
-        # Inicializar servicio de IA
-        try:
-            ai_service = AIService()
-
-            # Generar insights y sugerencias para la vista inicial
-            quick_insights = ai_service.get_quick_insights()
-            suggested_questions = ai_service.suggest_questions()
-
-        except Exception as e:
-            quick_insights = None
-            suggested_questions = None
-            print(f"Error inicializando AI: {e}")
+        # Los insights y sugerencias solo se muestran en la bienvenida. La
+        # página se envía sin esperarlos: si no están en caché se calculan en
+        # segundo plano y chatbot.js los pide después
+        quick_insights = None
+        suggested_questions = None
+        if not history:
+            try:
+                ai_service = AIService.get_instance()
+                quick_insights, suggested_questions = ai_service.cached_panels()
+                if quick_insights is None or suggested_questions is None:
+                    ai_service.prefetch_panels()
+            except Exception as e:
+                print(f"Error inicializando AI: {e}")
 
         # Renderizar vista con información adicional
         return HttpResponse(
@@ -76,7 +83,7 @@ class ChatbotController:
 
             # Inicializar servicio de IA
             try:
-                ai_service = AIService()
+                ai_service = AIService.get_instance()
             except Exception as e:
                 return JsonResponse(
                     {
@@ -86,26 +93,20 @@ class ChatbotController:
                     status=500,
                 )
 
-            # Obtener historial para contexto conversacional
-            history = ChatbotMessage.get_history(user_id, limit=10)
-
-            # Convertir historial al formato esperado por el AI Service
-            conversation_history = []
-            for msg in history:
-                conversation_history.append(
-                    {"is_user": True, "content": msg.get("message", "")}
-                )
-                conversation_history.append(
-                    {"is_user": False, "content": msg.get("response", "")}
-                )
+            # Resumen y turnos recientes dentro del presupuesto de tokens
+            memory = ConversationMemory.load(user_id)
 
             # Procesar el mensaje con contexto completo
             response = ai_service.process_query(
-                user_message, user_id, conversation_history=conversation_history
+                user_message,
+                user_id,
+                conversation_history=memory["history"],
+                summary=memory["summary"],
             )
 
             # Guardar mensaje y respuesta en la base de datos
             ChatbotMessage.save(user_id, user_message, response)
+            ConversationMemory.schedule_compact(user_id)
 
             # Renderizar el Markdown a HTML usando la misma función que el historial
             response_html = ChatbotView.format_markdown(response)
@@ -130,6 +131,93 @@ class ChatbotController:
                 status=500,
             )
 
+    @staticmethod
+    def send_message_stream(request):
+        """Procesa un mensaje y envía la respuesta de la IA por Server-Sent Events
+
+        Eventos: 'chunk' con cada fragmento de texto, 'done' con el HTML final
+        (el mensaje ya guardado) y 'error' si algo falla.
+        """
+        user_id = request.session.get("user_id")
+
+        if not user_id:
+            return JsonResponse(
+                {"success": False, "error": "No autenticado"}, status=401
+            )
+
+        if request.method != "POST":
+            return JsonResponse(
+                {"success": False, "error": "Método no permitido"}, status=405
+            )
+
+        try:
+            body = json.loads(request.body.decode("utf-8"))
+        except json.JSONDecodeError:
+            return JsonResponse(
+                {"success": False, "error": "JSON inválido"}, status=400
+            )
+
+        user_message = body.get("message", "").strip()
+        if not user_message:
+            return JsonResponse(
+                {"success": False, "error": "Mensaje vacío"}, status=400
+            )
+
+        try:
+            ai_service = AIService.get_instance()
+        except Exception as e:
+            return JsonResponse(
+                {
+                    "success": False,
+                    "error": f"Error de configuración de IA: {str(e)}",
+                },
+                status=500,
+            )
+
+        memory = ConversationMemory.load(user_id)
+
+        def events():
+            parts = []
+            try:
+                for text in ai_service.stream_query(
+                    user_message,
+                    user_id,
+                    conversation_history=memory["history"],
+                    summary=memory["summary"],
+                ):
+                    parts.append(text)
+                    yield ChatbotController._sse("chunk", {"text": text})
+
+                # Guardar la respuesta completa al terminar el stream
+                response = "".join(parts)
+                ChatbotMessage.save(user_id, user_message, response)
+                ConversationMemory.schedule_compact(user_id)
+
+                yield ChatbotController._sse(
+                    "done",
+                    {
+                        "success": True,
+                        "response": response,
+                        "response_html": ChatbotView.format_markdown(response),
+                        "timestamp": ChatbotMessage.get_current_timestamp(),
+                    },
+                )
+            except Exception as e:
+                yield ChatbotController._sse(
+                    "error", {"error": f"Error al procesar mensaje: {str(e)}"}
+                )
+
+        response = StreamingHttpResponse(events(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Evitar que un proxy (nginx) acumule la respuesta antes de enviarla
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    @staticmethod
+    def _sse(event, data):
+        """Formatea un evento Server-Sent Events"""
+        return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
     @staticmethod
     def get_insights(request):
         """Obtiene insights rápidos del inventario"""
@@ -141,10 +229,18 @@ class ChatbotController:
             )
 
         try:
-            ai_service = AIService()
-            insights = ai_service.get_quick_insights()
+            ai_service = AIService.get_instance()
+            insights = ai_service.get_quick_insights(
+                refresh=request.GET.get("refresh") == "1"
+            )
 
-            return JsonResponse({"success": True, "insights": insights})
+            return JsonResponse(
+                {
+                    "success": True,
+                    "insights": insights,
+                    "insights_html": ChatbotView.format_markdown(insights),
+                }
+            )
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)}, status=500)
 
@@ -159,13 +255,40 @@ class ChatbotController:
             )
 
         try:
-            ai_service = AIService()
-            suggestions = ai_service.suggest_questions()
+            ai_service = AIService.get_instance()
+            suggestions = ai_service.suggest_questions(
+                refresh=request.GET.get("refresh") == "1"
+            )
 
-            return JsonResponse({"success": True, "suggestions": suggestions})
+            return JsonResponse(
+                {
+                    "success": True,
+                    "suggestions": suggestions,
+                    "suggestions_html": ChatbotView.suggestion_buttons(suggestions),
+                }
+            )
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)}, status=500)
 
+    @staticmethod
+    def api_llm_metrics(request):
+        """API: métricas de Gemini, de la caché de respuestas y del enrutador de intenciones"""
+        user_id = request.session.get("user_id")
+
+        if not user_id:
+            return JsonResponse(
+                {"success": False, "error": "No autenticado"}, status=401
+            )
+
+        return JsonResponse(
+            {
+                "success": True,
+                "metrics": AIService.llm_metrics(),
+                "response_cache": AIService.response_cache_stats(),
+                "intents": AIService.intent_stats(),
+            }
+        )
+
     @staticmethod
     def clear_history(request):
         """Limpia el historial de conversación del usuario"""
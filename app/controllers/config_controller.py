@@ -2,8 +2,10 @@ from app.models.user import User
 from app.models.config import Config
 from app.views.config_view import ConfigView
 from django.shortcuts import redirect
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
+from app.middleware.auth_middleware import AuthMiddleware
+from config.query_log import SlowQueryLog
 import hashlib
 
 class ConfigController:
@@ -257,3 +259,35 @@ class ConfigController:
             except Exception as e:
                 return HttpResponse(ConfigView.change_password(user, request, error=f'Error al cambiar contraseña: {str(e)}'))
 
+    @staticmethod
+    def slow_queries(request):
+        """Consultas SQL con más tiempo acumulado del proceso (solo administradores)
+
+        ?orden=total|p95|slow elige el criterio y ?formato=json retorna los datos sin HTML.
+        """
+        user_id = request.session.get('user_id')
+        if not user_id:
+            return redirect('/login/')
+
+        user = User.get_by_id(user_id)
+        if not user:
+            return redirect('/login/')
+
+        if not AuthMiddleware.is_admin(user):
+            return HttpResponseRedirect('/configuracion/')
+
+        order_by = request.GET.get('orden', 'total')
+        try:
+            limit = max(1, min(int(request.GET.get('limite', 20)), 200))
+        except ValueError:
+            limit = 20
+        report = SlowQueryLog.top(limit=limit, order_by=order_by)
+
+        if request.GET.get('formato') == 'json':
+            return JsonResponse({
+                'success': True,
+                'threshold_ms': SlowQueryLog.THRESHOLD_MS,
+                'queries': report,
+            })
+
+        return HttpResponse(ConfigView.slow_queries(user, report, order_by, SlowQueryLog.THRESHOLD_MS))
@@ -1,9 +1,11 @@
-from django.http import HttpResponseRedirect, HttpResponse
+from datetime import datetime
+from django.http import HttpResponseRedirect, HttpResponse, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 from app.models.user import User
 from app.models.inventory_movement import InventoryMovement
 from app.models.product import Product
 from app.models.warehouse import Warehouse
+from app.models.pagination import Pagination
 from app.views.inventory_movement_view import InventoryMovementView
 
 class InventoryMovementController:
@@ -17,8 +19,79 @@ class InventoryMovementController:
         if not user:
             return HttpResponseRedirect('/login/')
         
-        movements = InventoryMovement.get_all()
-        return HttpResponse(InventoryMovementView.index(user, movements, request))
+        params = Pagination.from_request(
+            request, InventoryMovement.SORT_OPTIONS, InventoryMovement.DEFAULT_SORT
+        )
+        filters = InventoryMovementController._get_filters(request)
+        page = InventoryMovement.get_page(filters=filters, **params)
+        
+        # Opciones para el formulario de filtros (solo id + nombre, acotadas y cacheadas)
+        filter_options = InventoryMovement.filter_options(filters)
+        return HttpResponse(InventoryMovementView.index(
+            user, page['items'], request, page,
+            filters=InventoryMovementController._filters_to_query(filters),
+            filter_options=filter_options
+        ))
+    
+    @staticmethod
+    def api_index(request):
+        """API de consulta filtrada y paginada del ledger de movimientos"""
+        if 'user_id' not in request.session:
+            return JsonResponse({"error": "No autenticado"}, status=401)
+        
+        params = Pagination.from_request(
+            request, InventoryMovement.SORT_OPTIONS, InventoryMovement.DEFAULT_SORT
+        )
+        filters = InventoryMovementController._get_filters(request)
+        page = InventoryMovement.get_page(filters=filters, **params)
+        
+        return JsonResponse({
+            "items": list(page['items']),
+            "page_size": page['page_size'],
+            "sort": page['sort'],
+            "after_id": page['after_id'],
+            "next_after_id": page['next_after_id'],
+            "has_more": page['has_more'],
+            "total_estimate": page['total_estimate'],
+            "total_capped": page.get('total_capped', False),
+            "filters": InventoryMovementController._filters_to_query(filters),
+        })
+    
+    @staticmethod
+    def _get_filters(request):
+        """Lee y valida los filtros del ledger desde la query string"""
+        filters = {}
+        
+        for key in ('fecha_desde', 'fecha_hasta'):
+            value = request.GET.get(key, '').strip()
+            if value:
+                try:
+                    filters[key] = datetime.strptime(value, '%Y-%m-%d').date()
+                except ValueError:
+                    pass
+        
+        for key in ('producto_id', 'almacen_id', 'usuario_id'):
+            value = request.GET.get(key, '').strip()
+            if value.isdigit():
+                filters[key] = int(value)
+        
+        tipo = request.GET.get('tipo_movimiento', '').strip()
+        if tipo in InventoryMovement.TIPOS_MOVIMIENTO:
+            filters['tipo_movimiento'] = tipo
+        
+        referencia = request.GET.get('referencia', '').strip()
+        if referencia:
+            filters['referencia'] = referencia
+        
+        return filters
+    
+    @staticmethod
+    def _filters_to_query(filters):
+        """Convierte los filtros a valores de query string"""
+        return {
+            key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in filters.items()
+        }
     
     @staticmethod
     @ensure_csrf_cookie
@@ -0,0 +1,38 @@
+import os
+from django.http import HttpResponse
+from config.database import Database
+from config.metrics import RequestMetrics
+
+
+class MetricsController:
+    # /metrics exige la cabecera "Authorization: Bearer <token>"; sin token se
+    # rechaza, salvo con METRICS_PUBLIC=1 (solo si un proxy restringe el acceso)
+    TOKEN = os.getenv('METRICS_TOKEN', '')
+    PUBLIC = os.getenv('METRICS_PUBLIC', '').lower() in ('1', 'true', 'yes')
+
+    @staticmethod
+    def metrics(request):
+        """Métricas del proceso en formato de texto de Prometheus"""
+        if MetricsController.TOKEN:
+            expected = f"Bearer {MetricsController.TOKEN}"
+            if request.headers.get('Authorization', '') != expected:
+                return HttpResponse('No autorizado\n', status=401, content_type='text/plain')
+        elif not MetricsController.PUBLIC:
+            return HttpResponse(
+                'Métricas desactivadas: define METRICS_TOKEN (o METRICS_PUBLIC=1 detrás del proxy)\n',
+                status=403, content_type='text/plain; charset=utf-8',
+            )
+
+        pool = Database.pool_stats()
+        gauges = [
+            ('db_pool_connections', 'Conexiones abiertas del pool de MySQL.', pool['size']),
+            ('db_pool_connections_in_use', 'Conexiones del pool prestadas.', pool['in_use']),
+        ]
+        counters = [
+            ('db_pool_checkout_waits_total', 'Veces que una petición esperó una conexión libre.', pool['waits']),
+            ('db_pool_checkout_timeouts_total', 'Esperas de conexión agotadas.', pool['timeouts']),
+        ]
+        return HttpResponse(
+            RequestMetrics.render_prometheus(gauges, counters),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
@@ -1,8 +1,10 @@
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 from app.models.user import User
 from app.models.product import Product
 from app.models.category import Category
+from app.models.pagination import Pagination
+from app.models.stock import Stock
 from app.views.product_view import ProductView
 from app.middleware.auth_middleware import AuthMiddleware
 
@@ -23,10 +25,11 @@ class ProductController:
             request.session.flush()
             return HttpResponseRedirect('/login/')
         
-        # Obtener productos
-        products = Product.get_all()
+        # Obtener la página de productos solicitada
+        params = Pagination.from_request(request, Product.SORT_OPTIONS, Product.DEFAULT_SORT)
+        page = Product.get_page(**params)
         
-        return HttpResponse(ProductView.index(user, request.path, products))
+        return HttpResponse(ProductView.index(user, request.path, page['items'], page))
     
     @staticmethod
     @ensure_csrf_cookie
@@ -62,6 +65,7 @@ class ProductController:
                     'precio_venta': request.POST.get('precio_venta'),
                     'stock_minimo': request.POST.get('stock_minimo', 10),
                     'stock_actual': request.POST.get('stock_actual', 0),
+                    'usuario_id': user_id,
                     'activo': 1
                 }
                 
@@ -119,6 +123,7 @@ class ProductController:
                     'precio_venta': request.POST.get('precio_venta'),
                     'stock_minimo': request.POST.get('stock_minimo', 10),
                     'stock_actual': request.POST.get('stock_actual', 0),
+                    'usuario_id': user_id,
                     'activo': 1
                 }
                 
@@ -157,3 +162,21 @@ class ProductController:
         
         # Redireccionar a la lista
         return HttpResponseRedirect('/productos/')
+    
+    @staticmethod
+    def api_locations(request, product_id):
+        """API con los almacenes donde hay stock de un producto"""
+        if not request.session.get('user_id'):
+            return JsonResponse({"error": "No autenticado"}, status=401)
+        
+        product = Product.get_by_id(product_id)
+        if not product:
+            return JsonResponse({"error": "Producto no encontrado"}, status=404)
+        
+        locations = Stock.product_locations(product_id)
+        return JsonResponse({
+            "producto_id": product_id,
+            "nombre": product['nombre'],
+            "stock_total": sum(int(row['cantidad']) for row in locations),
+            "items": list(locations),
+        })
@@ -1,5 +1,6 @@
 from django.http import JsonResponse, HttpResponseRedirect
 from django.views.decorators.csrf import ensure_csrf_cookie
+from config.database import Database
 from app.models.user import User
 from app.models.purchase import Purchase
 from app.models.supplier import Supplier
@@ -119,11 +120,12 @@ class PurchaseController:
                     'notas': notas
                 }
                 
-                Purchase.update(purchase_id, purchase_data)
-                
-                # Actualizar detalles
-                if details:
-                    Purchase.update_details(purchase_id, details)
+                with Database.transaction():
+                    Purchase.update(purchase_id, purchase_data)
+                    
+                    # Actualizar detalles
+                    if details:
+                        Purchase.update_details(purchase_id, details)
                 
                 return HttpResponseRedirect('/compras/')
                 
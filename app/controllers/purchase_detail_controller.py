@@ -3,6 +3,7 @@ from django.views.decorators.csrf import ensure_csrf_cookie
 from app.models.user import User
 from app.models.purchase import Purchase
 from app.models.product import Product
+from app.models.pagination import Pagination
 from app.views.purchase_detail_view import PurchaseDetailView
 
 class PurchaseDetailController:
@@ -16,23 +17,11 @@ class PurchaseDetailController:
         if not user:
             return HttpResponseRedirect('/login/')
         
-        # Obtener todos los detalles de todas las compras
-        query = """
-            SELECT dc.*, 
-                   p.nombre as producto_nombre,
-                   c.numero_factura,
-                   c.fecha as fecha_compra,
-                   pr.nombre as proveedor_nombre
-            FROM detalle_compras dc
-            INNER JOIN productos p ON dc.producto_id = p.id
-            INNER JOIN compras c ON dc.compra_id = c.id
-            INNER JOIN proveedores pr ON c.proveedor_id = pr.id
-            ORDER BY c.fecha DESC, dc.id DESC
-        """
-        from config.database import Database
-        details = Database.execute_query(query)
+        # Obtener la página de detalles solicitada
+        params = Pagination.from_request(request, Purchase.DETAIL_SORT_OPTIONS, 'fecha')
+        page = Purchase.get_details_page(**params)
         
-        return HttpResponse(PurchaseDetailView.index(user, details, request))
+        return HttpResponse(PurchaseDetailView.index(user, page['items'], request, page))
     
     @staticmethod
     @ensure_csrf_cookie
@@ -69,19 +58,22 @@ class PurchaseDetailController:
                     VALUES (%s, %s, %s, %s, %s)
                 """
                 from config.database import Database
-                Database.execute_query(query, (compra_id, producto_id, cantidad, precio_unitario, subtotal), fetch=False)
-                
-                # Actualizar el total de la compra
-                update_query = """
-                    UPDATE compras 
-                    SET total = (
-                        SELECT SUM(subtotal) 
-                        FROM detalle_compras 
-                        WHERE compra_id = %s
-                    )
-                    WHERE id = %s
-                """
-                Database.execute_query(update_query, (compra_id, compra_id), fetch=False)
+                with Database.transaction():
+                    before = Purchase.posting_state(compra_id)
+                    Database.execute_query(query, (compra_id, producto_id, cantidad, precio_unitario, subtotal), fetch=False)
+                    
+                    # Actualizar el total de la compra
+                    update_query = """
+                        UPDATE compras 
+                        SET total = (
+                            SELECT SUM(subtotal) 
+                            FROM detalle_compras 
+                            WHERE compra_id = %s
+                        )
+                        WHERE id = %s
+                    """
+                    Database.execute_query(update_query, (compra_id, compra_id), fetch=False)
+                    Purchase.post_changes(before, compra_id)
                 
                 return HttpResponseRedirect('/detalle-compras/')
                 
@@ -144,19 +136,22 @@ class PurchaseDetailController:
                         subtotal = %s
                     WHERE id = %s
                 """
-                Database.execute_query(update_query, (cantidad, precio_unitario, subtotal, detail_id), fetch=False)
-                
-                # Actualizar el total de la compra
-                update_total_query = """
-                    UPDATE compras 
-                    SET total = (
-                        SELECT SUM(subtotal) 
-                        FROM detalle_compras 
-                        WHERE compra_id = %s
-                    )
-                    WHERE id = %s
-                """
-                Database.execute_query(update_total_query, (detail['compra_id'], detail['compra_id']), fetch=False)
+                with Database.transaction():
+                    before = Purchase.posting_state(detail['compra_id'])
+                    Database.execute_query(update_query, (cantidad, precio_unitario, subtotal, detail_id), fetch=False)
+                    
+                    # Actualizar el total de la compra
+                    update_total_query = """
+                        UPDATE compras 
+                        SET total = (
+                            SELECT SUM(subtotal) 
+                            FROM detalle_compras 
+                            WHERE compra_id = %s
+                        )
+                        WHERE id = %s
+                    """
+                    Database.execute_query(update_total_query, (detail['compra_id'], detail['compra_id']), fetch=False)
+                    Purchase.post_changes(before, detail['compra_id'])
                 
                 return HttpResponseRedirect('/detalle-compras/')
                 
@@ -189,21 +184,25 @@ class PurchaseDetailController:
                 if result:
                     compra_id = result[0]['compra_id']
                     
-                    # Eliminar el detalle
-                    delete_query = "DELETE FROM detalle_compras WHERE id = %s"
-                    Database.execute_query(delete_query, (detail_id,), fetch=False)
-                    
-                    # Actualizar el total de la compra
-                    update_query = """
-                        UPDATE compras 
-                        SET total = COALESCE((
-                            SELECT SUM(subtotal) 
-                            FROM detalle_compras 
-                            WHERE compra_id = %s
-                        ), 0)
-                        WHERE id = %s
-                    """
-                    Database.execute_query(update_query, (compra_id, compra_id), fetch=False)
+                    with Database.transaction():
+                        before = Purchase.posting_state(compra_id)
+                        
+                        # Eliminar el detalle
+                        delete_query = "DELETE FROM detalle_compras WHERE id = %s"
+                        Database.execute_query(delete_query, (detail_id,), fetch=False)
+                        
+                        # Actualizar el total de la compra
+                        update_query = """
+                            UPDATE compras 
+                            SET total = COALESCE((
+                                SELECT SUM(subtotal) 
+                                FROM detalle_compras 
+                                WHERE compra_id = %s
+                            ), 0)
+                            WHERE id = %s
+                        """
+                        Database.execute_query(update_query, (compra_id, compra_id), fetch=False)
+                        Purchase.post_changes(before, compra_id)
                 
             except Exception as e:
                 print(f"Error al eliminar detalle: {str(e)}")
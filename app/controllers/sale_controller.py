@@ -2,6 +2,7 @@ from app.models.user import User
 from app.models.sale import Sale
 from app.models.client import Client
 from app.models.product import Product
+from app.models.pagination import Pagination
 from app.views.sale_view import SaleView
 from django.shortcuts import redirect
 from django.http import HttpResponse, HttpResponseRedirect
@@ -23,11 +24,12 @@ class SaleController:
         if not user:
             return redirect('/login/')
         
-        # Obtener todas las ventas
-        sales = Sale.get_all()
+        # Obtener la página de ventas solicitada
+        params = Pagination.from_request(request, Sale.SORT_OPTIONS, Sale.DEFAULT_SORT)
+        page = Sale.get_page(**params)
         
         # Renderizar la vista
-        return HttpResponse(SaleView.index(user, sales))
+        return HttpResponse(SaleView.index(user, page['items'], page))
     
     @staticmethod
     @ensure_csrf_cookie
@@ -3,6 +3,7 @@ from django.views.decorators.csrf import ensure_csrf_cookie
 from app.models.user import User
 from app.models.sale import Sale
 from app.models.product import Product
+from app.models.pagination import Pagination
 from app.views.sale_detail_view import SaleDetailView
 
 class SaleDetailController:
@@ -16,23 +17,11 @@ class SaleDetailController:
         if not user:
             return HttpResponseRedirect('/login/')
         
-        # Obtener todos los detalles de todas las ventas
-        query = """
-            SELECT dv.*, 
-                   p.nombre as producto_nombre,
-                   v.numero_factura,
-                   v.fecha as fecha_venta,
-                   c.nombre as cliente_nombre
-            FROM detalle_ventas dv
-            INNER JOIN productos p ON dv.producto_id = p.id
-            INNER JOIN ventas v ON dv.venta_id = v.id
-            INNER JOIN clientes c ON v.cliente_id = c.id
-            ORDER BY v.fecha DESC, dv.id DESC
-        """
-        from config.database import Database
-        details = Database.execute_query(query)
+        # Obtener la página de detalles solicitada
+        params = Pagination.from_request(request, Sale.DETAIL_SORT_OPTIONS, 'fecha')
+        page = Sale.get_details_page(**params)
         
-        return HttpResponse(SaleDetailView.index(user, details, request))
+        return HttpResponse(SaleDetailView.index(user, page['items'], request, page))
     
     @staticmethod
     @ensure_csrf_cookie
@@ -69,19 +58,22 @@ class SaleDetailController:
                     VALUES (%s, %s, %s, %s, %s)
                 """
                 from config.database import Database
-                Database.execute_query(query, (venta_id, producto_id, cantidad, precio_unitario, subtotal), fetch=False)
-                
-                # Actualizar el total de la venta
-                update_query = """
-                    UPDATE ventas 
-                    SET total = (
-                        SELECT SUM(subtotal) 
-                        FROM detalle_ventas 
-                        WHERE venta_id = %s
-                    )
-                    WHERE id = %s
-                """
-                Database.execute_query(update_query, (venta_id, venta_id), fetch=False)
+                with Database.transaction():
+                    before = Sale.posting_state(venta_id)
+                    Database.execute_query(query, (venta_id, producto_id, cantidad, precio_unitario, subtotal), fetch=False)
+                    
+                    # Actualizar el total de la venta
+                    update_query = """
+                        UPDATE ventas 
+                        SET total = (
+                            SELECT SUM(subtotal) 
+                            FROM detalle_ventas 
+                            WHERE venta_id = %s
+                        )
+                        WHERE id = %s
+                    """
+                    Database.execute_query(update_query, (venta_id, venta_id), fetch=False)
+                    Sale.post_changes(before, venta_id)
                 
                 return HttpResponseRedirect('/detalle-ventas/')
                 
@@ -144,19 +136,22 @@ class SaleDetailController:
                         subtotal = %s
                     WHERE id = %s
                 """
-                Database.execute_query(update_query, (cantidad, precio_unitario, subtotal, detail_id), fetch=False)
-                
-                # Actualizar el total de la venta
-                update_total_query = """
-                    UPDATE ventas 
-                    SET total = (
-                        SELECT SUM(subtotal) 
-                        FROM detalle_ventas 
-                        WHERE venta_id = %s
-                    )
-                    WHERE id = %s
-                """
-                Database.execute_query(update_total_query, (detail['venta_id'], detail['venta_id']), fetch=False)
+                with Database.transaction():
+                    before = Sale.posting_state(detail['venta_id'])
+                    Database.execute_query(update_query, (cantidad, precio_unitario, subtotal, detail_id), fetch=False)
+                    
+                    # Actualizar el total de la venta
+                    update_total_query = """
+                        UPDATE ventas 
+                        SET total = (
+                            SELECT SUM(subtotal) 
+                            FROM detalle_ventas 
+                            WHERE venta_id = %s
+                        )
+                        WHERE id = %s
+                    """
+                    Database.execute_query(update_total_query, (detail['venta_id'], detail['venta_id']), fetch=False)
+                    Sale.post_changes(before, detail['venta_id'])
                 
                 return HttpResponseRedirect('/detalle-ventas/')
                 
@@ -189,21 +184,25 @@ class SaleDetailController:
                 if result:
                     venta_id = result[0]['venta_id']
                     
-                    # Eliminar el detalle
-                    delete_query = "DELETE FROM detalle_ventas WHERE id = %s"
-                    Database.execute_query(delete_query, (detail_id,), fetch=False)
-                    
-                    # Actualizar el total de la venta
-                    update_query = """
-                        UPDATE ventas 
-                        SET total = COALESCE((
-                            SELECT SUM(subtotal) 
-                            FROM detalle_ventas 
-                            WHERE venta_id = %s
-                        ), 0)
-                        WHERE id = %s
-                    """
-                    Database.execute_query(update_query, (venta_id, venta_id), fetch=False)
+                    with Database.transaction():
+                        before = Sale.posting_state(venta_id)
+                        
+                        # Eliminar el detalle
+                        delete_query = "DELETE FROM detalle_ventas WHERE id = %s"
+                        Database.execute_query(delete_query, (detail_id,), fetch=False)
+                        
+                        # Actualizar el total de la venta
+                        update_query = """
+                            UPDATE ventas 
+                            SET total = COALESCE((
+                                SELECT SUM(subtotal) 
+                                FROM detalle_ventas 
+                                WHERE venta_id = %s
+                            ), 0)
+                            WHERE id = %s
+                        """
+                        Database.execute_query(update_query, (venta_id, venta_id), fetch=False)
+                        Sale.post_changes(before, venta_id)
                 
             except Exception as e:
                 print(f"Error al eliminar detalle: {str(e)}")
@@ -1,8 +1,9 @@
 from app.models.user import User
 from app.models.warehouse import Warehouse
+from app.models.stock import Stock
 from app.views.warehouse_view import WarehouseView
 from django.shortcuts import redirect
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, JsonResponse
 from django.views.decorators.csrf import ensure_csrf_cookie
 
 class WarehouseController:
@@ -18,12 +19,24 @@ class WarehouseController:
         if not user:
             return redirect('/login/')
         
-        # Obtener todos los almacenes
-        warehouses = Warehouse.get_all()
+        # Obtener todos los almacenes con su ocupación actual
+        warehouses = Stock.warehouse_occupancy()
         
         # Renderizar la vista
         return HttpResponse(WarehouseView.index(user, warehouses))
     
+    @staticmethod
+    def api_occupancy(request, warehouse_id=None):
+        """API de ocupación de almacenes (todos o uno solo)"""
+        if not request.session.get('user_id'):
+            return JsonResponse({"error": "No autenticado"}, status=401)
+        
+        warehouses = Stock.warehouse_occupancy(warehouse_id)
+        if warehouse_id and not warehouses:
+            return JsonResponse({"error": "Almacén no encontrado"}, status=404)
+        
+        return JsonResponse({"items": list(warehouses)})
+    
     @staticmethod
     @ensure_csrf_cookie
     def create(request):
@@ -4,6 +4,14 @@ from app.models.user import User
 class AuthMiddleware:
     """Middleware para verificar permisos de usuario"""
     
+    # Nombre del rol con acceso a las páginas de diagnóstico
+    ADMIN_ROLE = 'Administrador'
+    
+    @staticmethod
+    def is_admin(user):
+        """Verifica si el usuario tiene el rol de administrador"""
+        return bool(user) and user.get('rol') == AuthMiddleware.ADMIN_ROLE
+    
     @staticmethod
     def check_user_active(request):
         """Verifica si el usuario está activo"""
@@ -0,0 +1,40 @@
+import time
+from config.metrics import RequestMetrics
+
+
+class MetricsMiddleware:
+    """Middleware que registra conteo, latencia y desglose de tiempos por ruta
+
+    La ruta es el patrón de config/urls.py (p. ej. "ventas/<int:sale_id>/ver/"),
+    no la URL concreta, para no crear una serie por cada id.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        RequestMetrics.begin()
+        start = time.perf_counter()
+        status = 500
+        streaming = False
+        try:
+            response = self.get_response(request)
+            status = response.status_code
+            if getattr(response, 'streaming', False):
+                # El cuerpo (y la llamada al LLM) se genera al enviarlo: se mide hasta el final
+                response.streaming_content = RequestMetrics.stream(
+                    RequestMetrics.detach(),
+                    response.streaming_content,
+                    lambda: MetricsMiddleware._end(request, status, start),
+                )
+                streaming = True
+            return response
+        finally:
+            if not streaming:
+                MetricsMiddleware._end(request, status, start)
+
+    @staticmethod
+    def _end(request, status, start):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'sin_ruta'
+        RequestMetrics.end(request.method, route, status, time.perf_counter() - start)
@@ -0,0 +1,201 @@
+import cProfile
+import io
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from django.http import HttpResponse
+from app.middleware.auth_middleware import AuthMiddleware
+from app.models.user import User
+
+
+class StackSampler:
+    """Perfilador por muestreo de un hilo
+
+    Un hilo auxiliar lee la pila del hilo perfilado cada `interval` segundos
+    (sys._current_frames) y cuenta cuántas veces aparece cada pila. El
+    resultado en formato "collapsed" (marco;marco;marco conteo) se puede
+    abrir directamente con flamegraph.pl o speedscope. El costo sobre el
+    hilo perfilado es casi nulo, a diferencia de cProfile.
+    """
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            self.samples += 1
+
+    def collapsed(self):
+        """Pilas en formato collapsed, las más frecuentes primero"""
+        lines = sorted(self.counts.items(), key=lambda item: item[1], reverse=True)
+        return "".join(f"{stack} {count}\n" for stack, count in lines)
+
+
+class ProfilingMiddleware:
+    """Middleware que perfila una petición a pedido de un administrador
+
+    Con la cabecera X-Profile o el parámetro ?_profile= y una sesión con rol
+    de administrador, la vista se ejecuta bajo el perfilador y la respuesta
+    se reemplaza por el resultado:
+
+    - 1 / texto: informe de pstats ordenado por tiempo acumulado
+    - pstats: volcado binario de cProfile (snakeviz, gprof2dot, flameprof)
+    - flame: pilas muestreadas en formato collapsed para un flame graph
+
+    Además, con PROFILE_SAMPLE_RATE > 0 esa fracción de las peticiones se
+    muestrea siempre (perfilador por muestreo) y se guarda en PROFILE_DIR;
+    en las respuestas en streaming el muestreo sigue hasta que se envía el
+    último fragmento.
+    """
+
+    SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    DIRECTORY = os.getenv('PROFILE_DIR', '/tmp/perfiles')
+    INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5)) / 1000
+    # Funciones listadas en el informe de texto
+    REPORT_LINES = 60
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        mode = request.headers.get('X-Profile') or request.GET.get('_profile')
+        if mode and ProfilingMiddleware._is_admin(request):
+            return self._profile(request, mode.lower())
+
+        if ProfilingMiddleware.SAMPLE_RATE and random.random() < ProfilingMiddleware.SAMPLE_RATE:
+            return self._sample_to_disk(request)
+
+        return self.get_response(request)
+
+    @staticmethod
+    def _is_admin(request):
+        user_id = request.session.get('user_id')
+        if not user_id:
+            return False
+        return AuthMiddleware.is_admin(User.get_by_id(user_id))
+
+    def _run(self, request):
+        """Ejecuta la vista; las respuestas en streaming se consumen para incluirlas en el perfil"""
+        response = self.get_response(request)
+        if getattr(response, 'streaming', False):
+            b''.join(response.streaming_content)
+        return response
+
+    def _profile(self, request, mode):
+        start = time.perf_counter()
+        if mode == 'flame':
+            sampler = StackSampler(threading.get_ident(), ProfilingMiddleware.INTERVAL).start()
+            try:
+                response = self._run(request)
+            finally:
+                sampler.stop()
+            return HttpResponse(sampler.collapsed(), content_type='text/plain; charset=utf-8')
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(self._run, request)
+        elapsed = time.perf_counter() - start
+
+        if mode == 'pstats':
+            profiler.create_stats()
+            # Mismo contenido que Profile.dump_stats, sin pasar por disco
+            dump = HttpResponse(marshal.dumps(profiler.stats), content_type='application/octet-stream')
+            dump['Content-Disposition'] = 'attachment; filename="perfil.prof"'
+            return dump
+
+        report = io.StringIO()
+        report.write(
+            f"{request.method} {request.get_full_path()} -> {response.status_code} "
+            f"en {elapsed * 1000:.1f} ms\n\n"
+        )
+        stats = pstats.Stats(profiler, stream=report)
+        stats.strip_dirs().sort_stats('cumulative').print_stats(ProfilingMiddleware.REPORT_LINES)
+        return HttpResponse(report.getvalue(), content_type='text/plain; charset=utf-8')
+
+    def _sample_to_disk(self, request):
+        sampler = StackSampler(threading.get_ident(), ProfilingMiddleware.INTERVAL).start()
+        start = time.perf_counter()
+        streaming = False
+        try:
+            response = self.get_response(request)
+            if getattr(response, 'streaming', False):
+                # El cuerpo (p. ej. la respuesta del chatbot) se genera al enviarlo: se muestrea hasta el final
+                response.streaming_content = ProfilingMiddleware._sample_stream(
+                    sampler, response.streaming_content, request, start
+                )
+                streaming = True
+            return response
+        finally:
+            if not streaming:
+                ProfilingMiddleware._save_sample(sampler, request, start)
+
+    @staticmethod
+    def _sample_stream(sampler, iterable, request, start):
+        """Sigue muestreando mientras se consume una respuesta en streaming y guarda el perfil al cerrarla"""
+        iterator = iter(iterable)
+        try:
+            while True:
+                # El servidor puede consumir el cuerpo desde otro hilo
+                sampler.thread_id = threading.get_ident()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                yield chunk
+        finally:
+            try:
+                close = getattr(iterator, 'close', None)
+                if close is not None:
+                    close()
+            finally:
+                ProfilingMiddleware._save_sample(sampler, request, start)
+
+    @staticmethod
+    def _save_sample(sampler, request, start):
+        sampler.stop()
+        elapsed = time.perf_counter() - start
+        if not sampler.samples:
+            return
+        name = re.sub(r'[^\w-]', '_', "-".join(filter(None, request.path.split("/")))) or "inicio"
+        try:
+            path = os.path.join(
+                ProfilingMiddleware._directory(),
+                f"{time.strftime('%Y%m%d-%H%M%S')}-{int(elapsed * 1000)}ms-{name}.collapsed",
+            )
+            with open(path, 'w', encoding='utf-8') as handle:
+                handle.write(sampler.collapsed())
+        except OSError as e:
+            print(f"No se pudo guardar el perfil muestreado: {e}")
+
+    @staticmethod
+    def _directory():
+        os.makedirs(ProfilingMiddleware.DIRECTORY, exist_ok=True)
+        return ProfilingMiddleware.DIRECTORY
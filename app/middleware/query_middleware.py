@@ -0,0 +1,43 @@
+import os
+from config.query_log import QueryCollector
+
+
+class QueryMiddleware:
+    """Middleware que mide las consultas SQL de cada petición
+
+    Activa un QueryCollector durante la vista, añade las cabeceras
+    X-DB-Queries / X-DB-Time-Ms / Server-Timing a la respuesta y escribe en
+    el log una línea por petición con los totales y los patrones duplicados
+    o N+1 detectados. Por defecto (DB_QUERY_LOG=issues) solo se escriben
+    las peticiones con patrones sospechosos; con DB_QUERY_LOG=all se
+    escriben todas y con DB_QUERY_LOG=off se desactiva.
+    """
+
+    MODE = os.getenv('DB_QUERY_LOG', 'issues').lower()
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if QueryMiddleware.MODE == 'off':
+            return self.get_response(request)
+
+        collector = QueryCollector.start(f"{request.method} {request.path}")
+        try:
+            response = self.get_response(request)
+        finally:
+            QueryCollector.stop()
+
+        # Las cabeceras salen antes del cuerpo: en respuestas en streaming solo
+        # se cuentan las consultas previas al primer fragmento y se marcan como parciales
+        partial = getattr(response, 'streaming', False)
+        response['X-DB-Queries'] = str(collector.count)
+        response['X-DB-Time-Ms'] = f"{collector.total_seconds * 1000:.1f}"
+        description = f"{collector.count} consultas" + (" antes del stream" if partial else "")
+        response['Server-Timing'] = f"db;dur={collector.total_seconds * 1000:.1f};desc=\"{description}\""
+        if partial:
+            response['X-DB-Queries-Partial'] = '1'
+
+        if collector.count and (QueryMiddleware.MODE != 'issues' or collector.issues()):
+            print(collector.log_line(partial=partial))
+        return response
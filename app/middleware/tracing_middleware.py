@@ -0,0 +1,63 @@
+from config.tracing import Tracer
+from app.services.ai_service import AIService
+
+
+class TracingMiddleware:
+    """Middleware que abre una traza por petición
+
+    El tramo raíz cubre la petición (con la cabecera W3C traceparent del
+    llamador, si llega) y process_view ejecuta el método del controlador
+    dentro de su propio tramo. La respuesta lleva X-Trace-Id para buscar la
+    traza. En las respuestas en streaming (SSE del chatbot) el tramo raíz
+    sigue abierto hasta que termina el stream, así los tramos del contexto y
+    de Gemini quedan en la misma traza. Con TRACING_EXPORTER vacío no se
+    instrumenta nada.
+    Debe ir al final de MIDDLEWARE: al ejecutar la vista en process_view,
+    los process_view de los middlewares anteriores (CSRF) ya corrieron.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if Tracer.from_env():
+            Tracer.instrument_package('app.models')
+            Tracer.instrument_class(AIService)
+
+    def __call__(self, request):
+        root = Tracer.start_trace(
+            f"{request.method} {request.path}",
+            request.headers.get('traceparent'),
+            {'http.request.method': request.method, 'url.path': request.path},
+        )
+        if root is None:
+            return self.get_response(request)
+
+        streaming = False
+        try:
+            response = self.get_response(request)
+            match = getattr(request, 'resolver_match', None)
+            if match is not None:
+                root.name = f"{request.method} {match.route}"
+                root.set('http.route', match.route)
+            root.set('http.response.status_code', response.status_code)
+            if response.status_code >= 500:
+                root.error = f"HTTP {response.status_code}"
+            response['X-Trace-Id'] = root.trace_id
+            if getattr(response, 'streaming', False):
+                # El cuerpo se genera al enviarlo: la traza se cierra al terminar el stream
+                response.streaming_content = Tracer.stream(root, response.streaming_content)
+                streaming = True
+            return response
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if streaming:
+                Tracer.detach()
+            else:
+                Tracer.end_trace(root)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if Tracer.current() is None:
+            return None
+        with Tracer.span(view_func.__qualname__, **{'code.function': view_func.__qualname__}):
+            return view_func(request, *view_args, **view_kwargs)
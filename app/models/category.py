@@ -1,4 +1,5 @@
 from config.database import Database
+from config.cache import DataVersion
 
 class Category:
     @staticmethod
@@ -42,7 +43,9 @@ class Category:
             data.get('descripcion', ''),
             data.get('activo', 1)
         )
-        return Database.execute_query(query, params, fetch=False)
+        result = Database.execute_query(query, params, fetch=False)
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def update(category_id, data):
@@ -60,11 +63,15 @@ class Category:
             data.get('activo', 1),
             category_id
         )
-        return Database.execute_query(query, params, fetch=False)
+        result = Database.execute_query(query, params, fetch=False)
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def delete(category_id):
         """Elimina una categoría (soft delete cambiando activo a 0)"""
         query = "UPDATE wms_management_system.categorias SET activo = 0 WHERE id = %s"
-        return Database.execute_query(query, (category_id,), fetch=False)
+        result = Database.execute_query(query, (category_id,), fetch=False)
+        DataVersion.bump()
+        return result
 
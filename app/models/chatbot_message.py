@@ -7,6 +7,11 @@ from datetime import datetime
 class ChatbotMessage:
     """Modelo para los mensajes del chatbot"""
 
+    # Historial por usuario en orden de inserción
+    INDEXES = {
+        'idx_chatbot_messages_user': 'user_id, id',
+    }
+
     @staticmethod
     def create_table():
         """Crea la tabla chatbot_messages si no existe"""
@@ -21,6 +26,30 @@ class ChatbotMessage:
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci
         """
         Database.execute_query(query, fetch=False)
+        Database.bump_schema_version()
+
+    @staticmethod
+    def create_summary_table():
+        """Crea la tabla chatbot_summaries (resumen acumulado de la conversación)"""
+        query = """
+            CREATE TABLE IF NOT EXISTS chatbot_summaries (
+                user_id INT NOT NULL PRIMARY KEY,
+                summary TEXT NOT NULL,
+                last_message_id INT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """
+        Database.execute_query(query, fetch=False)
+        Database.bump_schema_version()
+
+    @staticmethod
+    def create_indexes():
+        """Crea los índices de chatbot_messages si no existen"""
+        created = []
+        for name, columns in ChatbotMessage.INDEXES.items():
+            if Database.ensure_index('chatbot_messages', name, columns):
+                created.append(name)
+        return created
 
     @staticmethod
     def save(user_id, message, response):
@@ -55,8 +84,12 @@ class ChatbotMessage:
     @staticmethod
     def delete_history(user_id):
         """Elimina todo el historial de un usuario"""
-        query = "DELETE FROM chatbot_messages WHERE user_id = %s"
-        Database.execute_query(query, (user_id,), fetch=False)
+        with Database.transaction():
+            query = "DELETE FROM chatbot_messages WHERE user_id = %s"
+            Database.execute_query(query, (user_id,), fetch=False)
+            Database.execute_query(
+                "DELETE FROM chatbot_summaries WHERE user_id = %s", (user_id,), fetch=False
+            )
 
     @staticmethod
     def get_current_timestamp():
@@ -78,3 +111,48 @@ class ChatbotMessage:
         if results:
             return list(reversed(results))
         return []
+
+    @staticmethod
+    def get_messages_after(user_id, after_id=0, limit=50):
+        """Mensajes de un usuario posteriores a after_id, de más antiguo a más reciente"""
+        query = """
+            SELECT id, message, response
+            FROM chatbot_messages
+            WHERE user_id = %s AND id > %s
+            ORDER BY id DESC
+            LIMIT %s
+        """
+        results = Database.execute_query(query, (user_id, after_id, limit))
+        return list(reversed(results)) if results else []
+
+    @staticmethod
+    def get_messages_between(user_id, after_id, before_id, limit=50):
+        """Mensajes más antiguos de un usuario con after_id < id < before_id, de más antiguo a más reciente"""
+        query = """
+            SELECT id, message, response
+            FROM chatbot_messages
+            WHERE user_id = %s AND id > %s AND id < %s
+            ORDER BY id ASC
+            LIMIT %s
+        """
+        results = Database.execute_query(query, (user_id, after_id, before_id, limit))
+        return list(results) if results else []
+
+    @staticmethod
+    def get_summary(user_id):
+        """Resumen acumulado de la conversación de un usuario (None si no hay)"""
+        query = "SELECT summary, last_message_id FROM chatbot_summaries WHERE user_id = %s"
+        result = Database.execute_query(query, (user_id,))
+        return result[0] if result else None
+
+    @staticmethod
+    def save_summary(user_id, summary, last_message_id):
+        """Guarda el resumen y el último mensaje que incluye"""
+        query = """
+            INSERT INTO chatbot_summaries (user_id, summary, last_message_id)
+            VALUES (%s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                summary = VALUES(summary),
+                last_message_id = VALUES(last_message_id)
+        """
+        Database.execute_query(query, (user_id, summary, last_message_id), fetch=False)
@@ -1,4 +1,5 @@
 from config.database import Database
+from config.cache import DataVersion
 
 class Client:
     """Modelo de Cliente"""
@@ -48,7 +49,9 @@ class Client:
             data.get('direccion', ''),
             data.get('activo', 1)
         )
-        return Database.execute_query(query, params, fetch=False)
+        result = Database.execute_query(query, params, fetch=False)
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def update(client_id, data):
@@ -72,11 +75,15 @@ class Client:
             data.get('activo', 1),
             client_id
         )
-        return Database.execute_query(query, params, fetch=False)
+        result = Database.execute_query(query, params, fetch=False)
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def delete(client_id):
         """Elimina un cliente (soft delete cambiando activo a 0)"""
         query = "UPDATE wms_management_system.clientes SET activo = 0 WHERE id = %s"
-        return Database.execute_query(query, (client_id,), fetch=False)
+        result = Database.execute_query(query, (client_id,), fetch=False)
+        DataVersion.bump()
+        return result
 
@@ -1,6 +1,84 @@
+from datetime import timedelta
 from config.database import Database
+from config.cache import DataVersion, TTLCache
+from app.models.pagination import Pagination
+from app.models.stock import Stock
 
 class InventoryMovement:
+    # Opciones de orden para el listado paginado
+    SORT_OPTIONS = {
+        'fecha': {
+            'column': 'mi.fecha',
+            'direction': 'DESC',
+            'lookup': 'SELECT fecha FROM movimientos_inventario WHERE id = %s',
+            'label': 'Fecha',
+        },
+        'id': {'column': 'mi.id', 'direction': 'DESC', 'label': 'Más recientes'},
+    }
+    DEFAULT_SORT = 'fecha'
+    
+    TIPOS_MOVIMIENTO = ('entrada', 'salida', 'ajuste')
+    
+    # Índices compuestos para los filtros del ledger (la PK se añade implícitamente)
+    INDEXES = {
+        'idx_movimientos_fecha': 'fecha',
+        'idx_movimientos_producto_fecha': 'producto_id, fecha',
+        'idx_movimientos_almacen_fecha': 'almacen_id, fecha',
+        'idx_movimientos_usuario_fecha': 'usuario_id, fecha',
+        'idx_movimientos_tipo_fecha': 'tipo_movimiento, fecha',
+        'idx_movimientos_referencia': 'referencia',
+    }
+    
+    # Listas id + etiqueta de los filtros del listado: nombre -> (tabla, etiqueta, condición, filtro)
+    FILTER_OPTION_SOURCES = {
+        'products': ('productos', 'nombre', 'activo = 1', 'producto_id'),
+        'warehouses': ('almacenes', 'nombre', 'activo = 1', 'almacen_id'),
+        'users': ('usuarios', 'username', '1 = 1', 'usuario_id'),
+    }
+    FILTER_OPTIONS_LIMIT = 200
+    # Los usuarios no incrementan DataVersion: el TTL acota cuánto tarda en verse uno nuevo
+    _filter_options_cache = TTLCache(ttl=60, max_entries=4)
+    
+    @staticmethod
+    def filter_options(filters=None):
+        """Opciones de los filtros del listado, acotadas y cacheadas
+        
+        Cada lista trae solo id y etiqueta, a lo sumo FILTER_OPTIONS_LIMIT
+        filas ordenadas por etiqueta, y se cachea por versión de datos. Si el
+        filtro activo apunta a un elemento que quedó fuera de la lista, se
+        agrega al principio para que siga seleccionado.
+        """
+        filters = filters or {}
+        options = InventoryMovement._filter_options_cache.get_or_set(
+            ('filtros', DataVersion.current()), InventoryMovement._load_filter_options
+        )
+        
+        result = {}
+        for name, (table, label, condition, key) in InventoryMovement.FILTER_OPTION_SOURCES.items():
+            items = options[name]
+            selected = filters.get(key)
+            if selected and not any(item['id'] == selected for item in items):
+                query = f"SELECT id, {label} FROM {table} WHERE id = %s"
+                items = list(Database.execute_query(query, (selected,)) or []) + items
+            result[name] = items
+        return result
+    
+    @staticmethod
+    def _load_filter_options():
+        options = {}
+        for name, (table, label, condition, key) in InventoryMovement.FILTER_OPTION_SOURCES.items():
+            query = f"""
+                SELECT id, {label}
+                FROM {table}
+                WHERE {condition}
+                ORDER BY {label}
+                LIMIT %s
+            """
+            options[name] = list(
+                Database.execute_query(query, (InventoryMovement.FILTER_OPTIONS_LIMIT,)) or []
+            )
+        return options
+    
     @staticmethod
     def get_all():
         """Obtener todos los movimientos de inventario"""
@@ -17,6 +95,86 @@ class InventoryMovement:
         """
         return Database.execute_query(query)
     
+    @staticmethod
+    def get_page(after_id=None, page_size=Pagination.DEFAULT_PAGE_SIZE, sort=DEFAULT_SORT,
+                 filters=None):
+        """Obtener una página de movimientos de inventario (paginación por cursor)
+
+        filters admite fecha_desde, fecha_hasta (date), producto_id, almacen_id,
+        tipo_movimiento, usuario_id y referencia (prefijo).
+        """
+        where, params = InventoryMovement._filter_conditions(filters or {})
+        select = """
+            SELECT mi.*, 
+                   p.nombre as producto_nombre,
+                   a.nombre as almacen_nombre,
+                   u.username as usuario_nombre
+            FROM movimientos_inventario mi
+            INNER JOIN productos p ON mi.producto_id = p.id
+            INNER JOIN almacenes a ON mi.almacen_id = a.id
+            INNER JOIN usuarios u ON mi.usuario_id = u.id
+        """
+        if not where:
+            return Pagination.fetch_page(
+                select, 'mi.id', InventoryMovement.SORT_OPTIONS, sort,
+                after_id=after_id, page_size=page_size, table='movimientos_inventario'
+            )
+        
+        page = Pagination.fetch_page(
+            select, 'mi.id', InventoryMovement.SORT_OPTIONS, sort,
+            after_id=after_id, page_size=page_size, where=where, params=params
+        )
+        total, capped = Pagination.count_capped('movimientos_inventario mi', where, params)
+        page['total_estimate'] = total
+        page['total_exact'] = True
+        page['total_capped'] = capped
+        return page
+    
+    @staticmethod
+    def _filter_conditions(filters):
+        """Construye las condiciones WHERE (sargables) para los filtros del ledger"""
+        where = []
+        params = []
+        
+        if filters.get('fecha_desde'):
+            where.append("mi.fecha >= %s")
+            params.append(filters['fecha_desde'])
+        if filters.get('fecha_hasta'):
+            # Rango semiabierto: incluye todo el día de fecha_hasta
+            where.append("mi.fecha < %s")
+            params.append(filters['fecha_hasta'] + timedelta(days=1))
+        
+        for key in ('producto_id', 'almacen_id', 'usuario_id'):
+            if filters.get(key):
+                where.append(f"mi.{key} = %s")
+                params.append(filters[key])
+        
+        if filters.get('tipo_movimiento') in InventoryMovement.TIPOS_MOVIMIENTO:
+            where.append("mi.tipo_movimiento = %s")
+            params.append(filters['tipo_movimiento'])
+        
+        if filters.get('referencia'):
+            # Búsqueda por prefijo para poder usar el índice de referencia
+            referencia = (
+                filters['referencia']
+                .replace('\\', '\\\\')
+                .replace('%', '\\%')
+                .replace('_', '\\_')
+            )
+            where.append("mi.referencia LIKE %s")
+            params.append(referencia + '%')
+        
+        return where, params
+    
+    @staticmethod
+    def create_indexes():
+        """Crea los índices compuestos del ledger de movimientos si no existen"""
+        created = []
+        for name, columns in InventoryMovement.INDEXES.items():
+            if Database.ensure_index('movimientos_inventario', name, columns):
+                created.append(name)
+        return created
+    
     @staticmethod
     def get_by_id(movement_id):
         """Obtener un movimiento por ID"""
@@ -42,30 +200,43 @@ class InventoryMovement:
         return result[0]['total'] if result else 0
     
     @staticmethod
-    def create(data):
-        """Crear un nuevo movimiento de inventario"""
+    def create(data, check_capacity=True):
+        """Crear un nuevo movimiento de inventario y aplicarlo al stock
+
+        check_capacity=False omite el control de capacidad del almacén, para
+        ajustes que corrigen el stock registrado en lugar de recibir mercadería.
+        """
+        if Stock.document_reference(data.get('referencia')):
+            raise ValueError(
+                f"La referencia {data['referencia']} es una venta o compra: su stock lo registra el documento"
+            )
         query = """
             INSERT INTO movimientos_inventario 
             (producto_id, almacen_id, tipo_movimiento, cantidad, usuario_id, referencia, motivo)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
-        return Database.execute_query(
-            query,
-            (
-                data['producto_id'],
-                data['almacen_id'],
-                data['tipo_movimiento'],
-                data['cantidad'],
-                data['usuario_id'],
-                data.get('referencia', ''),
-                data.get('motivo', '')
-            ),
-            fetch=False
-        )
+        with Database.transaction():
+            movement_id = Database.execute_query(
+                query,
+                (
+                    data['producto_id'],
+                    data['almacen_id'],
+                    data['tipo_movimiento'],
+                    data['cantidad'],
+                    data['usuario_id'],
+                    data.get('referencia', ''),
+                    data.get('motivo', '')
+                ),
+                fetch=False
+            )
+            Stock.post_change(
+                {}, Stock.movement_contribution(movement_id), check_capacity=check_capacity
+            )
+        return movement_id
     
     @staticmethod
     def update(movement_id, data):
-        """Actualizar un movimiento de inventario"""
+        """Actualizar un movimiento de inventario compensando su efecto anterior en el stock"""
         query = """
             UPDATE movimientos_inventario
             SET producto_id = %s,
@@ -76,25 +247,35 @@ class InventoryMovement:
                 motivo = %s
             WHERE id = %s
         """
-        return Database.execute_query(
-            query,
-            (
-                data['producto_id'],
-                data['almacen_id'],
-                data['tipo_movimiento'],
-                data['cantidad'],
-                data.get('referencia', ''),
-                data.get('motivo', ''),
-                movement_id
-            ),
-            fetch=False
-        )
+        with Database.transaction():
+            before = Stock.movement_contribution(movement_id)
+            result = Database.execute_query(
+                query,
+                (
+                    data['producto_id'],
+                    data['almacen_id'],
+                    data['tipo_movimiento'],
+                    data['cantidad'],
+                    data.get('referencia', ''),
+                    data.get('motivo', ''),
+                    movement_id
+                ),
+                fetch=False
+            )
+            Stock.post_change(
+                before, Stock.movement_contribution(movement_id), check_capacity=True
+            )
+        return result
     
     @staticmethod
     def delete(movement_id):
-        """Eliminar un movimiento de inventario"""
+        """Eliminar un movimiento de inventario revirtiendo su efecto en el stock"""
         query = "DELETE FROM movimientos_inventario WHERE id = %s"
-        return Database.execute_query(query, (movement_id,), fetch=False)
+        with Database.transaction():
+            before = Stock.movement_contribution(movement_id)
+            result = Database.execute_query(query, (movement_id,), fetch=False)
+            Stock.post_change(before, {})
+        return result
     
     @staticmethod
     def get_by_product(product_id):
@@ -0,0 +1,116 @@
+from config.database import Database
+
+
+class Pagination:
+    """Paginación por cursor (keyset) para los listados"""
+
+    DEFAULT_PAGE_SIZE = 50
+    MAX_PAGE_SIZE = 200
+
+    @staticmethod
+    def from_request(request, sort_options, default_sort):
+        """Lee page_size, after_id y sort de la query string"""
+        try:
+            page_size = int(request.GET.get('page_size', Pagination.DEFAULT_PAGE_SIZE))
+        except (TypeError, ValueError):
+            page_size = Pagination.DEFAULT_PAGE_SIZE
+        page_size = max(1, min(page_size, Pagination.MAX_PAGE_SIZE))
+
+        try:
+            after_id = int(request.GET.get('after_id') or 0) or None
+        except (TypeError, ValueError):
+            after_id = None
+
+        sort = request.GET.get('sort', default_sort)
+        if sort not in sort_options:
+            sort = default_sort
+
+        return {'page_size': page_size, 'after_id': after_id, 'sort': sort}
+
+    @staticmethod
+    def fetch_page(select, id_column, sort_options, sort, after_id=None,
+                   page_size=DEFAULT_PAGE_SIZE, where=None, params=None, table=None):
+        """Obtiene una página de resultados ordenada por la opción de orden elegida
+
+        select: SELECT ... FROM ... JOIN ... sin WHERE ni ORDER BY
+        id_column: columna única de desempate (p. ej. 'v.id')
+        sort_options: {clave: {'column', 'direction', 'lookup', 'label'}}, donde
+            lookup obtiene el valor de la columna de orden para el id del cursor
+        where / params: condiciones adicionales (filtros) unidas con AND
+        table: tabla base para estimar el total de filas
+        """
+        option = sort_options[sort]
+        column = option['column']
+        descending = option.get('direction', 'DESC') == 'DESC'
+        op = '<' if descending else '>'
+        direction = 'DESC' if descending else 'ASC'
+
+        conditions = list(where or [])
+        query_params = list(params or [])
+
+        if after_id:
+            if column == id_column:
+                conditions.append(f"{id_column} {op} %s")
+                query_params.append(after_id)
+            else:
+                lookup = option['lookup']
+                conditions.append(
+                    f"({column} {op} ({lookup}) OR ({column} = ({lookup}) AND {id_column} {op} %s))"
+                )
+                query_params.extend([after_id, after_id, after_id])
+
+        query = select
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+
+        order = f"{column} {direction}"
+        if column != id_column:
+            order += f", {id_column} {direction}"
+        # Pedir una fila extra para saber si hay página siguiente
+        query += f" ORDER BY {order} LIMIT %s"
+        query_params.append(page_size + 1)
+
+        rows = Database.execute_query(query, tuple(query_params)) or []
+        rows = list(rows)
+        has_more = len(rows) > page_size
+        items = rows[:page_size]
+
+        return {
+            'items': items,
+            'page_size': page_size,
+            'sort': sort,
+            'sort_options': sort_options,
+            'after_id': after_id,
+            'next_after_id': items[-1]['id'] if has_more and items else None,
+            'has_more': has_more,
+            'total_estimate': Pagination.estimate_total(table) if table else None,
+        }
+
+    @staticmethod
+    def estimate_total(table):
+        """Estima el total de filas de una tabla desde las estadísticas de InnoDB
+
+        Evita el COUNT(*) exacto, que en InnoDB recorre un índice completo.
+        """
+        query = """
+            SELECT TABLE_ROWS as total
+            FROM information_schema.TABLES
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+        """
+        result = Database.execute_query(query, (table,))
+        return int(result[0]['total'] or 0) if result else 0
+
+    @staticmethod
+    def count_capped(source, where=None, params=None, cap=10000):
+        """Cuenta las filas filtradas deteniéndose en cap para no recorrer toda la tabla
+
+        source: FROM de la consulta (p. ej. 'movimientos_inventario mi')
+        Retorna (total, truncado).
+        """
+        query = f"SELECT 1 FROM {source}"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query = f"SELECT COUNT(*) as total FROM ({query} LIMIT %s) t"
+        result = Database.execute_query(query, tuple(params or []) + (cap + 1,))
+        total = int(result[0]['total']) if result else 0
+        return min(total, cap), total > cap
@@ -1,8 +1,24 @@
 from config.database import Database
+from config.cache import DataVersion
+from app.models.pagination import Pagination
+from app.models.stock import Stock
+from app.models.inventory_movement import InventoryMovement
 
 class Product:
     """Modelo de Producto"""
     
+    # Opciones de orden para el listado paginado
+    SORT_OPTIONS = {
+        'id': {'column': 'p.id', 'direction': 'DESC', 'label': 'Más recientes'},
+        'nombre': {
+            'column': 'p.nombre',
+            'direction': 'ASC',
+            'lookup': 'SELECT nombre FROM productos WHERE id = %s',
+            'label': 'Nombre',
+        },
+    }
+    DEFAULT_SORT = 'id'
+    
     @staticmethod
     def get_all():
         """Obtiene todos los productos activos"""
@@ -15,6 +31,20 @@ class Product:
         """
         return Database.execute_query(query)
     
+    @staticmethod
+    def get_page(after_id=None, page_size=Pagination.DEFAULT_PAGE_SIZE, sort=DEFAULT_SORT):
+        """Obtiene una página de productos activos (paginación por cursor)"""
+        select = """
+            SELECT p.*, c.nombre as categoria
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+        """
+        return Pagination.fetch_page(
+            select, 'p.id', Product.SORT_OPTIONS, sort,
+            after_id=after_id, page_size=page_size,
+            where=['p.activo = 1'], table='productos'
+        )
+    
     @staticmethod
     def get_by_id(product_id):
         """Obtiene un producto por ID"""
@@ -35,12 +65,12 @@ class Product:
     
     @staticmethod
     def create(data):
-        """Crea un nuevo producto"""
+        """Crea un nuevo producto; el stock inicial entra como ajuste de inventario"""
         query = """
             INSERT INTO wms_management_system.productos 
             (codigo, nombre, descripcion, categoria_id, precio_compra, precio_venta, 
              stock_minimo, stock_actual, proveedor_id, activo)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, 0, %s, %s)
         """
         params = (
             data['codigo'],
@@ -50,15 +80,42 @@ class Product:
             data['precio_compra'],
             data['precio_venta'],
             data.get('stock_minimo', 10),
-            data.get('stock_actual', 0),
             data.get('proveedor_id', None),
             data.get('activo', 1)
         )
-        return Database.execute_query(query, params, fetch=False)
+        with Database.transaction():
+            result = Database.execute_query(query, params, fetch=False)
+            Product.adjust_stock(result, 0, data.get('stock_actual', 0), data.get('usuario_id'), 'Stock inicial')
+        DataVersion.bump()
+        return result
+    
+    @staticmethod
+    def adjust_stock(product_id, current, target, usuario_id, motivo):
+        """Lleva el stock del producto a target con un movimiento de ajuste en el almacén por defecto
+
+        El stock nunca se escribe directo: el ajuste pasa por el ledger y
+        actualiza stock_almacen y productos.stock_actual. Corrige el stock
+        registrado, así que no se controla la capacidad del almacén. Retorna
+        el id del movimiento o None si no hay diferencia.
+        """
+        delta = int(target or 0) - int(current or 0)
+        if not delta:
+            return None
+        if not usuario_id:
+            raise ValueError("Se requiere el usuario para registrar el ajuste de stock")
+        return InventoryMovement.create({
+            'producto_id': product_id,
+            'almacen_id': Stock.default_warehouse_id(),
+            'tipo_movimiento': 'ajuste',
+            'cantidad': delta,
+            'usuario_id': usuario_id,
+            'referencia': f'PROD-{product_id}',
+            'motivo': motivo,
+        }, check_capacity=False)
     
     @staticmethod
     def update(product_id, data):
-        """Actualiza un producto existente"""
+        """Actualiza un producto existente; un cambio de stock se registra como ajuste"""
         query = """
             UPDATE wms_management_system.productos 
             SET codigo = %s, 
@@ -68,7 +125,6 @@ class Product:
                 precio_compra = %s, 
                 precio_venta = %s,
                 stock_minimo = %s, 
-                stock_actual = %s, 
                 proveedor_id = %s, 
                 activo = %s
             WHERE id = %s
@@ -81,18 +137,46 @@ class Product:
             data['precio_compra'],
             data['precio_venta'],
             data.get('stock_minimo', 10),
-            data.get('stock_actual', 0),
             data.get('proveedor_id', None),
             data.get('activo', 1),
             product_id
         )
-        return Database.execute_query(query, params, fetch=False)
+        with Database.transaction():
+            result = Database.execute_query(query, params, fetch=False)
+            if data.get('stock_actual') not in (None, ''):
+                current = Database.execute_query(
+                    "SELECT stock_actual FROM productos WHERE id = %s FOR UPDATE", (product_id,)
+                )
+                if current:
+                    Product.adjust_stock(
+                        product_id, current[0]['stock_actual'], data['stock_actual'],
+                        data.get('usuario_id'), 'Ajuste desde la edición del producto'
+                    )
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def delete(product_id):
         """Elimina un producto (soft delete cambiando activo a 0)"""
         query = "UPDATE wms_management_system.productos SET activo = 0 WHERE id = %s"
-        return Database.execute_query(query, (product_id,), fetch=False)
+        result = Database.execute_query(query, (product_id,), fetch=False)
+        DataVersion.bump()
+        return result
+    
+    @staticmethod
+    def search(term, limit=10):
+        """Busca productos activos por nombre o código"""
+        query = """
+            SELECT p.id, p.codigo, p.nombre, p.precio_venta, p.stock_actual,
+                   c.nombre as categoria
+            FROM productos p
+            LEFT JOIN categorias c ON p.categoria_id = c.id
+            WHERE p.activo = 1 AND (p.nombre LIKE %s OR p.codigo LIKE %s)
+            ORDER BY p.nombre
+            LIMIT %s
+        """
+        pattern = f"%{term}%"
+        return Database.execute_query(query, (pattern, pattern, limit))
     
     @staticmethod
     def get_low_stock(limit=10):
@@ -1,6 +1,31 @@
 from config.database import Database
+from app.models.pagination import Pagination
+from app.models.stock import Stock
+from app.models.rollup import Rollup
 
 class Purchase:
+    # Índices para las consultas por fecha y por líneas de una compra
+    INDEXES = {
+        'idx_compras_fecha': 'fecha',
+    }
+    DETAIL_INDEXES = {
+        'idx_detalle_compras_compra_producto': 'compra_id, producto_id',
+    }
+    
+    # Opciones de orden para el listado paginado de detalles
+    DETAIL_SORT_OPTIONS = {
+        'fecha': {
+            'column': 'c.fecha',
+            'direction': 'DESC',
+            'lookup': (
+                'SELECT c2.fecha FROM detalle_compras dc2 '
+                'INNER JOIN compras c2 ON dc2.compra_id = c2.id WHERE dc2.id = %s'
+            ),
+            'label': 'Fecha de compra',
+        },
+        'id': {'column': 'dc.id', 'direction': 'DESC', 'label': 'Más recientes'},
+    }
+    
     @staticmethod
     def get_all(limit=None):
         """Obtener todas las compras con información del proveedor y usuario"""
@@ -39,52 +64,75 @@ class Purchase:
         result = Database.execute_query(query)
         return result[0]['total'] if result else 0
     
+    @staticmethod
+    def posting_state(purchase_id):
+        """Lo que una compra aporta al stock y a los resúmenes (vacío si no existe)"""
+        return {
+            'stock': Stock.purchase_contribution(purchase_id),
+            'resumen': Rollup.snapshot(Rollup.COMPRA, purchase_id),
+        }
+    
+    @staticmethod
+    def post_changes(before, purchase_id):
+        """Aplica a stock y resúmenes la diferencia entre before y el estado actual de la compra
+
+        Como las entradas de inventario, una compra que no cabe en el almacén se rechaza.
+        """
+        after = Purchase.posting_state(purchase_id)
+        Stock.post_change(before['stock'], after['stock'], check_capacity=True)
+        Rollup.post_change(Rollup.COMPRA, before['resumen'], after['resumen'])
+    
     @staticmethod
     def create(data, details):
         """Crear una nueva compra con sus detalles"""
-        # Insertar la compra
-        query = """
-            INSERT INTO compras (numero_factura, proveedor_id, usuario_id, fecha, total, estado, notas)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-        """
-        purchase_id = Database.execute_query(
-            query,
-            (
-                data['numero_factura'],
-                data['proveedor_id'],
-                data['usuario_id'],
-                data['fecha'],
-                data['total'],
-                data.get('estado', 'pendiente'),
-                data.get('notas', '')
-            ),
-            fetch=False
-        )
-        
-        # Insertar los detalles de la compra
-        if purchase_id and details:
-            detail_query = """
-                INSERT INTO detalle_compras (compra_id, producto_id, cantidad, precio_unitario, subtotal)
-                VALUES (%s, %s, %s, %s, %s)
+        with Database.transaction():
+            # Insertar la compra
+            query = """
+                INSERT INTO compras (numero_factura, proveedor_id, usuario_id, fecha, total, estado, notas)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
-            for detail in details:
-                Database.execute_query(
+            purchase_id = Database.execute_query(
+                query,
+                (
+                    data['numero_factura'],
+                    data['proveedor_id'],
+                    data['usuario_id'],
+                    data['fecha'],
+                    data['total'],
+                    data.get('estado', 'pendiente'),
+                    data.get('notas', '')
+                ),
+                fetch=False
+            )
+        
+            # Insertar los detalles de la compra
+            if purchase_id and details:
+                detail_query = """
+                    INSERT INTO detalle_compras (compra_id, producto_id, cantidad, precio_unitario, subtotal)
+                    VALUES (%s, %s, %s, %s, %s)
+                """
+                Database.execute_many(
                     detail_query,
-                    (
-                        purchase_id,
-                        detail['producto_id'],
-                        detail['cantidad'],
-                        detail['precio_unitario'],
-                        detail['subtotal']
-                    ),
-                    fetch=False
+                    [
+                        (
+                            purchase_id,
+                            detail['producto_id'],
+                            detail['cantidad'],
+                            detail['precio_unitario'],
+                            detail['subtotal']
+                        )
+                        for detail in details
+                    ]
                 )
+            
+            # Registrar en stock (si está completada) y en los resúmenes
+            Purchase.post_changes(Purchase.posting_state(None), purchase_id)
         
         return purchase_id
     
     @staticmethod
     def update(purchase_id, data):
-        """Actualizar una compra"""
+        """Actualizar una compra (un cambio de estado aplica o revierte su stock)"""
         query = """
             UPDATE compras
             SET numero_factura = %s,
@@ -95,30 +143,41 @@ class Purchase:
                 notas = %s
             WHERE id = %s
         """
-        return Database.execute_query(
-            query,
-            (
-                data['numero_factura'],
-                data['proveedor_id'],
-                data['fecha'],
-                data['total'],
-                data['estado'],
-                data.get('notas', ''),
-                purchase_id
-            ),
-            fetch=False
-        )
+        with Database.transaction():
+            before = Purchase.posting_state(purchase_id)
+            result = Database.execute_query(
+                query,
+                (
+                    data['numero_factura'],
+                    data['proveedor_id'],
+                    data['fecha'],
+                    data['total'],
+                    data['estado'],
+                    data.get('notas', ''),
+                    purchase_id
+                ),
+                fetch=False
+            )
+            Purchase.post_changes(before, purchase_id)
+        return result
     
     @staticmethod
     def delete(purchase_id):
         """Eliminar una compra y sus detalles"""
-        # Primero eliminar los detalles
-        detail_query = "DELETE FROM detalle_compras WHERE compra_id = %s"
-        Database.execute_query(detail_query, (purchase_id,), fetch=False)
+        with Database.transaction():
+            before = Purchase.posting_state(purchase_id)
+            
+            # Primero eliminar los detalles
+            detail_query = "DELETE FROM detalle_compras WHERE compra_id = %s"
+            Database.execute_query(detail_query, (purchase_id,), fetch=False)
         
-        # Luego eliminar la compra
-        query = "DELETE FROM compras WHERE id = %s"
-        return Database.execute_query(query, (purchase_id,), fetch=False)
+            # Luego eliminar la compra
+            query = "DELETE FROM compras WHERE id = %s"
+            result = Database.execute_query(query, (purchase_id,), fetch=False)
+            
+            # Revertir en stock y resúmenes lo que aportaba la compra
+            Purchase.post_changes(before, purchase_id)
+            return result
     
     @staticmethod
     def get_details(purchase_id):
@@ -132,31 +191,56 @@ class Purchase:
         """
         return Database.execute_query(query, (purchase_id,))
     
+    @staticmethod
+    def get_details_page(after_id=None, page_size=Pagination.DEFAULT_PAGE_SIZE, sort='fecha'):
+        """Obtener una página de los detalles de todas las compras (paginación por cursor)"""
+        select = """
+            SELECT dc.*, 
+                   p.nombre as producto_nombre,
+                   c.numero_factura,
+                   c.fecha as fecha_compra,
+                   pr.nombre as proveedor_nombre
+            FROM detalle_compras dc
+            INNER JOIN productos p ON dc.producto_id = p.id
+            INNER JOIN compras c ON dc.compra_id = c.id
+            INNER JOIN proveedores pr ON c.proveedor_id = pr.id
+        """
+        return Pagination.fetch_page(
+            select, 'dc.id', Purchase.DETAIL_SORT_OPTIONS, sort,
+            after_id=after_id, page_size=page_size, table='detalle_compras'
+        )
+    
     @staticmethod
     def update_details(purchase_id, details):
         """Actualizar los detalles de una compra"""
-        # Eliminar detalles existentes
-        delete_query = "DELETE FROM detalle_compras WHERE compra_id = %s"
-        Database.execute_query(delete_query, (purchase_id,), fetch=False)
+        with Database.transaction():
+            before = Purchase.posting_state(purchase_id)
+            
+            # Eliminar detalles existentes
+            delete_query = "DELETE FROM detalle_compras WHERE compra_id = %s"
+            Database.execute_query(delete_query, (purchase_id,), fetch=False)
         
-        # Insertar nuevos detalles
-        if details:
-            insert_query = """
-                INSERT INTO detalle_compras (compra_id, producto_id, cantidad, precio_unitario, subtotal)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            for detail in details:
-                Database.execute_query(
+            # Insertar nuevos detalles
+            if details:
+                insert_query = """
+                    INSERT INTO detalle_compras (compra_id, producto_id, cantidad, precio_unitario, subtotal)
+                    VALUES (%s, %s, %s, %s, %s)
+                """
+                Database.execute_many(
                     insert_query,
-                    (
-                        purchase_id,
-                        detail['producto_id'],
-                        detail['cantidad'],
-                        detail['precio_unitario'],
-                        detail['subtotal']
-                    ),
-                    fetch=False
+                    [
+                        (
+                            purchase_id,
+                            detail['producto_id'],
+                            detail['cantidad'],
+                            detail['precio_unitario'],
+                            detail['subtotal']
+                        )
+                        for detail in details
+                    ]
                 )
+            
+            Purchase.post_changes(before, purchase_id)
         return True
     
     @staticmethod
@@ -165,8 +249,17 @@ class Purchase:
         query = """
             SELECT COALESCE(SUM(total), 0) as total
             FROM compras
-            WHERE MONTH(fecha) = MONTH(CURRENT_DATE())
-            AND YEAR(fecha) = YEAR(CURRENT_DATE())
+            WHERE fecha >= %s AND fecha < %s
         """
-        result = Database.execute_query(query, fetch=True)
+        result = Database.execute_query(query, Rollup.month_range(), fetch=True)
         return result[0]['total'] if result else 0
+    
+    @staticmethod
+    def create_indexes():
+        """Crea los índices de compras y detalle_compras si no existen"""
+        created = []
+        for table, indexes in (('compras', Purchase.INDEXES), ('detalle_compras', Purchase.DETAIL_INDEXES)):
+            for name, columns in indexes.items():
+                if Database.ensure_index(table, name, columns):
+                    created.append(name)
+        return created
@@ -1,24 +1,30 @@
+from datetime import date
 from config.database import Database
+from app.models.rollup import Rollup
 
 class Report:
     """Modelo para generación de reportes y estadísticas"""
     
     @staticmethod
     def ventas_por_mes():
-        """Obtiene las ventas totales por mes del año actual"""
+        """Obtiene las ventas totales por mes del año actual (desde resumen_mensual)"""
+        inicio = date.today().replace(month=1, day=1)
+        fin = inicio.replace(year=inicio.year + 1)
         query = """
             SELECT 
-                MONTH(fecha) as mes,
-                MONTHNAME(fecha) as nombre_mes,
-                COUNT(*) as total_ventas,
-                SUM(total) as monto_total
-            FROM wms_management_system.ventas
-            WHERE YEAR(fecha) = YEAR(CURRENT_DATE())
-            AND estado = 'completada'
-            GROUP BY MONTH(fecha), MONTHNAME(fecha)
-            ORDER BY mes
+                MONTH(r.mes) as mes,
+                MONTHNAME(r.mes) as nombre_mes,
+                SUM(r.cantidad) as total_ventas,
+                SUM(r.total) as monto_total
+            FROM wms_management_system.resumen_mensual r
+            WHERE r.documento = 'venta'
+            AND r.estado = 'completada'
+            AND r.mes >= %s AND r.mes < %s
+            GROUP BY r.mes
+            HAVING total_ventas > 0
+            ORDER BY r.mes
         """
-        return Database.execute_query(query)
+        return Database.execute_query(query, (inicio, fin))
     
     @staticmethod
     def productos_mas_vendidos(limit=10):
@@ -41,15 +47,7 @@ class Report:
     @staticmethod
     def ventas_por_estado():
         """Obtiene el resumen de ventas por estado"""
-        query = """
-            SELECT 
-                estado,
-                COUNT(*) as cantidad,
-                SUM(total) as monto_total
-            FROM wms_management_system.ventas
-            GROUP BY estado
-        """
-        return Database.execute_query(query)
+        return Rollup.by_estado(Rollup.VENTA)
     
     @staticmethod
     def clientes_frecuentes(limit=10):
@@ -89,14 +87,15 @@ class Report:
         """Obtiene un resumen general del sistema"""
         query = """
             SELECT 
-                (SELECT COUNT(*) FROM wms_management_system.ventas WHERE estado = 'completada') as total_ventas_completadas,
+                (SELECT COALESCE(SUM(cantidad), 0) FROM wms_management_system.resumen_mensual
+                 WHERE documento = 'venta' AND estado = 'completada') as total_ventas_completadas,
                 (SELECT COUNT(*) FROM wms_management_system.productos) as total_productos,
                 (SELECT COUNT(*) FROM wms_management_system.clientes WHERE activo = 1) as total_clientes_activos,
-                (SELECT COALESCE(SUM(total), 0) FROM wms_management_system.ventas WHERE estado = 'completada') as ingresos_totales,
-                (SELECT COALESCE(SUM(total), 0) FROM wms_management_system.ventas 
-                 WHERE estado = 'completada' 
-                 AND MONTH(fecha) = MONTH(CURRENT_DATE())
-                 AND YEAR(fecha) = YEAR(CURRENT_DATE())) as ingresos_mes_actual
+                (SELECT COALESCE(SUM(total), 0) FROM wms_management_system.resumen_mensual
+                 WHERE documento = 'venta' AND estado = 'completada') as ingresos_totales,
+                (SELECT COALESCE(SUM(total), 0) FROM wms_management_system.resumen_mensual
+                 WHERE documento = 'venta' AND estado = 'completada'
+                 AND mes = %s) as ingresos_mes_actual
         """
-        result = Database.execute_query(query)
+        result = Database.execute_query(query, (Rollup.month_start(date.today()),))
         return result[0] if result else {}
@@ -0,0 +1,146 @@
+from collections import defaultdict
+from datetime import date
+from config.database import Database
+
+
+class Rollup:
+    """Resúmenes diarios y mensuales de ventas y compras por estado
+
+    resumen_diario y resumen_mensual guardan, por documento ('venta' o
+    'compra'), fecha/mes y estado, el número de documentos y su total. Se
+    mantienen de forma incremental con la misma técnica que Stock: se toma
+    la foto de la cabecera antes y después de cada escritura y se aplica la
+    diferencia. Los reportes y el dashboard leen de aquí en lugar de agrupar
+    las tablas completas de ventas y compras.
+    """
+
+    VENTA = 'venta'
+    COMPRA = 'compra'
+
+    # Tabla de cabeceras de cada tipo de documento
+    TABLES = {VENTA: 'ventas', COMPRA: 'compras'}
+
+    @staticmethod
+    def create_tables():
+        """Crea las tablas de resúmenes si no existen"""
+        for table, period in (('resumen_diario', 'fecha'), ('resumen_mensual', 'mes')):
+            Database.execute_query(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    documento ENUM('venta', 'compra') NOT NULL,
+                    {period} DATE NOT NULL,
+                    estado VARCHAR(20) NOT NULL DEFAULT '',
+                    cantidad INT NOT NULL DEFAULT 0,
+                    total DECIMAL(14,2) NOT NULL DEFAULT 0,
+                    PRIMARY KEY (documento, {period}, estado)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+            """, fetch=False)
+        Database.bump_schema_version()
+
+    @staticmethod
+    def month_start(day):
+        """Primer día del mes de una fecha"""
+        return day.replace(day=1)
+
+    @staticmethod
+    def month_range(day=None):
+        """Rango semiabierto [inicio, fin) del mes de una fecha (hoy por defecto)
+
+        Filtrar con fecha >= inicio AND fecha < fin permite usar los índices
+        sobre fecha, a diferencia de MONTH(fecha) / YEAR(fecha).
+        """
+        inicio = Rollup.month_start(day or date.today())
+        if inicio.month == 12:
+            fin = inicio.replace(year=inicio.year + 1, month=1)
+        else:
+            fin = inicio.replace(month=inicio.month + 1)
+        return inicio, fin
+
+    @staticmethod
+    def snapshot(documento, document_id):
+        """Fecha, estado y total actuales de una venta o compra (None si no existe)"""
+        if not document_id:
+            return None
+        query = f"SELECT fecha, estado, total FROM {Rollup.TABLES[documento]} WHERE id = %s"
+        result = Database.execute_query(query, (document_id,))
+        return result[0] if result else None
+
+    @staticmethod
+    def post_change(documento, before, after):
+        """Aplica a los resúmenes la diferencia entre dos fotos de un documento"""
+        deltas = defaultdict(lambda: [0, 0])
+        for row, sign in ((before, -1), (after, 1)):
+            if not row:
+                continue
+            key = (row['fecha'], row['estado'] or '')
+            deltas[key][0] += sign
+            deltas[key][1] += sign * (row['total'] or 0)
+        Rollup.apply_deltas(documento, deltas)
+
+    @staticmethod
+    def apply_deltas(documento, deltas):
+        """Suma deltas {(fecha, estado): [cantidad, total]} a los resúmenes diario y mensual"""
+        daily = sorted(
+            (documento, fecha, estado, cantidad, total)
+            for (fecha, estado), (cantidad, total) in deltas.items()
+            if cantidad or total
+        )
+        if not daily:
+            return
+
+        monthly = defaultdict(lambda: [0, 0])
+        for _, fecha, estado, cantidad, total in daily:
+            key = (Rollup.month_start(fecha), estado)
+            monthly[key][0] += cantidad
+            monthly[key][1] += total
+
+        upsert = """
+            INSERT INTO {table} (documento, {period}, estado, cantidad, total)
+            VALUES (%s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE
+                cantidad = cantidad + VALUES(cantidad),
+                total = total + VALUES(total)
+        """
+        with Database.transaction():
+            Database.execute_many(
+                upsert.format(table='resumen_diario', period='fecha'), daily
+            )
+            Database.execute_many(
+                upsert.format(table='resumen_mensual', period='mes'),
+                sorted(
+                    (documento, mes, estado, cantidad, total)
+                    for (mes, estado), (cantidad, total) in monthly.items()
+                    if cantidad or total
+                )
+            )
+
+    @staticmethod
+    def rebuild():
+        """Recalcula todos los resúmenes desde ventas y compras"""
+        with Database.transaction():
+            Database.execute_query("DELETE FROM resumen_diario", fetch=False)
+            Database.execute_query("DELETE FROM resumen_mensual", fetch=False)
+            for documento, table in Rollup.TABLES.items():
+                Database.execute_query(f"""
+                    INSERT INTO resumen_diario (documento, fecha, estado, cantidad, total)
+                    SELECT %s, fecha, COALESCE(estado, ''), COUNT(*), COALESCE(SUM(total), 0)
+                    FROM {table}
+                    GROUP BY fecha, COALESCE(estado, '')
+                """, (documento,), fetch=False)
+            Database.execute_query("""
+                INSERT INTO resumen_mensual (documento, mes, estado, cantidad, total)
+                SELECT documento, DATE_FORMAT(fecha, '%%Y-%%m-01'), estado, SUM(cantidad), SUM(total)
+                FROM resumen_diario
+                GROUP BY documento, DATE_FORMAT(fecha, '%%Y-%%m-01'), estado
+            """, fetch=False)
+
+    @staticmethod
+    def by_estado(documento):
+        """Número de documentos y total histórico por estado"""
+        query = """
+            SELECT estado, SUM(cantidad) as cantidad, SUM(total) as monto_total
+            FROM resumen_mensual
+            WHERE documento = %s
+            GROUP BY estado
+            HAVING cantidad <> 0
+        """
+        return Database.execute_query(query, (documento,))
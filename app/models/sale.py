@@ -1,8 +1,51 @@
 from config.database import Database
+from app.models.pagination import Pagination
+from app.models.stock import Stock
+from app.models.rollup import Rollup
 
 class Sale:
     """Modelo de Venta"""
     
+    # Opciones de orden para el listado paginado
+    SORT_OPTIONS = {
+        'fecha': {
+            'column': 'v.fecha',
+            'direction': 'DESC',
+            'lookup': 'SELECT fecha FROM ventas WHERE id = %s',
+            'label': 'Fecha',
+        },
+        'id': {'column': 'v.id', 'direction': 'DESC', 'label': 'Más recientes'},
+        'total': {
+            'column': 'v.total',
+            'direction': 'DESC',
+            'lookup': 'SELECT total FROM ventas WHERE id = %s',
+            'label': 'Mayor total',
+        },
+    }
+    DEFAULT_SORT = 'fecha'
+    
+    # Índices para las consultas por estado y fecha y por líneas de una venta
+    INDEXES = {
+        'idx_ventas_estado_fecha': 'estado, fecha',
+    }
+    DETAIL_INDEXES = {
+        'idx_detalle_ventas_venta_producto': 'venta_id, producto_id',
+    }
+    
+    # Opciones de orden para el listado paginado de detalles
+    DETAIL_SORT_OPTIONS = {
+        'fecha': {
+            'column': 'v.fecha',
+            'direction': 'DESC',
+            'lookup': (
+                'SELECT v2.fecha FROM detalle_ventas dv2 '
+                'INNER JOIN ventas v2 ON dv2.venta_id = v2.id WHERE dv2.id = %s'
+            ),
+            'label': 'Fecha de venta',
+        },
+        'id': {'column': 'dv.id', 'direction': 'DESC', 'label': 'Más recientes'},
+    }
+    
     @staticmethod
     def get_all(limit=None):
         """Obtiene todas las ventas con información del cliente"""
@@ -26,6 +69,48 @@ class Sale:
             query += f" LIMIT {limit}"
         return Database.execute_query(query)
     
+    @staticmethod
+    def get_page(after_id=None, page_size=Pagination.DEFAULT_PAGE_SIZE, sort=DEFAULT_SORT):
+        """Obtiene una página de ventas con información del cliente (paginación por cursor)"""
+        select = """
+            SELECT 
+                v.id,
+                v.numero_factura,
+                v.fecha,
+                v.total,
+                v.estado,
+                v.tipo_pago,
+                c.nombre as cliente_nombre,
+                c.documento as cliente_documento,
+                u.username as vendedor
+            FROM wms_management_system.ventas v
+            INNER JOIN wms_management_system.clientes c ON v.cliente_id = c.id
+            INNER JOIN wms_management_system.usuarios u ON v.usuario_id = u.id
+        """
+        return Pagination.fetch_page(
+            select, 'v.id', Sale.SORT_OPTIONS, sort,
+            after_id=after_id, page_size=page_size, table='ventas'
+        )
+    
+    @staticmethod
+    def get_details_page(after_id=None, page_size=Pagination.DEFAULT_PAGE_SIZE, sort='fecha'):
+        """Obtiene una página de los detalles de todas las ventas (paginación por cursor)"""
+        select = """
+            SELECT dv.*, 
+                   p.nombre as producto_nombre,
+                   v.numero_factura,
+                   v.fecha as fecha_venta,
+                   c.nombre as cliente_nombre
+            FROM detalle_ventas dv
+            INNER JOIN productos p ON dv.producto_id = p.id
+            INNER JOIN ventas v ON dv.venta_id = v.id
+            INNER JOIN clientes c ON v.cliente_id = c.id
+        """
+        return Pagination.fetch_page(
+            select, 'dv.id', Sale.DETAIL_SORT_OPTIONS, sort,
+            after_id=after_id, page_size=page_size, table='detalle_ventas'
+        )
+    
     @staticmethod
     def get_by_id(sale_id):
         """Obtiene una venta por su ID"""
@@ -57,13 +142,22 @@ class Sale:
         query = """
             SELECT COALESCE(SUM(total), 0) as total
             FROM wms_management_system.ventas
-            WHERE MONTH(fecha) = MONTH(CURRENT_DATE())
-            AND YEAR(fecha) = YEAR(CURRENT_DATE())
-            AND estado = 'completada'
+            WHERE estado = 'completada'
+            AND fecha >= %s AND fecha < %s
         """
-        result = Database.execute_query(query)
+        result = Database.execute_query(query, Rollup.month_range())
         return result[0]['total'] if result else 0
     
+    @staticmethod
+    def create_indexes():
+        """Crea los índices de ventas y detalle_ventas si no existen"""
+        created = []
+        for table, indexes in (('ventas', Sale.INDEXES), ('detalle_ventas', Sale.DETAIL_INDEXES)):
+            for name, columns in indexes.items():
+                if Database.ensure_index(table, name, columns):
+                    created.append(name)
+        return created
+    
     @staticmethod
     def get_details(sale_id):
         """Obtiene los detalles de una venta"""
@@ -78,6 +172,21 @@ class Sale:
         """
         return Database.execute_query(query, (sale_id,))
     
+    @staticmethod
+    def posting_state(sale_id):
+        """Lo que una venta aporta al stock y a los resúmenes (vacío si no existe)"""
+        return {
+            'stock': Stock.sale_contribution(sale_id),
+            'resumen': Rollup.snapshot(Rollup.VENTA, sale_id),
+        }
+    
+    @staticmethod
+    def post_changes(before, sale_id):
+        """Aplica a stock y resúmenes la diferencia entre before y el estado actual de la venta"""
+        after = Sale.posting_state(sale_id)
+        Stock.post_change(before['stock'], after['stock'])
+        Rollup.post_change(Rollup.VENTA, before['resumen'], after['resumen'])
+    
     @staticmethod
     def create(data, details):
         """Crea una nueva venta con sus detalles"""
@@ -98,25 +207,31 @@ class Sale:
             data.get('notas', '')
         )
         
-        # Ejecutar y obtener el ID insertado (lastrowid)
-        venta_id = Database.execute_query(query_venta, params_venta, fetch=False)
-        
-        # Insertar los detalles
-        query_detalle = """
-            INSERT INTO wms_management_system.detalle_ventas 
-            (venta_id, producto_id, cantidad, precio_unitario, subtotal)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        
-        for detail in details:
-            params_detalle = (
-                venta_id,
-                detail['producto_id'],
-                detail['cantidad'],
-                detail['precio_unitario'],
-                detail['subtotal']
-            )
-            Database.execute_query(query_detalle, params_detalle, fetch=False)
+        with Database.transaction():
+            # Ejecutar y obtener el ID insertado (lastrowid)
+            venta_id = Database.execute_query(query_venta, params_venta, fetch=False)
+            
+            # Insertar los detalles
+            query_detalle = """
+                INSERT INTO wms_management_system.detalle_ventas 
+                (venta_id, producto_id, cantidad, precio_unitario, subtotal)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            
+            params_detalle = [
+                (
+                    venta_id,
+                    detail['producto_id'],
+                    detail['cantidad'],
+                    detail['precio_unitario'],
+                    detail['subtotal']
+                )
+                for detail in details
+            ]
+            Database.execute_many(query_detalle, params_detalle)
+            
+            # Registrar en stock (si está completada) y en los resúmenes
+            Sale.post_changes(Sale.posting_state(None), venta_id)
         
         return venta_id
     
@@ -145,39 +260,53 @@ class Sale:
             data.get('notas', ''),
             sale_id
         )
-        Database.execute_query(query_venta, params_venta, fetch=False)
-        
-        # Eliminar detalles anteriores
-        query_delete = "DELETE FROM wms_management_system.detalle_ventas WHERE venta_id = %s"
-        Database.execute_query(query_delete, (sale_id,), fetch=False)
-        
-        # Insertar nuevos detalles
-        query_detalle = """
-            INSERT INTO wms_management_system.detalle_ventas 
-            (venta_id, producto_id, cantidad, precio_unitario, subtotal)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        
-        for detail in details:
-            params_detalle = (
-                sale_id,
-                detail['producto_id'],
-                detail['cantidad'],
-                detail['precio_unitario'],
-                detail['subtotal']
-            )
-            Database.execute_query(query_detalle, params_detalle, fetch=False)
+        with Database.transaction():
+            before = Sale.posting_state(sale_id)
+            Database.execute_query(query_venta, params_venta, fetch=False)
+            
+            # Eliminar detalles anteriores
+            query_delete = "DELETE FROM wms_management_system.detalle_ventas WHERE venta_id = %s"
+            Database.execute_query(query_delete, (sale_id,), fetch=False)
+            
+            # Insertar nuevos detalles
+            query_detalle = """
+                INSERT INTO wms_management_system.detalle_ventas 
+                (venta_id, producto_id, cantidad, precio_unitario, subtotal)
+                VALUES (%s, %s, %s, %s, %s)
+            """
+            
+            params_detalle = [
+                (
+                    sale_id,
+                    detail['producto_id'],
+                    detail['cantidad'],
+                    detail['precio_unitario'],
+                    detail['subtotal']
+                )
+                for detail in details
+            ]
+            Database.execute_many(query_detalle, params_detalle)
+            
+            # Aplicar a stock y resúmenes la diferencia entre la venta anterior y la nueva
+            Sale.post_changes(before, sale_id)
         
         return True
     
     @staticmethod
     def delete(sale_id):
         """Elimina una venta y sus detalles"""
-        # Eliminar detalles
-        query_detalle = "DELETE FROM wms_management_system.detalle_ventas WHERE venta_id = %s"
-        Database.execute_query(query_detalle, (sale_id,), fetch=False)
-        
-        # Eliminar venta
-        query_venta = "DELETE FROM wms_management_system.ventas WHERE id = %s"
-        return Database.execute_query(query_venta, (sale_id,), fetch=False)
+        with Database.transaction():
+            before = Sale.posting_state(sale_id)
+            
+            # Eliminar detalles
+            query_detalle = "DELETE FROM wms_management_system.detalle_ventas WHERE venta_id = %s"
+            Database.execute_query(query_detalle, (sale_id,), fetch=False)
+            
+            # Eliminar venta
+            query_venta = "DELETE FROM wms_management_system.ventas WHERE id = %s"
+            result = Database.execute_query(query_venta, (sale_id,), fetch=False)
+            
+            # Revertir en stock y resúmenes lo que aportaba la venta
+            Sale.post_changes(before, sale_id)
+            return result
 
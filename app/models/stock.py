@@ -0,0 +1,421 @@
+import os
+from collections import defaultdict
+from config.database import Database
+from config.cache import DataVersion
+
+
+class Stock:
+    """Saldos de stock por almacén y producto mantenidos a partir del ledger
+
+    Cada escritura sobre movimientos, ventas o compras calcula la contribución
+    al stock del documento antes y después del cambio y aplica la diferencia
+    como delta en stock_almacen y productos.stock_actual, dentro de la misma
+    transacción. Las ediciones y eliminaciones quedan así como deltas
+    compensatorios.
+
+    Las ventas y compras son la única fuente de su stock: un movimiento cuya
+    referencia es el número de factura de una venta o compra solo la
+    documenta y no entra al ledger (ni a sus saldos).
+    """
+
+    # Estado a partir del cual una venta o compra mueve stock
+    ESTADO_CONTABILIZADO = 'completada'
+
+    # Condición sobre movimientos_inventario (alias mi) de los movimientos que cuentan en el ledger
+    MOVIMIENTO_SIN_DOCUMENTO = """
+        NOT EXISTS (SELECT 1 FROM ventas dv_doc WHERE dv_doc.numero_factura = mi.referencia)
+        AND NOT EXISTS (SELECT 1 FROM compras dc_doc WHERE dc_doc.numero_factura = mi.referencia)
+    """
+
+    # Referencia de los ajustes que registran el stock cargado antes del ledger
+    REFERENCIA_SALDO_INICIAL = 'SALDO-INICIAL'
+
+    _default_warehouse_id = None
+
+    @staticmethod
+    def create_table():
+        """Crea la tabla stock_almacen si no existe"""
+        query = """
+            CREATE TABLE IF NOT EXISTS stock_almacen (
+                almacen_id INT NOT NULL,
+                producto_id INT NOT NULL,
+                cantidad INT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (almacen_id, producto_id),
+                KEY idx_stock_almacen_producto (producto_id)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci
+        """
+        Database.execute_query(query, fetch=False)
+        Database.bump_schema_version()
+
+    @staticmethod
+    def default_warehouse_id():
+        """Almacén al que se imputan ventas y compras (no tienen almacén propio)"""
+        if Stock._default_warehouse_id is None:
+            configured = os.getenv('STOCK_DEFAULT_ALMACEN_ID')
+            if configured:
+                Stock._default_warehouse_id = int(configured)
+            else:
+                result = Database.execute_query(
+                    "SELECT MIN(id) as id FROM almacenes WHERE activo = 1"
+                )
+                Stock._default_warehouse_id = result[0]['id'] if result and result[0]['id'] else 1
+        return Stock._default_warehouse_id
+
+    @staticmethod
+    def movement_delta(tipo_movimiento, cantidad):
+        """Delta de stock de un movimiento: las salidas restan, entradas y ajustes suman"""
+        cantidad = int(cantidad)
+        return -cantidad if tipo_movimiento == 'salida' else cantidad
+
+    @staticmethod
+    def movement_contribution(movement_id):
+        """Contribución al stock de un movimiento: {(almacen_id, producto_id): delta}"""
+        if not movement_id:
+            return {}
+        query = f"""
+            SELECT mi.almacen_id, mi.producto_id, mi.tipo_movimiento, mi.cantidad
+            FROM movimientos_inventario mi
+            WHERE mi.id = %s AND {Stock.MOVIMIENTO_SIN_DOCUMENTO}
+            FOR UPDATE
+        """
+        result = Database.execute_query(query, (movement_id,))
+        if not result:
+            return {}
+        row = result[0]
+        return {
+            (row['almacen_id'], row['producto_id']):
+                Stock.movement_delta(row['tipo_movimiento'], row['cantidad'])
+        }
+
+    @staticmethod
+    def document_reference(referencia):
+        """True si la referencia es el número de factura de una venta o compra"""
+        if not referencia:
+            return False
+        query = """
+            SELECT 1 FROM ventas WHERE numero_factura = %s
+            UNION ALL
+            SELECT 1 FROM compras WHERE numero_factura = %s
+            LIMIT 1
+        """
+        return bool(Database.execute_query(query, (referencia, referencia)))
+
+    @staticmethod
+    def sale_contribution(sale_id):
+        """Contribución al stock de una venta (resta sus líneas si está completada)"""
+        return Stock._document_contribution(
+            sale_id, 'ventas', 'detalle_ventas', 'venta_id', sign=-1
+        )
+
+    @staticmethod
+    def purchase_contribution(purchase_id):
+        """Contribución al stock de una compra (suma sus líneas si está completada)"""
+        return Stock._document_contribution(
+            purchase_id, 'compras', 'detalle_compras', 'compra_id', sign=1
+        )
+
+    @staticmethod
+    def _document_contribution(document_id, table, detail_table, fk, sign):
+        if not document_id:
+            return {}
+
+        # Bloquear la cabecera serializa las ediciones concurrentes del documento
+        header = Database.execute_query(
+            f"SELECT estado FROM {table} WHERE id = %s FOR UPDATE", (document_id,)
+        )
+        if not header or header[0]['estado'] != Stock.ESTADO_CONTABILIZADO:
+            return {}
+
+        query = f"""
+            SELECT producto_id, SUM(cantidad) as cantidad
+            FROM {detail_table}
+            WHERE {fk} = %s
+            GROUP BY producto_id
+        """
+        almacen_id = Stock.default_warehouse_id()
+        return {
+            (almacen_id, row['producto_id']): sign * int(row['cantidad'])
+            for row in Database.execute_query(query, (document_id,))
+        }
+
+    @staticmethod
+    def post_change(before, after, check_capacity=False):
+        """Aplica la diferencia entre dos contribuciones al stock
+
+        Con check_capacity se rechaza el cambio (ValueError) si algún almacén
+        supera su capacidad. Toda escritura de ventas, compras y movimientos
+        pasa por aquí, así que también incrementa la versión de los datos.
+        """
+        deltas = defaultdict(int)
+        for key, qty in after.items():
+            deltas[key] += qty
+        for key, qty in before.items():
+            deltas[key] -= qty
+        with Database.transaction():
+            if check_capacity:
+                Stock.check_capacity(deltas)
+            Stock.apply_deltas(deltas)
+            DataVersion.bump()
+
+    @staticmethod
+    def check_capacity(deltas):
+        """Verifica que los deltas no dejen ningún almacén por encima de su capacidad
+
+        Debe llamarse dentro de una transacción: bloquea la fila de cada almacén
+        afectado para que dos movimientos concurrentes no superen juntos la
+        capacidad. Una capacidad de 0 significa sin límite.
+        """
+        per_warehouse = defaultdict(int)
+        for (almacen_id, _), qty in deltas.items():
+            per_warehouse[int(almacen_id)] += qty
+
+        for almacen_id in sorted(per_warehouse):
+            increase = per_warehouse[almacen_id]
+            if increase <= 0:
+                continue
+
+            warehouse = Database.execute_query(
+                "SELECT nombre, capacidad FROM almacenes WHERE id = %s FOR UPDATE",
+                (almacen_id,)
+            )
+            if not warehouse or not warehouse[0]['capacidad']:
+                continue
+
+            ocupado = Stock.warehouse_total(almacen_id)
+            capacidad = int(warehouse[0]['capacidad'])
+            if ocupado + increase > capacidad:
+                raise ValueError(
+                    f"El almacén {warehouse[0]['nombre']} no tiene capacidad suficiente: "
+                    f"ocupado {ocupado:,} de {capacidad:,}, disponible {max(capacidad - ocupado, 0):,}"
+                )
+
+    @staticmethod
+    def warehouse_total(almacen_id):
+        """Unidades almacenadas en un almacén según los saldos"""
+        result = Database.execute_query(
+            "SELECT COALESCE(SUM(cantidad), 0) as total FROM stock_almacen "
+            "WHERE almacen_id = %s AND cantidad > 0",
+            (almacen_id,)
+        )
+        return int(result[0]['total']) if result else 0
+
+    @staticmethod
+    def warehouse_occupancy(almacen_id=None):
+        """Ocupación de los almacenes activos: unidades, capacidad y porcentaje"""
+        query = """
+            SELECT a.id, a.nombre, a.ubicacion, a.capacidad,
+                   COALESCE(SUM(s.cantidad), 0) as ocupado,
+                   COUNT(s.producto_id) as productos
+            FROM almacenes a
+            LEFT JOIN stock_almacen s ON s.almacen_id = a.id AND s.cantidad > 0
+            WHERE a.activo = 1
+        """
+        params = ()
+        if almacen_id:
+            query += " AND a.id = %s"
+            params = (almacen_id,)
+        query += " GROUP BY a.id, a.nombre, a.ubicacion, a.capacidad ORDER BY a.nombre"
+
+        rows = Database.execute_query(query, params) or []
+        for row in rows:
+            ocupado = int(row['ocupado'])
+            capacidad = int(row['capacidad'] or 0)
+            row['ocupado'] = ocupado
+            row['disponible'] = max(capacidad - ocupado, 0) if capacidad else None
+            row['porcentaje'] = round(ocupado * 100.0 / capacidad, 1) if capacidad else None
+        return rows
+
+    @staticmethod
+    def product_locations(producto_id):
+        """Almacenes donde hay stock de un producto y la cantidad en cada uno"""
+        query = """
+            SELECT s.almacen_id, a.nombre as almacen, a.ubicacion, s.cantidad, s.updated_at
+            FROM stock_almacen s
+            INNER JOIN almacenes a ON s.almacen_id = a.id
+            WHERE s.producto_id = %s AND s.cantidad > 0
+            ORDER BY s.cantidad DESC
+        """
+        return Database.execute_query(query, (producto_id,))
+
+    @staticmethod
+    def apply_deltas(deltas):
+        """Suma deltas {(almacen_id, producto_id): cantidad} a los saldos de forma atómica"""
+        # Orden fijo de claves para evitar interbloqueos entre transacciones
+        rows = sorted(
+            (almacen_id, producto_id, int(qty))
+            for (almacen_id, producto_id), qty in deltas.items()
+            if qty
+        )
+        if not rows:
+            return
+
+        per_product = defaultdict(int)
+        for _, producto_id, qty in rows:
+            per_product[producto_id] += qty
+
+        with Database.transaction():
+            Database.execute_many(
+                """
+                INSERT INTO stock_almacen (almacen_id, producto_id, cantidad)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE cantidad = cantidad + VALUES(cantidad)
+                """,
+                rows
+            )
+            Database.execute_many(
+                "UPDATE productos SET stock_actual = stock_actual + %s WHERE id = %s",
+                [(qty, producto_id) for producto_id, qty in sorted(per_product.items()) if qty]
+            )
+
+    @staticmethod
+    def _ledger_balances_query():
+        """Consulta que recalcula los saldos completos desde el ledger"""
+        return f"""
+            SELECT almacen_id, producto_id, SUM(delta) as cantidad
+            FROM (
+                SELECT mi.almacen_id, mi.producto_id,
+                       CASE WHEN mi.tipo_movimiento = 'salida' THEN -mi.cantidad ELSE mi.cantidad END as delta
+                FROM movimientos_inventario mi
+                WHERE {Stock.MOVIMIENTO_SIN_DOCUMENTO}
+                UNION ALL
+                SELECT %s, dv.producto_id, -dv.cantidad
+                FROM detalle_ventas dv
+                INNER JOIN ventas v ON dv.venta_id = v.id
+                WHERE v.estado = %s
+                UNION ALL
+                SELECT %s, dc.producto_id, dc.cantidad
+                FROM detalle_compras dc
+                INNER JOIN compras c ON dc.compra_id = c.id
+                WHERE c.estado = %s
+            ) ledger
+            GROUP BY almacen_id, producto_id
+        """
+
+    @staticmethod
+    def _ledger_params():
+        almacen_id = Stock.default_warehouse_id()
+        return (almacen_id, Stock.ESTADO_CONTABILIZADO, almacen_id, Stock.ESTADO_CONTABILIZADO)
+
+    @staticmethod
+    def find_discrepancies():
+        """Compara productos.stock_actual con el stock que resulta del ledger"""
+        query = f"""
+            SELECT p.id as producto_id, p.nombre,
+                   p.stock_actual,
+                   COALESCE(l.cantidad, 0) as stock_ledger,
+                   COALESCE(s.cantidad, 0) as stock_saldos
+            FROM productos p
+            LEFT JOIN (
+                SELECT producto_id, SUM(cantidad) as cantidad
+                FROM ({Stock._ledger_balances_query()}) b
+                GROUP BY producto_id
+            ) l ON l.producto_id = p.id
+            LEFT JOIN (
+                SELECT producto_id, SUM(cantidad) as cantidad
+                FROM stock_almacen
+                GROUP BY producto_id
+            ) s ON s.producto_id = p.id
+            WHERE p.stock_actual <> COALESCE(l.cantidad, 0)
+               OR COALESCE(s.cantidad, 0) <> COALESCE(l.cantidad, 0)
+            ORDER BY p.id
+        """
+        return Database.execute_query(query, Stock._ledger_params())
+
+    @staticmethod
+    def post_opening_balances():
+        """Registra como ajustes de saldo inicial el stock que el ledger no explica
+
+        Primero lleva a 0 los saldos negativos de los almacenes que no son el
+        de por defecto (salidas cargadas sin su entrada) y luego imputa al
+        almacén por defecto la diferencia entre productos.stock_actual y el
+        ledger. Después rebuild() deja stock_almacen igual al ledger sin
+        perder ese stock. zz_rollups.sql hace lo mismo en instalaciones nuevas.
+        Retorna la cantidad de ajustes creados.
+        """
+        almacen_id = Stock.default_warehouse_id()
+        referencia = Stock.REFERENCIA_SALDO_INICIAL
+        insert = """
+            INSERT INTO movimientos_inventario
+            (producto_id, almacen_id, tipo_movimiento, cantidad, usuario_id, referencia, motivo)
+        """
+        count_query = "SELECT COUNT(*) as total FROM movimientos_inventario WHERE referencia = %s"
+        with Database.transaction():
+            before = Database.execute_query(count_query, (referencia,))[0]['total']
+            Database.execute_query(
+                f"""
+                {insert}
+                SELECT b.producto_id, b.almacen_id, 'ajuste', -b.cantidad,
+                       (SELECT MIN(id) FROM usuarios), %s, %s
+                FROM ({Stock._ledger_balances_query()}) b
+                WHERE b.cantidad < 0 AND b.almacen_id <> %s
+                """,
+                (referencia, 'Saldo inicial: salidas cargadas sin su entrada')
+                + Stock._ledger_params() + (almacen_id,),
+                fetch=False
+            )
+            Database.execute_query(
+                f"""
+                {insert}
+                SELECT p.id, %s, 'ajuste', p.stock_actual - COALESCE(l.cantidad, 0),
+                       (SELECT MIN(id) FROM usuarios), %s, %s
+                FROM productos p
+                LEFT JOIN (
+                    SELECT producto_id, SUM(cantidad) as cantidad
+                    FROM ({Stock._ledger_balances_query()}) b
+                    GROUP BY producto_id
+                ) l ON l.producto_id = p.id
+                WHERE p.stock_actual <> COALESCE(l.cantidad, 0)
+                """,
+                (almacen_id, referencia, 'Saldo inicial: stock cargado antes del ledger')
+                + Stock._ledger_params(),
+                fetch=False
+            )
+            after = Database.execute_query(count_query, (referencia,))[0]['total']
+        return int(after) - int(before)
+
+    @staticmethod
+    def initialize():
+        """Paso de migración: saldos iniciales y stock_almacen en bases existentes
+
+        Solo actúa mientras no haya ajustes de saldo inicial; retorna lo que hizo.
+        """
+        exists = Database.execute_query(
+            "SELECT 1 FROM movimientos_inventario WHERE referencia = %s LIMIT 1",
+            (Stock.REFERENCIA_SALDO_INICIAL,)
+        )
+        if exists:
+            return []
+        with Database.transaction():
+            created = Stock.post_opening_balances()
+            Stock.rebuild()
+        return [
+            f"{created} ajuste(s) {Stock.REFERENCIA_SALDO_INICIAL}",
+            "stock_almacen reconstruida desde el ledger",
+        ]
+
+    @staticmethod
+    def rebuild():
+        """Reconstruye stock_almacen y productos.stock_actual desde el ledger"""
+        with Database.transaction():
+            Database.execute_query("DELETE FROM stock_almacen", fetch=False)
+            Database.execute_query(
+                f"""
+                INSERT INTO stock_almacen (almacen_id, producto_id, cantidad)
+                {Stock._ledger_balances_query()}
+                """,
+                Stock._ledger_params(),
+                fetch=False
+            )
+            Database.execute_query(
+                """
+                UPDATE productos p
+                LEFT JOIN (
+                    SELECT producto_id, SUM(cantidad) as cantidad
+                    FROM stock_almacen
+                    GROUP BY producto_id
+                ) s ON s.producto_id = p.id
+                SET p.stock_actual = COALESCE(s.cantidad, 0)
+                """,
+                fetch=False
+            )
@@ -1,4 +1,5 @@
 from config.database import Database
+from config.cache import DataVersion
 
 class Supplier:
     @staticmethod
@@ -28,7 +29,7 @@ class Supplier:
             INSERT INTO proveedores (nombre, ruc, telefono, email, direccion)
             VALUES (%s, %s, %s, %s, %s)
         """
-        return Database.execute_query(
+        result = Database.execute_query(
             query,
             (
                 data['nombre'],
@@ -39,6 +40,8 @@ class Supplier:
             ),
             fetch=False
         )
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def update(supplier_id, data):
@@ -52,7 +55,7 @@ class Supplier:
                 direccion = %s
             WHERE id = %s
         """
-        return Database.execute_query(
+        result = Database.execute_query(
             query,
             (
                 data['nombre'],
@@ -64,9 +67,13 @@ class Supplier:
             ),
             fetch=False
         )
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def delete(supplier_id):
         """Eliminar lógicamente un proveedor"""
         query = "UPDATE proveedores SET activo = 0 WHERE id = %s"
-        return Database.execute_query(query, (supplier_id,), fetch=False)
+        result = Database.execute_query(query, (supplier_id,), fetch=False)
+        DataVersion.bump()
+        return result
@@ -1,4 +1,5 @@
 from config.database import Database
+from config.cache import DataVersion
 
 class Warehouse:
     """Modelo de Almacén"""
@@ -46,7 +47,9 @@ class Warehouse:
             data.get('capacidad', 0),
             data.get('activo', 1)
         )
-        return Database.execute_query(query, params, fetch=False)
+        result = Database.execute_query(query, params, fetch=False)
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def update(warehouse_id, data):
@@ -66,10 +69,14 @@ class Warehouse:
             data.get('activo', 1),
             warehouse_id
         )
-        return Database.execute_query(query, params, fetch=False)
+        result = Database.execute_query(query, params, fetch=False)
+        DataVersion.bump()
+        return result
     
     @staticmethod
     def delete(warehouse_id):
         """Elimina un almacén (soft delete cambiando activo a 0)"""
         query = "UPDATE wms_management_system.almacenes SET activo = 0 WHERE id = %s"
-        return Database.execute_query(query, (warehouse_id,), fetch=False)
+        result = Database.execute_query(query, (warehouse_id,), fetch=False)
+        DataVersion.bump()
+        return result
@@ -1,13 +1,13 @@
-import google.generativeai as genai
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from config.database import Database
-from app.models.product import Product
-from app.models.category import Category
-from app.models.sale import Sale
-from app.models.purchase import Purchase
-from app.models.client import Client
-from app.models.supplier import Supplier
-from app.models.warehouse import Warehouse
-from app.models.inventory_movement import InventoryMovement
+from config.cache import DataVersion, TTLCache
+from app.services.gemini_client import GeminiClient
+from app.services.response_cache import ResponseCache
+from app.services.intent_router import IntentRouter
+from app.services.sql_sandbox import SqlSandbox
+from app.services.conversation_memory import ConversationMemory
+from config.tracing import Span, Tracer
 from dotenv import load_dotenv
 import json
 import re
@@ -20,16 +20,39 @@ load_dotenv()
 class AIService:
     """Servicio de IA mejorado con acceso a base de datos y consultas SQL"""
 
+    # Contexto de datos compartido por todas las instancias y usuarios; se
+    # invalida con cada escritura (DataVersion) y expira tras el TTL
+    _context_cache = TTLCache(
+        ttl=float(os.getenv("AI_CONTEXT_CACHE_TTL", 300)), max_entries=4
+    )
+
+    # Esquema de la BD por versión del esquema; el TTL cubre cambios de DDL
+    # hechos por otros procesos (migrate.py)
+    _schema_cache = TTLCache(
+        ttl=float(os.getenv("AI_SCHEMA_CACHE_TTL", 3600)), max_entries=2
+    )
+
+    # Presupuesto aproximado de tokens para las estadísticas del contexto
+    CONTEXT_TOKEN_BUDGET = int(os.getenv("AI_CONTEXT_TOKEN_BUDGET", 1500))
+
+    # Insights y sugerencias por versión de datos, calculados en segundo plano
+    _panel_cache = TTLCache(
+        ttl=float(os.getenv("AI_PANEL_CACHE_TTL", 600)), max_entries=8
+    )
+    _executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv("AI_PREFETCH_WORKERS", 2)),
+        thread_name_prefix="ai-prefetch",
+    )
+
+    # Respuestas a preguntas repetidas, por pregunta normalizada y versión de datos
+    _response_cache = ResponseCache.from_env()
+
+    _instance = None
+    _instance_lock = threading.Lock()
+
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key or api_key == "tu-api-key-aqui":
-            raise ValueError(
-                "GEMINI_API_KEY no está configurada. "
-                "Por favor, configura tu API key en el archivo .env"
-            )
-        # Modelo "gemini-2.5-flash"
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel("gemini-2.5-pro")
+        # Valida la API key e inicializa el cliente compartido de Gemini
+        GeminiClient.get_model()
 
         # Configuración de generación
         self.generation_config = {
@@ -39,119 +62,147 @@ class AIService:
             "max_output_tokens": 2048,
         }
 
+    @staticmethod
+    def get_instance():
+        """Retorna el servicio compartido por todo el proceso (no guarda estado por usuario)"""
+        if AIService._instance is None:
+            with AIService._instance_lock:
+                if AIService._instance is None:
+                    AIService._instance = AIService()
+        return AIService._instance
+
+    @staticmethod
+    def llm_metrics():
+        """Latencia y tokens de las llamadas a Gemini por operación"""
+        return GeminiClient.metrics()
+
+    @staticmethod
+    def intent_stats():
+        """Mensajes resueltos por el enrutador de intenciones y delegados al modelo"""
+        return IntentRouter.stats()
+
+    @staticmethod
+    def response_cache_stats():
+        """Aciertos y fallos de la caché de respuestas"""
+        stats = AIService._response_cache.stats()
+        stats["data_version"] = DataVersion.current()
+        return stats
+
     def get_database_schema(self):
-        """Obtiene el esquema completo de la base de datos"""
+        """Obtiene el esquema completo de la base de datos (cacheado por versión del esquema)"""
         try:
-            # Obtener todas las tablas
-            tables_query = "SHOW TABLES"
-            tables = Database.execute_query(tables_query)
-
-            schema_info = "=== ESTRUCTURA DE LA BASE DE DATOS ===\n\n"
-
-            for table in tables:
-                table_name = list(table.values())[0]
-
-                # Obtener estructura de cada tabla
-                columns_query = f"DESCRIBE {table_name}"
-                columns = Database.execute_query(columns_query)
-
-                # Contar registros
-                count_query = f"SELECT COUNT(*) as total FROM {table_name}"
-                count = Database.execute_query(count_query)
-                total_records = count[0]["total"] if count else 0
+            key = ("esquema", Database.schema_version())
+            return AIService._schema_cache.get_or_set(key, AIService._build_database_schema)
+        except Exception as e:
+            return f"Error obteniendo esquema: {str(e)}"
 
-                schema_info += f"📋 TABLA: {table_name} ({total_records} registros)\n"
+    @staticmethod
+    def _build_database_schema():
+        """Arma el esquema desde information_schema en una sola consulta
+
+        Los registros son la estimación de TABLE_ROWS (estadísticas de InnoDB),
+        no un COUNT(*) que recorrería cada tabla.
+        """
+        query = """
+            SELECT
+                c.TABLE_NAME as tabla,
+                t.TABLE_ROWS as registros,
+                c.COLUMN_NAME as campo,
+                c.COLUMN_TYPE as tipo,
+                c.IS_NULLABLE as nulo,
+                c.COLUMN_KEY as clave
+            FROM information_schema.COLUMNS c
+            INNER JOIN information_schema.TABLES t
+                ON t.TABLE_SCHEMA = c.TABLE_SCHEMA AND t.TABLE_NAME = c.TABLE_NAME
+            WHERE c.TABLE_SCHEMA = DATABASE() AND t.TABLE_TYPE = 'BASE TABLE'
+            ORDER BY c.TABLE_NAME, c.ORDINAL_POSITION
+        """
+        rows = Database.execute_query(query)
+
+        schema_info = "=== ESTRUCTURA DE LA BASE DE DATOS ===\n\n"
+        current_table = None
+        for col in rows:
+            if col["tabla"] != current_table:
+                if current_table is not None:
+                    schema_info += "\n"
+                current_table = col["tabla"]
+                schema_info += f"📋 TABLA: {current_table} (~{int(col['registros'] or 0)} registros)\n"
                 schema_info += "   Columnas:\n"
 
-                for col in columns:
-                    field = col.get("Field", "")
-                    col_type = col.get("Type", "")
-                    null = "NULL" if col.get("Null") == "YES" else "NOT NULL"
-                    key = col.get("Key", "")
-                    key_info = ""
-                    if key == "PRI":
-                        key_info = " [PRIMARY KEY]"
-                    elif key == "MUL":
-                        key_info = " [FOREIGN KEY]"
-                    elif key == "UNI":
-                        key_info = " [UNIQUE]"
-
-                    schema_info += f"   - {field}: {col_type} {null}{key_info}\n"
+            null = "NULL" if col.get("nulo") == "YES" else "NOT NULL"
+            key = col.get("clave", "")
+            key_info = ""
+            if key == "PRI":
+                key_info = " [PRIMARY KEY]"
+            elif key == "MUL":
+                key_info = " [FOREIGN KEY]"
+            elif key == "UNI":
+                key_info = " [UNIQUE]"
 
-                schema_info += "\n"
+            schema_info += f"   - {col['campo']}: {col['tipo']} {null}{key_info}\n"
 
-            return schema_info
-
-        except Exception as e:
-            return f"Error obteniendo esquema: {str(e)}"
+        if current_table is not None:
+            schema_info += "\n"
+        return schema_info
 
     def execute_safe_query(self, sql_query):
-        """Ejecuta una consulta SQL de forma segura (solo SELECT)"""
-        try:
-            # Limpiar y validar la consulta
-            sql_clean = sql_query.strip().upper()
-
-            # Solo permitir consultas SELECT
-            if not sql_clean.startswith("SELECT"):
-                return {"error": "Solo se permiten consultas SELECT por seguridad"}
-
-            # Prohibir palabras peligrosas
-            dangerous_words = [
-                "DROP",
-                "DELETE",
-                "UPDATE",
-                "INSERT",
-                "ALTER",
-                "TRUNCATE",
-                "CREATE",
-                "GRANT",
-                "REVOKE",
-            ]
-            for word in dangerous_words:
-                if word in sql_clean:
-                    return {"error": f"Consulta no permitida: contiene {word}"}
-
-            # Ejecutar la consulta
-            results = Database.execute_query(sql_query)
-
-            # Convertir a formato serializable
-            if results:
-                # Convertir fechas y decimales a strings
-                clean_results = []
-                for row in results:
-                    clean_row = {}
-                    for key, value in row.items():
-                        if hasattr(value, "isoformat"):
-                            clean_row[key] = value.isoformat()
-                        elif hasattr(value, "__float__"):
-                            clean_row[key] = float(value)
-                        else:
-                            clean_row[key] = value
-                    clean_results.append(clean_row)
-                return {"success": True, "data": clean_results, "count": len(results)}
-            return {"success": True, "data": [], "count": 0}
-
-        except Exception as e:
-            return {"error": str(e)}
+        """Ejecuta una consulta SQL de forma segura (solo SELECT, acotada y de solo lectura)"""
+        return SqlSandbox.execute(sql_query)
 
     def get_comprehensive_context(self):
-        """Obtiene contexto completo y detallado del sistema"""
+        """Obtiene el resumen numérico del sistema calculado en una sola consulta SQL
+
+        Solo se traen contadores y totales: el tamaño del contexto y el tiempo
+        de cálculo no crecen con el número de ventas o movimientos.
+        """
+        query = """
+            SELECT
+                (SELECT COUNT(*) FROM productos WHERE activo = 1) as productos,
+                (SELECT COALESCE(SUM(stock_actual), 0) FROM productos WHERE activo = 1) as stock_total,
+                (SELECT COUNT(*) FROM productos WHERE activo = 1 AND stock_actual < 10) as bajo_stock,
+                (SELECT COUNT(*) FROM productos WHERE activo = 1 AND stock_actual = 0) as agotados,
+                (SELECT COUNT(*) FROM productos WHERE activo = 1 AND precio_venta > 1000) as alto_valor,
+                (SELECT COALESCE(SUM(cantidad), 0) FROM resumen_mensual WHERE documento = 'venta') as ventas,
+                (SELECT COALESCE(SUM(total), 0) FROM resumen_mensual WHERE documento = 'venta') as total_ventas,
+                (SELECT COALESCE(SUM(cantidad), 0) FROM resumen_mensual WHERE documento = 'compra') as compras,
+                (SELECT COALESCE(SUM(total), 0) FROM resumen_mensual WHERE documento = 'compra') as total_compras,
+                (SELECT COUNT(*) FROM clientes WHERE activo = 1) as clientes,
+                (SELECT COUNT(*) FROM proveedores WHERE activo = 1) as proveedores
+        """
         try:
-            context = {
-                "products": Product.get_all(),
-                "categories": Category.get_all(),
-                "sales": Sale.get_all(),
-                "purchases": Purchase.get_all(),
-                "clients": Client.get_all(),
-                "suppliers": Supplier.get_all(),
-                "warehouses": Warehouse.get_all(),
-                "movements": InventoryMovement.get_all(),
-            }
-            return context
+            result = Database.execute_query(query)
+            return dict(result[0]) if result else {}
         except Exception as e:
             print(f"Error obteniendo contexto: {e}")
             return {}
 
+    def get_context_snapshot(self):
+        """Obtiene el contexto de datos para el LLM, calculado una vez y cacheado"""
+        key = ("contexto", DataVersion.current())
+        return AIService._context_cache.get_or_set(key, self._build_context_snapshot)
+
+    def _build_context_snapshot(self):
+        """Calcula el contexto, las estadísticas y sus versiones formateadas"""
+        context = self.get_comprehensive_context()
+        stats = self.get_advanced_stats()
+        return {
+            "context": context,
+            "stats": stats,
+            "formatted": self.format_data_for_llm(
+                context, include_schema=True, include_stats=True, stats=stats
+            ),
+            "formatted_reduced": self.format_data_for_llm(
+                context, include_schema=False, include_stats=True, stats=stats
+            ),
+        }
+
+    @staticmethod
+    def context_cache_stats():
+        """Estadísticas de aciertos de la caché de contexto"""
+        stats = AIService._context_cache.stats()
+        stats["data_version"] = DataVersion.current()
+        return stats
+
     def get_advanced_stats(self):
         """Obtiene estadísticas avanzadas mediante consultas SQL"""
         stats = {}
@@ -187,6 +238,7 @@ class AIService:
                 LEFT JOIN productos p ON c.id = p.categoria_id
                 GROUP BY c.id, c.nombre
                 ORDER BY num_productos DESC
+                LIMIT 15
             """
             stats["productos_por_categoria"] = Database.execute_query(
                 productos_categoria_query
@@ -196,8 +248,9 @@ class AIService:
             stock_critico_query = """
                 SELECT nombre, stock_actual, stock_minimo, precio_venta
                 FROM productos
-                WHERE stock_actual <= 5
+                WHERE stock_actual <= 5 AND activo = 1
                 ORDER BY stock_actual ASC
+                LIMIT 10
             """
             stats["stock_critico"] = Database.execute_query(stock_critico_query)
 
@@ -210,53 +263,67 @@ class AIService:
             stats["valor_inventario"] = Database.execute_query(valor_inventario_query)
 
             # NUEVO: Productos más comprados por los TOP 5 clientes
+            # (máximo 5 productos por cliente)
             productos_por_top_clientes_query = """
-                SELECT 
-                    c.nombre AS cliente,
-                    p.nombre AS producto,
-                    cat.nombre AS categoria,
-                    SUM(dv.cantidad) AS cantidad_total,
-                    COUNT(DISTINCT v.id) AS num_compras
-                FROM clientes c
-                JOIN ventas v ON c.id = v.cliente_id
-                JOIN detalle_ventas dv ON v.id = dv.venta_id
-                JOIN productos p ON dv.producto_id = p.id
-                JOIN categorias cat ON p.categoria_id = cat.id
-                WHERE c.id IN (
-                    SELECT c2.id FROM clientes c2
-                    JOIN ventas v2 ON c2.id = v2.cliente_id
-                    GROUP BY c2.id
-                    ORDER BY SUM(v2.total) DESC
-                    LIMIT 5
-                )
-                GROUP BY c.id, c.nombre, p.id, p.nombre, cat.id, cat.nombre
-                ORDER BY c.nombre, cantidad_total DESC
+                SELECT cliente, producto, categoria, cantidad_total, num_compras
+                FROM (
+                    SELECT 
+                        c.nombre AS cliente,
+                        p.nombre AS producto,
+                        cat.nombre AS categoria,
+                        SUM(dv.cantidad) AS cantidad_total,
+                        COUNT(DISTINCT v.id) AS num_compras,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY c.id ORDER BY SUM(dv.cantidad) DESC
+                        ) AS posicion
+                    FROM (
+                        SELECT v2.cliente_id FROM ventas v2
+                        GROUP BY v2.cliente_id
+                        ORDER BY SUM(v2.total) DESC
+                        LIMIT 5
+                    ) top
+                    JOIN clientes c ON c.id = top.cliente_id
+                    JOIN ventas v ON c.id = v.cliente_id
+                    JOIN detalle_ventas dv ON v.id = dv.venta_id
+                    JOIN productos p ON dv.producto_id = p.id
+                    JOIN categorias cat ON p.categoria_id = cat.id
+                    GROUP BY c.id, c.nombre, p.id, p.nombre, cat.id, cat.nombre
+                ) ranking
+                WHERE posicion <= 5
+                ORDER BY cliente, cantidad_total DESC
             """
             stats["productos_por_top_clientes"] = Database.execute_query(
                 productos_por_top_clientes_query
             )
 
             # NUEVO: Categorías favoritas por cliente TOP
+            # (máximo 3 categorías por cliente)
             categorias_por_top_clientes_query = """
-                SELECT 
-                    c.nombre AS cliente,
-                    cat.nombre AS categoria,
-                    SUM(dv.cantidad) AS cantidad_total,
-                    SUM(dv.subtotal) AS total_gastado
-                FROM clientes c
-                JOIN ventas v ON c.id = v.cliente_id
-                JOIN detalle_ventas dv ON v.id = dv.venta_id
-                JOIN productos p ON dv.producto_id = p.id
-                JOIN categorias cat ON p.categoria_id = cat.id
-                WHERE c.id IN (
-                    SELECT c2.id FROM clientes c2
-                    JOIN ventas v2 ON c2.id = v2.cliente_id
-                    GROUP BY c2.id
-                    ORDER BY SUM(v2.total) DESC
-                    LIMIT 5
-                )
-                GROUP BY c.id, c.nombre, cat.id, cat.nombre
-                ORDER BY c.nombre, cantidad_total DESC
+                SELECT cliente, categoria, cantidad_total, total_gastado
+                FROM (
+                    SELECT 
+                        c.nombre AS cliente,
+                        cat.nombre AS categoria,
+                        SUM(dv.cantidad) AS cantidad_total,
+                        SUM(dv.subtotal) AS total_gastado,
+                        ROW_NUMBER() OVER (
+                            PARTITION BY c.id ORDER BY SUM(dv.cantidad) DESC
+                        ) AS posicion
+                    FROM (
+                        SELECT v2.cliente_id FROM ventas v2
+                        GROUP BY v2.cliente_id
+                        ORDER BY SUM(v2.total) DESC
+                        LIMIT 5
+                    ) top
+                    JOIN clientes c ON c.id = top.cliente_id
+                    JOIN ventas v ON c.id = v.cliente_id
+                    JOIN detalle_ventas dv ON v.id = dv.venta_id
+                    JOIN productos p ON dv.producto_id = p.id
+                    JOIN categorias cat ON p.categoria_id = cat.id
+                    GROUP BY c.id, c.nombre, cat.id, cat.nombre
+                ) ranking
+                WHERE posicion <= 3
+                ORDER BY cliente, cantidad_total DESC
             """
             stats["categorias_por_top_clientes"] = Database.execute_query(
                 categorias_por_top_clientes_query
@@ -268,58 +335,67 @@ class AIService:
         return stats
 
     def analyze_data_for_context(self, context):
-        """Analiza los datos y genera insights automáticos"""
+        """Genera insights automáticos a partir del resumen numérico"""
         insights = []
 
-        products = context.get("products", [])
-        if products:
-            total_stock = sum(p.get("stock_actual", 0) for p in products)
-            low_stock = [p for p in products if p.get("stock_actual", 0) < 10]
-            out_of_stock = [p for p in products if p.get("stock_actual", 0) == 0]
-            high_value_products = [
-                p for p in products if p.get("precio_venta", 0) > 1000
-            ]
-
+        productos = int(context.get("productos") or 0)
+        if productos:
             insights.append(
-                f"Hay {len(products)} productos en total con {total_stock} unidades en inventario"
+                f"Hay {productos} productos en total con {int(context.get('stock_total') or 0)} unidades en inventario"
             )
-            if low_stock:
+            if context.get("bajo_stock"):
                 insights.append(
-                    f"{len(low_stock)} productos tienen stock bajo (menos de 10 unidades)"
+                    f"{context['bajo_stock']} productos tienen stock bajo (menos de 10 unidades)"
                 )
-            if out_of_stock:
-                insights.append(f"⚠️ {len(out_of_stock)} productos están agotados")
-            if high_value_products:
+            if context.get("agotados"):
+                insights.append(f"⚠️ {context['agotados']} productos están agotados")
+            if context.get("alto_valor"):
                 insights.append(
-                    f"{len(high_value_products)} productos son de alto valor (más de $1000)"
+                    f"{context['alto_valor']} productos son de alto valor (más de $1000)"
                 )
 
-        sales = context.get("sales", [])
-        if sales:
-            total_sales = sum(s.get("total", 0) for s in sales)
-            avg_sale = total_sales / len(sales) if sales else 0
+        ventas = int(context.get("ventas") or 0)
+        if ventas:
+            total_sales = float(context.get("total_ventas") or 0)
             insights.append(
-                f"Se han registrado {len(sales)} ventas por un total de ${total_sales:,.2f} (promedio: ${avg_sale:,.2f})"
+                f"Se han registrado {ventas} ventas por un total de ${total_sales:,.2f} (promedio: ${total_sales / ventas:,.2f})"
             )
 
-        purchases = context.get("purchases", [])
-        if purchases:
-            total_purchases = sum(p.get("total", 0) for p in purchases)
+        compras = int(context.get("compras") or 0)
+        if compras:
             insights.append(
-                f"Se han registrado {len(purchases)} compras por un total de ${total_purchases:,.2f}"
+                f"Se han registrado {compras} compras por un total de ${float(context.get('total_compras') or 0):,.2f}"
             )
 
-        clients = context.get("clients", [])
-        suppliers = context.get("suppliers", [])
-        if clients:
-            insights.append(f"Base de datos: {len(clients)} clientes registrados")
-        if suppliers:
-            insights.append(f"{len(suppliers)} proveedores activos")
+        if context.get("clientes"):
+            insights.append(f"Base de datos: {context['clientes']} clientes registrados")
+        if context.get("proveedores"):
+            insights.append(f"{context['proveedores']} proveedores activos")
 
         return "\n• ".join(insights)
 
-    def format_data_for_llm(self, context, include_schema=True, include_stats=True):
-        """Formatea los datos de manera estructurada para el LLM"""
+    @staticmethod
+    def _section(title, lines, budget):
+        """Arma una sección del contexto recortando las líneas al presupuesto de tokens"""
+        section = f"{title}\n"
+        used = GeminiClient.estimate_tokens(section)
+        for i, line in enumerate(lines):
+            cost = GeminiClient.estimate_tokens(line) + 1
+            if used + cost > budget:
+                section += f"   … ({len(lines) - i} más omitidos)\n"
+                break
+            section += f"{line}\n"
+            used += cost
+        return section + "\n"
+
+    def format_data_for_llm(
+        self, context, include_schema=True, include_stats=True, stats=None
+    ):
+        """Formatea los datos de manera estructurada para el LLM
+
+        Cada sección recibe una parte del presupuesto AI_CONTEXT_TOKEN_BUDGET y
+        se recorta si lo excede, así el tamaño del prompt es acotado.
+        """
         formatted = ""
 
         # Incluir esquema de BD (resumido para evitar tokens excesivos)
@@ -331,66 +407,69 @@ class AIService:
 
         # Incluir estadísticas avanzadas
         if include_stats:
-            stats = self.get_advanced_stats()
+            if stats is None:
+                stats = self.get_advanced_stats()
             formatted += "=== ESTADÍSTICAS DEL NEGOCIO ===\n\n"
 
+            sections = []
+
             if stats.get("top_productos_vendidos"):
-                formatted += "🏆 TOP 5 PRODUCTOS MÁS VENDIDOS:\n"
-                for i, p in enumerate(stats["top_productos_vendidos"], 1):
-                    formatted += f"   {i}. {p.get('nombre')}: {p.get('total_vendido')} uds (${float(p.get('ingresos', 0)):,.2f})\n"
-                formatted += "\n"
+                sections.append(("🏆 TOP 5 PRODUCTOS MÁS VENDIDOS:", [
+                    f"   {i}. {p.get('nombre')}: {p.get('total_vendido')} uds (${float(p.get('ingresos', 0)):,.2f})"
+                    for i, p in enumerate(stats["top_productos_vendidos"], 1)
+                ]))
 
             if stats.get("top_clientes"):
-                formatted += "👥 TOP 5 MEJORES CLIENTES:\n"
-                for i, c in enumerate(stats["top_clientes"], 1):
-                    formatted += f"   {i}. {c.get('nombre')}: {c.get('num_compras')} compras (${float(c.get('total_gastado', 0)):,.2f})\n"
-                formatted += "\n"
+                sections.append(("👥 TOP 5 MEJORES CLIENTES:", [
+                    f"   {i}. {c.get('nombre')}: {c.get('num_compras')} compras (${float(c.get('total_gastado', 0)):,.2f})"
+                    for i, c in enumerate(stats["top_clientes"], 1)
+                ]))
 
-            # NUEVO: Mostrar productos por cada cliente TOP
+            # Productos por cada cliente TOP
             if stats.get("productos_por_top_clientes"):
-                formatted += "🛒 PRODUCTOS COMPRADOS POR TOP CLIENTES:\n"
+                lines = []
                 current_client = None
                 for item in stats["productos_por_top_clientes"]:
                     if item.get("cliente") != current_client:
                         current_client = item.get("cliente")
-                        formatted += f"\n   📌 {current_client}:\n"
-                    formatted += f"      - {item.get('producto')} ({item.get('categoria')}): {item.get('cantidad_total')} uds en {item.get('num_compras')} compras\n"
-                formatted += "\n"
+                        lines.append(f"   📌 {current_client}:")
+                    lines.append(f"      - {item.get('producto')} ({item.get('categoria')}): {item.get('cantidad_total')} uds en {item.get('num_compras')} compras")
+                sections.append(("🛒 PRODUCTOS COMPRADOS POR TOP CLIENTES:", lines))
 
-            # NUEVO: Mostrar categorías favoritas por cliente TOP
+            # Categorías favoritas por cliente TOP
             if stats.get("categorias_por_top_clientes"):
-                formatted += "📊 CATEGORÍAS FAVORITAS POR CLIENTE TOP:\n"
+                lines = []
                 current_client = None
                 for item in stats["categorias_por_top_clientes"]:
                     if item.get("cliente") != current_client:
                         current_client = item.get("cliente")
-                        formatted += f"\n   📌 {current_client}:\n"
-                    formatted += f"      - {item.get('categoria')}: {item.get('cantidad_total')} productos (${float(item.get('total_gastado', 0)):,.2f})\n"
-                formatted += "\n"
+                        lines.append(f"   📌 {current_client}:")
+                    lines.append(f"      - {item.get('categoria')}: {item.get('cantidad_total')} productos (${float(item.get('total_gastado', 0)):,.2f})")
+                sections.append(("📊 CATEGORÍAS FAVORITAS POR CLIENTE TOP:", lines))
 
             if stats.get("valor_inventario") and stats["valor_inventario"]:
                 inv = stats["valor_inventario"][0]
-                formatted += f"💰 VALOR DEL INVENTARIO:\n"
-                formatted += (
-                    f"   - Costo: ${float(inv.get('valor_costo', 0) or 0):,.2f}\n"
-                )
-                formatted += (
-                    f"   - Venta: ${float(inv.get('valor_venta', 0) or 0):,.2f}\n\n"
-                )
+                sections.append(("💰 VALOR DEL INVENTARIO:", [
+                    f"   - Costo: ${float(inv.get('valor_costo', 0) or 0):,.2f}",
+                    f"   - Venta: ${float(inv.get('valor_venta', 0) or 0):,.2f}",
+                ]))
 
             if stats.get("stock_critico"):
-                formatted += "🚨 STOCK CRÍTICO (≤5 uds):\n"
-                for p in stats["stock_critico"][:5]:
-                    formatted += (
-                        f"   - {p.get('nombre')}: {p.get('stock_actual')} uds\n"
-                    )
-                formatted += "\n"
+                sections.append(("🚨 STOCK CRÍTICO (≤5 uds):", [
+                    f"   - {p.get('nombre')}: {p.get('stock_actual')} uds"
+                    for p in stats["stock_critico"]
+                ]))
 
             if stats.get("productos_por_categoria"):
-                formatted += "📦 PRODUCTOS POR CATEGORÍA:\n"
-                for cat in stats["productos_por_categoria"]:
-                    formatted += f"   - {cat.get('categoria')}: {cat.get('num_productos')} productos\n"
-                formatted += "\n"
+                sections.append(("📦 PRODUCTOS POR CATEGORÍA:", [
+                    f"   - {cat.get('categoria')}: {cat.get('num_productos')} productos"
+                    for cat in stats["productos_por_categoria"]
+                ]))
+
+            if sections:
+                budget = AIService.CONTEXT_TOKEN_BUDGET // len(sections)
+                for title, lines in sections:
+                    formatted += AIService._section(title, lines, budget)
 
         # Resumen general
         insights = self.analyze_data_for_context(context)
@@ -436,36 +515,64 @@ class AIService:
 - NO sugieras consultas SQL - EJECÚTALAS directamente con los datos disponibles
 - Prioriza la información más relevante para la pregunta del usuario"""
 
-    def process_query(self, user_message, user_id, conversation_history=None):
-        """Procesa consultas con acceso completo a la base de datos"""
-        try:
-            # Obtener contexto completo
-            context = self.get_comprehensive_context()
-            formatted_context = self.format_data_for_llm(
-                context, include_schema=True, include_stats=True
-            )
+    def _build_chat_request(self, user_message, conversation_history=None, summary=None):
+        """Arma el contexto, el historial y el prompt de una pregunta del chat
 
-            # Construir el historial de conversación
-            messages = []
+        El historial se recorta al presupuesto de ConversationMemory; summary
+        es el resumen de los turnos anteriores que ya no se envían literalmente.
+        """
+        # Obtener contexto completo (compartido y cacheado)
+        snapshot = self.get_context_snapshot()
+        formatted_context = snapshot["formatted"]
 
-            if conversation_history:
-                for msg in conversation_history[-5:]:
-                    role = "user" if msg.get("is_user") else "model"
-                    messages.append({"role": role, "parts": [msg.get("content", "")]})
+        # Construir el historial de conversación
+        messages = []
 
-            # Construir el prompt completo
-            full_prompt = f"""{self.create_system_prompt()}
+        for msg in ConversationMemory.fit(conversation_history):
+            role = "user" if msg.get("is_user") else "model"
+            messages.append({"role": role, "parts": [msg.get("content", "")]})
 
-{formatted_context}
+        summary_section = ""
+        if summary:
+            summary_section = f"\nRESUMEN DE LA CONVERSACIÓN ANTERIOR:\n{summary}\n"
 
+        # Construir el prompt completo
+        full_prompt = f"""{self.create_system_prompt()}
+
+{formatted_context}
+{summary_section}
 PREGUNTA DEL USUARIO: {user_message}
 
 Responde de manera completa usando todos los datos disponibles. Si la pregunta requiere análisis, hazlo con los datos proporcionados."""
 
+        return snapshot, messages, full_prompt
+
+    def process_query(self, user_message, user_id, conversation_history=None, summary=None):
+        """Procesa consultas con acceso completo a la base de datos"""
+        # Comandos conocidos: respuesta directa desde SQL, sin llamar al modelo
+        routed = IntentRouter.answer(user_message, help_text=self.get_help_message)
+        if routed is not None:
+            return routed
+
+        # Con conversación previa la pregunta puede depender de ella ("¿y el mes anterior?")
+        use_cache = not conversation_history and not summary
+        cached = AIService._response_cache.get(user_message) if use_cache else None
+        if cached is not None:
+            return cached
+
+        snapshot = None
+        messages = []
+        try:
+            snapshot, messages, full_prompt = self._build_chat_request(
+                user_message, conversation_history, summary
+            )
+
             # Generar respuesta con Gemini
-            chat = self.model.start_chat(history=messages)
-            response = chat.send_message(
-                full_prompt, generation_config=self.generation_config
+            response = GeminiClient.generate(
+                full_prompt,
+                generation_config=self.generation_config,
+                history=messages,
+                operation="chat",
             )
 
             # Verificar si la respuesta es válida
@@ -479,36 +586,94 @@ Responde de manera completa usando todos los datos disponibles. Si la pregunta r
                     if finish_reason == 2:
                         # Reintentar con contexto reducido
                         return self._retry_with_reduced_context(
-                            user_message, context, messages
+                            user_message, snapshot, messages
                         )
 
                 # Intentar obtener el texto
                 if candidate.content and candidate.content.parts:
-                    return candidate.content.parts[0].text
+                    text = candidate.content.parts[0].text
+                    if use_cache:
+                        AIService._response_cache.set(user_message, text)
+                    return text
 
             # Si llegamos aquí, intentar response.text como fallback
-            return response.text
+            text = response.text
+            if use_cache:
+                AIService._response_cache.set(user_message, text)
+            return text
 
         except Exception as e:
             error_msg = str(e)
             # Si es un error de seguridad, reintentar con menos contexto
-            if "finish_reason" in error_msg or "SAFETY" in error_msg.upper():
+            if snapshot and ("finish_reason" in error_msg or "SAFETY" in error_msg.upper()):
                 try:
                     return self._retry_with_reduced_context(
-                        user_message, context, messages
+                        user_message, snapshot, messages
                     )
                 except Exception as retry_error:
                     pass
 
             return f"Disculpa, tuve un problema al procesar tu consulta. Error técnico: {error_msg}\n\n¿Podrías intentar reformular tu pregunta?"
 
-    def _retry_with_reduced_context(self, user_message, context, messages):
+    def stream_query(self, user_message, user_id, conversation_history=None, summary=None):
+        """Igual que process_query pero produce la respuesta en fragmentos de texto
+
+        Si el modelo bloquea o falla antes de emitir texto se responde de una
+        vez con el contexto reducido, como en process_query.
+        """
+        routed = IntentRouter.answer(user_message, help_text=self.get_help_message)
+        if routed is not None:
+            yield routed
+            return
+
+        use_cache = not conversation_history and not summary
+        cached = AIService._response_cache.get(user_message) if use_cache else None
+        if cached is not None:
+            yield cached
+            return
+
+        snapshot = None
+        messages = []
+        parts = []
+        sent = False
+        # generate_stream es un generador y no se instrumenta solo: sus
+        # tramos (y el de _build_chat_request) cuelgan de este
+        with Tracer.span("AIService.stream_query"):
+            try:
+                snapshot, messages, full_prompt = self._build_chat_request(
+                    user_message, conversation_history, summary
+                )
+                with Tracer.span("GeminiClient.generate_stream", Span.CLIENT) as span:
+                    for text in GeminiClient.generate_stream(
+                        full_prompt,
+                        generation_config=self.generation_config,
+                        history=messages,
+                        operation="chat_stream",
+                    ):
+                        if text:
+                            sent = True
+                            parts.append(text)
+                            yield text
+                    if span is not None:
+                        span.set("chat.chunks", len(parts))
+                if sent and use_cache:
+                    AIService._response_cache.set(user_message, "".join(parts))
+                elif snapshot:
+                    yield self._retry_with_reduced_context(user_message, snapshot, messages)
+
+            except Exception as e:
+                if sent:
+                    yield "\n\n⚠️ *La respuesta se interrumpió. Intenta de nuevo.*"
+                elif snapshot:
+                    yield self._retry_with_reduced_context(user_message, snapshot, messages)
+                else:
+                    yield f"Disculpa, tuve un problema al procesar tu consulta. Error técnico: {str(e)}\n\n¿Podrías intentar reformular tu pregunta?"
+
+    def _retry_with_reduced_context(self, user_message, snapshot, messages):
         """Reintenta la consulta con contexto reducido"""
         try:
             # Usar solo estadísticas básicas, sin esquema completo
-            reduced_context = self.format_data_for_llm(
-                context, include_schema=False, include_stats=True
-            )
+            reduced_context = snapshot["formatted_reduced"]
 
             # Detectar si el usuario pide un diagrama
             wants_diagram = any(
@@ -552,12 +717,13 @@ PREGUNTA: {user_message}
 
 Responde de forma útil y concisa basándote en los datos disponibles."""
 
-            response = self.model.generate_content(
+            response = GeminiClient.generate(
                 simple_prompt,
                 generation_config={
                     "temperature": 0.5,
                     "max_output_tokens": 2048,
                 },
+                operation="chat_reducido",
             )
 
             # Verificar respuesta válida
@@ -570,11 +736,11 @@ Responde de forma útil y concisa basándote en los datos disponibles."""
 
         except Exception as e:
             # Último intento: respuesta genérica útil
-            return self._generate_fallback_response(user_message, context)
+            return self._generate_fallback_response(user_message, snapshot)
 
-    def _generate_fallback_response(self, user_message, context):
+    def _generate_fallback_response(self, user_message, snapshot):
         """Genera una respuesta de respaldo cuando Gemini falla"""
-        stats = self.get_advanced_stats()
+        stats = snapshot["stats"]
 
         # Detectar si el usuario pide un diagrama
         wants_diagram = any(
@@ -633,48 +799,77 @@ Responde de forma útil y concisa basándote en los datos disponibles."""
 
         return response
 
-    def get_quick_insights(self):
-        """Genera insights rápidos del estado actual"""
+    def get_quick_insights(self, refresh=False):
+        """Genera insights rápidos del estado actual (cacheados por versión de datos)"""
         try:
-            context = self.get_comprehensive_context()
+            return self._cached_panel("insights", self._generate_insights, refresh)
+        except Exception as e:
+            return f"Error generando insights: {str(e)}"
 
-            prompt = f"""{self.create_system_prompt()}
+    def suggest_questions(self, refresh=False):
+        """Sugiere preguntas inteligentes basadas en los datos actuales (cacheadas)"""
+        try:
+            return self._cached_panel("sugerencias", self._generate_suggestions, refresh)
+        except Exception as e:
+            return "¿Qué te gustaría saber sobre tu inventario?"
 
-{self.format_data_for_llm(context, include_schema=False, include_stats=True)}
+    def cached_panels(self):
+        """Insights y sugerencias ya calculados para la versión actual (None si faltan)"""
+        version = DataVersion.current()
+        return (
+            AIService._panel_cache.get(("insights", version)),
+            AIService._panel_cache.get(("sugerencias", version)),
+        )
+
+    def prefetch_panels(self):
+        """Lanza en segundo plano y en paralelo el cálculo de insights y sugerencias
+
+        Las peticiones que lleguen mientras tanto esperan el mismo cálculo en
+        la caché en lugar de repetir la llamada al modelo.
+        """
+        return (
+            AIService._executor.submit(self.get_quick_insights),
+            AIService._executor.submit(self.suggest_questions),
+        )
+
+    def _cached_panel(self, name, compute, refresh=False):
+        key = (name, DataVersion.current())
+        if refresh:
+            AIService._panel_cache.invalidate(key)
+        return AIService._panel_cache.get_or_set(key, compute)
+
+    def _generate_insights(self):
+        snapshot = self.get_context_snapshot()
+
+        prompt = f"""{self.create_system_prompt()}
+
+{snapshot["formatted_reduced"]}
 
 Genera un resumen ejecutivo breve (3-5 puntos) con los insights más importantes del inventario actual. 
 Incluye alertas si hay productos agotados o stock bajo. Sé conciso y directo."""
 
-            response = self.model.generate_content(
-                prompt, generation_config=self.generation_config
-            )
-
-            return response.text
+        response = GeminiClient.generate(
+            prompt, generation_config=self.generation_config, operation="insights"
+        )
 
-        except Exception as e:
-            return f"Error generando insights: {str(e)}"
+        return response.text
 
-    def suggest_questions(self):
-        """Sugiere preguntas inteligentes basadas en los datos actuales"""
-        try:
-            context = self.get_comprehensive_context()
+    def _generate_suggestions(self):
+        snapshot = self.get_context_snapshot()
 
-            prompt = f"""{self.create_system_prompt()}
+        prompt = f"""{self.create_system_prompt()}
 
-{self.format_data_for_llm(context, include_schema=False, include_stats=True)}
+{snapshot["formatted_reduced"]}
 
 Basándote en los datos actuales del inventario, sugiere 5 preguntas inteligentes que el usuario podría hacerte para obtener insights valiosos. 
 Las preguntas deben ser específicas y relevantes a la situación actual del negocio.
 Formato: Solo lista las preguntas, una por línea, con emoji al inicio."""
 
-            response = self.model.generate_content(
-                prompt, generation_config=self.generation_config
-            )
-
-            return response.text
+        response = GeminiClient.generate(
+            prompt, generation_config=self.generation_config, operation="sugerencias"
+        )
 
-        except Exception as e:
-            return "¿Qué te gustaría saber sobre tu inventario?"
+        return response.text
 
     def get_help_message(self):
         """Mensaje de ayuda conversacional"""
@@ -0,0 +1,193 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.models.chatbot_message import ChatbotMessage
+from app.services.gemini_client import GeminiClient
+
+
+class ConversationMemory:
+    """Memoria de conversación del chatbot acotada por tokens
+
+    El prompt recibe el resumen acumulado de los turnos antiguos (guardado en
+    chatbot_summaries) más los turnos recientes que quepan en
+    AI_HISTORY_TOKEN_BUDGET, cada uno recortado. Tras guardar cada respuesta
+    se compacta en segundo plano: los turnos que ya no caben se incorporan al
+    resumen, de forma incremental.
+    """
+
+    BUDGET = int(os.getenv("AI_HISTORY_TOKEN_BUDGET", 1200))
+    # Parte del presupuesto reservada para el resumen
+    SUMMARY_SHARE = 0.3
+    # Máximo de tokens de un mensaje individual dentro del historial
+    MAX_TURN_TOKENS = 400
+    # Mensajes sin resumir que se leen como máximo
+    FETCH_LIMIT = 30
+
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-memory")
+    _pending = set()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def summary_budget():
+        return int(ConversationMemory.BUDGET * ConversationMemory.SUMMARY_SHARE)
+
+    @staticmethod
+    def turn_budget():
+        """Tokens máximos de un mensaje: una respuesta larga se recorta en lugar de excluirse"""
+        recent = ConversationMemory.BUDGET - ConversationMemory.summary_budget()
+        return min(ConversationMemory.MAX_TURN_TOKENS, max(recent // 2, 1))
+
+    @staticmethod
+    def load(user_id):
+        """Resumen y turnos recientes del usuario listos para el prompt"""
+        row = ChatbotMessage.get_summary(user_id)
+        summary = ConversationMemory.clip(
+            row["summary"] if row else "", ConversationMemory.summary_budget()
+        )
+        messages = ChatbotMessage.get_messages_after(
+            user_id, row["last_message_id"] if row else 0, ConversationMemory.FETCH_LIMIT
+        )
+
+        history = []
+        for msg in messages:
+            history.append({"is_user": True, "content": msg.get("message", "")})
+            history.append({"is_user": False, "content": msg.get("response", "")})
+
+        budget = ConversationMemory.BUDGET - GeminiClient.estimate_tokens(summary)
+        return {"summary": summary, "history": ConversationMemory.fit(history, budget)}
+
+    @staticmethod
+    def fit(conversation_history, budget=None):
+        """Mensajes más recientes que caben en el presupuesto, cada uno recortado"""
+        if not conversation_history:
+            return []
+        if budget is None:
+            budget = ConversationMemory.BUDGET
+
+        fitted = []
+        used = 0
+        for msg in reversed(conversation_history):
+            content = ConversationMemory.clip(
+                msg.get("content", ""), ConversationMemory.turn_budget()
+            )
+            cost = GeminiClient.estimate_tokens(content)
+            if used + cost > budget:
+                break
+            fitted.append({"is_user": msg.get("is_user"), "content": content})
+            used += cost
+
+        fitted.reverse()
+        # La conversación enviada al modelo empieza siempre por un mensaje del usuario
+        while fitted and not fitted[0].get("is_user"):
+            fitted.pop(0)
+        return fitted
+
+    @staticmethod
+    def clip(text, max_tokens):
+        """Recorta un texto a max_tokens aproximados"""
+        text = text or ""
+        max_chars = max_tokens * 4
+        if len(text) <= max_chars:
+            return text
+        return text[:max_chars].rstrip() + " …"
+
+    @staticmethod
+    def schedule_compact(user_id):
+        """Compacta la memoria del usuario en segundo plano (una tarea por usuario)"""
+        with ConversationMemory._lock:
+            if user_id in ConversationMemory._pending:
+                return
+            ConversationMemory._pending.add(user_id)
+        ConversationMemory._executor.submit(ConversationMemory._run_compact, user_id)
+
+    @staticmethod
+    def _run_compact(user_id):
+        try:
+            ConversationMemory.compact(user_id)
+        except Exception as e:
+            print(f"Error compactando la memoria del chatbot: {e}")
+        finally:
+            with ConversationMemory._lock:
+                ConversationMemory._pending.discard(user_id)
+
+    @staticmethod
+    def compact(user_id, summarizer=None):
+        """Incorpora al resumen los turnos que ya no caben; retorna True si cambió
+
+        Los turnos sin resumir se incorporan en orden, del más antiguo al más
+        reciente y en lotes de FETCH_LIMIT, hasta llegar a los que caben en el
+        presupuesto: si se acumularon más de FETCH_LIMIT no se salta ninguno.
+        """
+        row = ChatbotMessage.get_summary(user_id)
+        summary = row["summary"] if row else ""
+        last_id = row["last_message_id"] if row else 0
+        messages = ChatbotMessage.get_messages_after(user_id, last_id, ConversationMemory.FETCH_LIMIT)
+        if not messages:
+            return False
+
+        # Turnos completos (pregunta y respuesta) que caben, del más reciente hacia atrás
+        recent_budget = ConversationMemory.BUDGET - ConversationMemory.summary_budget()
+        used = 0
+        keep = 0
+        for msg in reversed(messages):
+            cost = sum(
+                GeminiClient.estimate_tokens(
+                    ConversationMemory.clip(msg.get(field) or "", ConversationMemory.turn_budget())
+                )
+                for field in ("message", "response")
+            )
+            if used + cost > recent_budget:
+                break
+            used += cost
+            keep += 1
+
+        # Se resume todo lo anterior al primer turno que se conserva
+        keep_from = messages[len(messages) - keep]["id"] if keep else messages[-1]["id"] + 1
+        summarizer = summarizer or ConversationMemory.summarize
+        changed = False
+        while True:
+            overflow = ChatbotMessage.get_messages_between(
+                user_id, last_id, keep_from, ConversationMemory.FETCH_LIMIT
+            )
+            if not overflow:
+                return changed
+            summary = ConversationMemory.clip(
+                summarizer(summary, overflow), ConversationMemory.summary_budget()
+            )
+            last_id = overflow[-1]["id"]
+            ChatbotMessage.save_summary(user_id, summary, last_id)
+            changed = True
+
+    @staticmethod
+    def summarize(previous, turns):
+        """Actualiza el resumen con nuevos turnos usando el modelo (o un extracto si falla)"""
+        conversation = "\n".join(
+            f"Usuario: {ConversationMemory.clip(t.get('message') or '', 150)}\n"
+            f"Asistente: {ConversationMemory.clip(t.get('response') or '', 250)}"
+            for t in turns
+        )
+        prompt = f"""Actualiza el resumen de una conversación entre un usuario y un asistente de inventario.
+Conserva los datos, cifras, productos y preferencias que el usuario pueda volver a mencionar.
+Responde solo con el resumen, en español, en menos de {ConversationMemory.summary_budget() * 3} caracteres.
+
+RESUMEN ACTUAL:
+{previous or "(vacío)"}
+
+NUEVOS TURNOS:
+{conversation}"""
+        try:
+            response = GeminiClient.generate(
+                prompt,
+                generation_config={
+                    "temperature": 0.2,
+                    "max_output_tokens": ConversationMemory.summary_budget(),
+                },
+                operation="resumen_conversacion",
+            )
+            return response.text.strip()
+        except Exception as e:
+            print(f"Error resumiendo la conversación: {e}")
+            extract = "\n".join(
+                f"- {ConversationMemory.clip(t.get('message') or '', 40)}" for t in turns
+            )
+            return f"{previous}\n{extract}".strip()
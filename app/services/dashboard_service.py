@@ -0,0 +1,203 @@
+import os
+from datetime import date
+from config.database import Database
+from config.cache import DataVersion, TTLCache
+from app.models.product import Product
+from app.models.sale import Sale
+from app.models.purchase import Purchase
+from app.models.rollup import Rollup
+
+
+class DashboardService:
+    """Estadísticas del dashboard calculadas en consultas agregadas y cacheadas
+
+    Las entradas se guardan con la versión de los datos (DataVersion), por lo
+    que cualquier escritura de los modelos las invalida; el TTL acota el
+    tiempo que pueden quedar desactualizadas frente a cambios de otros procesos.
+    """
+
+    _cache = TTLCache(
+        ttl=float(os.getenv('DASHBOARD_CACHE_TTL', 60)),
+        max_entries=32
+    )
+
+    @staticmethod
+    def get_stats():
+        """KPIs principales del dashboard"""
+        return DashboardService._cached('stats', DashboardService._compute_stats)
+
+    @staticmethod
+    def get_chart_data():
+        """Series de las gráficas del dashboard"""
+        return DashboardService._cached('charts', DashboardService._compute_chart_data)
+
+    @staticmethod
+    def get_recent():
+        """Productos con stock bajo y últimas ventas y compras"""
+        return DashboardService._cached('recent', lambda: {
+            'productos_bajo_stock': Product.get_low_stock(limit=10),
+            'ultimas_ventas': Sale.get_all(limit=5),
+            'ultimas_compras': Purchase.get_all(limit=5),
+        })
+
+    @staticmethod
+    def cache_stats():
+        """Estadísticas de aciertos de la caché del dashboard"""
+        stats = DashboardService._cache.stats()
+        stats['data_version'] = DataVersion.current()
+        return stats
+
+    @staticmethod
+    def invalidate():
+        """Vacía la caché del dashboard"""
+        DashboardService._cache.invalidate()
+
+    @staticmethod
+    def _cached(name, compute):
+        key = (name, DataVersion.current())
+        return DashboardService._cache.get_or_set(key, compute)
+
+    @staticmethod
+    def _compute_stats():
+        """Todos los contadores y totales en una sola consulta
+
+        Los totales de ventas y compras salen de resumen_mensual, no de
+        recorrer las tablas de documentos.
+        """
+        mes = Rollup.month_start(date.today())
+        query = """
+            SELECT
+                (SELECT COUNT(*) FROM productos) as total_productos,
+                (SELECT COUNT(*) FROM categorias WHERE activo = 1) as total_categorias,
+                (SELECT COUNT(*) FROM clientes WHERE activo = 1) as total_clientes,
+                (SELECT COUNT(*) FROM proveedores WHERE activo = 1) as total_proveedores,
+                (SELECT COUNT(*) FROM almacenes WHERE activo = 1) as total_almacenes,
+                (SELECT COALESCE(SUM(total), 0) FROM resumen_mensual
+                  WHERE documento = 'venta' AND mes = %s AND estado = 'completada') as ventas_mes,
+                (SELECT COALESCE(SUM(total), 0) FROM resumen_mensual
+                  WHERE documento = 'compra' AND mes = %s) as compras_mes,
+                (SELECT COALESCE(SUM(cantidad), 0) FROM resumen_mensual
+                  WHERE documento = 'venta') as total_ventas,
+                (SELECT COALESCE(SUM(cantidad), 0) FROM resumen_mensual
+                  WHERE documento = 'compra') as total_compras,
+                (SELECT COUNT(*) FROM movimientos_inventario) as total_movimientos
+        """
+        result = Database.execute_query(query, (mes, mes))
+        return dict(result[0]) if result else {}
+
+    @staticmethod
+    def _compute_chart_data():
+        """Todas las series de las gráficas en una sola consulta UNION ALL
+
+        Cada rama devuelve (serie, clave, etiqueta, cantidad, valor) con su
+        propio orden y límite; el orden final se reaplica en Python. Las series
+        mensuales se leen de resumen_mensual.
+        """
+        chart_data = {
+            "ventas_por_mes": [],
+            "compras_por_mes": [],
+            "productos_por_categoria": [],
+            "top_productos": [],
+            "ventas_vs_compras": [],
+            "stock_por_categoria": [],
+        }
+
+        query = """
+            (SELECT 'ventas_por_mes' as serie,
+                    DATE_FORMAT(r.mes, '%%Y-%%m') as clave,
+                    DATE_FORMAT(r.mes, '%%b %%Y') as etiqueta,
+                    SUM(r.cantidad) as cantidad,
+                    SUM(r.total) as valor
+             FROM resumen_mensual r
+             WHERE r.documento = 'venta'
+             GROUP BY r.mes
+             HAVING cantidad <> 0
+             ORDER BY r.mes DESC
+             LIMIT 12)
+            UNION ALL
+            (SELECT 'compras_por_mes',
+                    DATE_FORMAT(r.mes, '%%Y-%%m'),
+                    DATE_FORMAT(r.mes, '%%b %%Y'),
+                    SUM(r.cantidad) as cantidad,
+                    SUM(r.total)
+             FROM resumen_mensual r
+             WHERE r.documento = 'compra'
+             GROUP BY r.mes
+             HAVING cantidad <> 0
+             ORDER BY r.mes DESC
+             LIMIT 12)
+            UNION ALL
+            (SELECT 'productos_por_categoria',
+                    CAST(c.id AS CHAR), c.nombre, COUNT(p.id) as cantidad, 0
+             FROM categorias c
+             LEFT JOIN productos p ON c.id = p.categoria_id
+             GROUP BY c.id, c.nombre
+             ORDER BY cantidad DESC
+             LIMIT 10)
+            UNION ALL
+            (SELECT 'top_productos',
+                    CAST(p.id AS CHAR), p.nombre, SUM(dv.cantidad) as cantidad, SUM(dv.subtotal)
+             FROM detalle_ventas dv
+             INNER JOIN productos p ON dv.producto_id = p.id
+             GROUP BY p.id, p.nombre
+             HAVING cantidad > 0
+             ORDER BY cantidad DESC
+             LIMIT 5)
+            UNION ALL
+            (SELECT 'stock_por_categoria',
+                    CAST(c.id AS CHAR), c.nombre,
+                    COALESCE(SUM(p.stock_actual), 0) as cantidad,
+                    COALESCE(SUM(p.stock_actual * p.precio_venta), 0)
+             FROM categorias c
+             LEFT JOIN productos p ON c.id = p.categoria_id
+             GROUP BY c.id, c.nombre
+             ORDER BY cantidad DESC
+             LIMIT 8)
+        """
+
+        try:
+            rows = Database.execute_query(query) or []
+        except Exception as e:
+            print(f"Error obteniendo datos de gráficas: {e}")
+            return chart_data
+
+        series = {}
+        for row in rows:
+            series.setdefault(row['serie'], []).append(row)
+
+        # Meses de más antiguo a más reciente; el resto de mayor a menor
+        for name in ('ventas_por_mes', 'compras_por_mes'):
+            chart_data[name] = [
+                {
+                    "mes": r["etiqueta"],
+                    "total": float(r["valor"]),
+                    "cantidad": int(r["cantidad"]),
+                }
+                for r in sorted(series.get(name, []), key=lambda r: r['clave'])
+            ]
+
+        def by_quantity(name):
+            return sorted(series.get(name, []), key=lambda r: r['cantidad'], reverse=True)
+
+        chart_data["productos_por_categoria"] = [
+            {"categoria": r["etiqueta"], "cantidad": int(r["cantidad"])}
+            for r in by_quantity('productos_por_categoria')
+        ]
+        chart_data["top_productos"] = [
+            {
+                "nombre": r["etiqueta"],
+                "vendido": int(r["cantidad"]),
+                "ingresos": float(r["valor"]),
+            }
+            for r in by_quantity('top_productos')
+        ]
+        chart_data["stock_por_categoria"] = [
+            {
+                "categoria": r["etiqueta"],
+                "stock": int(r["cantidad"]),
+                "valor": float(r["valor"]),
+            }
+            for r in by_quantity('stock_por_categoria')
+        ]
+
+        return chart_data
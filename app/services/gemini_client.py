@@ -0,0 +1,209 @@
+import os
+import random
+import threading
+import time
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from dotenv import load_dotenv
+from config.metrics import RequestMetrics
+from config.tracing import Span, Tracer
+
+load_dotenv()
+
+
+class GeminiClient:
+    """Cliente de Gemini único por proceso
+
+    genai.configure y el GenerativeModel se crean una sola vez, de forma
+    perezosa, y se reutilizan en todas las peticiones (la conexión del
+    transporte queda abierta entre llamadas). Cada llamada tiene timeout,
+    reintentos con backoff exponencial para errores transitorios y registra
+    latencia y tokens consumidos.
+    """
+
+    MODEL_NAME = os.getenv("GEMINI_MODEL", "gemini-2.5-pro")
+    TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", 60))
+    MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", 2))
+    BACKOFF = float(os.getenv("GEMINI_BACKOFF", 1.0))
+
+    # Errores que vale la pena reintentar (cuota, sobrecarga, cortes de red)
+    TRANSIENT_ERRORS = (
+        google_exceptions.ResourceExhausted,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.DeadlineExceeded,
+        google_exceptions.InternalServerError,
+        google_exceptions.TooManyRequests,
+        ConnectionError,
+        TimeoutError,
+    )
+
+    _model = None
+    _lock = threading.Lock()
+    _metrics_lock = threading.Lock()
+    _metrics = {}
+
+    @staticmethod
+    def get_model():
+        """Retorna el modelo configurado, inicializándolo en la primera llamada"""
+        if GeminiClient._model is None:
+            with GeminiClient._lock:
+                if GeminiClient._model is None:
+                    api_key = os.getenv("GEMINI_API_KEY")
+                    if not api_key or api_key == "tu-api-key-aqui":
+                        raise ValueError(
+                            "GEMINI_API_KEY no está configurada. "
+                            "Por favor, configura tu API key en el archivo .env"
+                        )
+                    genai.configure(api_key=api_key)
+                    GeminiClient._model = genai.GenerativeModel(GeminiClient.MODEL_NAME)
+        return GeminiClient._model
+
+    @staticmethod
+    def estimate_tokens(text):
+        """Estimación aproximada de tokens (~4 caracteres por token)"""
+        return (len(text) + 3) // 4
+
+    @staticmethod
+    def generate(prompt, generation_config=None, history=None, operation="generate"):
+        """Genera contenido con reintentos y métricas
+
+        history es una lista de mensajes {"role", "parts"} previos; se envía
+        junto con el prompt como una conversación.
+        """
+        model = GeminiClient.get_model()
+        contents = prompt
+        if history:
+            contents = list(history) + [{"role": "user", "parts": [prompt]}]
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = model.generate_content(
+                    contents,
+                    generation_config=generation_config,
+                    request_options={"timeout": GeminiClient.TIMEOUT},
+                )
+            except GeminiClient.TRANSIENT_ERRORS as e:
+                GeminiClient._record(operation, time.perf_counter() - start, error=True)
+                if attempt >= GeminiClient.MAX_RETRIES:
+                    raise
+                attempt += 1
+                GeminiClient._record_retry(operation)
+                delay = GeminiClient.BACKOFF * (2 ** (attempt - 1))
+                delay += random.uniform(0, delay / 2)
+                print(f"Gemini {operation}: error transitorio ({e}), reintento {attempt} en {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                GeminiClient._record(operation, time.perf_counter() - start, error=True)
+                raise
+
+            GeminiClient._record(
+                operation, time.perf_counter() - start, usage=getattr(response, "usage_metadata", None)
+            )
+            return response
+
+    @staticmethod
+    def generate_stream(prompt, generation_config=None, history=None, operation="stream"):
+        """Genera contenido en streaming, produciendo el texto de cada fragmento
+
+        Solo se reintenta si el error ocurre antes del primer fragmento; una
+        vez enviado texto al cliente, el error se propaga.
+        """
+        model = GeminiClient.get_model()
+        contents = prompt
+        if history:
+            contents = list(history) + [{"role": "user", "parts": [prompt]}]
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            first_chunk = None
+            response = None
+            try:
+                response = model.generate_content(
+                    contents,
+                    generation_config=generation_config,
+                    stream=True,
+                    request_options={"timeout": GeminiClient.TIMEOUT},
+                )
+                for chunk in response:
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+                    if chunk.candidates and chunk.candidates[0].content.parts:
+                        yield chunk.text
+            except GeminiClient.TRANSIENT_ERRORS as e:
+                GeminiClient._record(operation, time.perf_counter() - start, error=True)
+                if first_chunk is not None or attempt >= GeminiClient.MAX_RETRIES:
+                    raise
+                attempt += 1
+                GeminiClient._record_retry(operation)
+                delay = GeminiClient.BACKOFF * (2 ** (attempt - 1))
+                delay += random.uniform(0, delay / 2)
+                print(f"Gemini {operation}: error transitorio ({e}), reintento {attempt} en {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                GeminiClient._record(operation, time.perf_counter() - start, error=True)
+                raise
+
+            GeminiClient._record(
+                operation, time.perf_counter() - start, usage=getattr(response, "usage_metadata", None)
+            )
+            return
+
+    @staticmethod
+    def _record(operation, elapsed, usage=None, error=False):
+        """Acumula latencia y tokens de una llamada"""
+        prompt_tokens = int(getattr(usage, "prompt_token_count", 0) or 0)
+        output_tokens = int(getattr(usage, "candidates_token_count", 0) or 0)
+        RequestMetrics.add_time("llm", elapsed)
+        Tracer.add_span(
+            f"gemini.{operation}", elapsed, kind=Span.CLIENT, error="error" if error else None,
+            **{
+                "gen_ai.system": "gemini",
+                "gen_ai.request.model": GeminiClient.MODEL_NAME,
+                "gen_ai.usage.input_tokens": prompt_tokens,
+                "gen_ai.usage.output_tokens": output_tokens,
+            },
+        )
+        with GeminiClient._metrics_lock:
+            stats = GeminiClient._metrics.setdefault(operation, GeminiClient._empty_stats())
+            stats["calls"] += 1
+            stats["errors"] += 1 if error else 0
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+            stats["prompt_tokens"] += prompt_tokens
+            stats["output_tokens"] += output_tokens
+
+    @staticmethod
+    def _record_retry(operation):
+        with GeminiClient._metrics_lock:
+            stats = GeminiClient._metrics.setdefault(operation, GeminiClient._empty_stats())
+            stats["retries"] += 1
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+        }
+
+    @staticmethod
+    def metrics():
+        """Métricas acumuladas por operación: llamadas, errores, latencia y tokens"""
+        with GeminiClient._metrics_lock:
+            metrics = {name: dict(stats) for name, stats in GeminiClient._metrics.items()}
+        for stats in metrics.values():
+            stats["avg_seconds"] = (
+                round(stats["total_seconds"] / stats["calls"], 4) if stats["calls"] else 0.0
+            )
+            stats["total_seconds"] = round(stats["total_seconds"], 4)
+            stats["max_seconds"] = round(stats["max_seconds"], 4)
+        return metrics
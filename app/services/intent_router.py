@@ -0,0 +1,155 @@
+import re
+import threading
+from app.models.product import Product
+from app.models.purchase import Purchase
+from app.models.report import Report
+from app.models.rollup import Rollup
+from app.models.sale import Sale
+from app.services.response_cache import ResponseCache
+
+
+class IntentRouter:
+    """Clasificador local de intenciones del chatbot
+
+    Reconoce los comandos fijos del chatbot (ayuda, buscar producto, resumen
+    de ventas/compras, stock bajo) con expresiones regulares sobre el texto
+    normalizado y los responde con consultas parametrizadas y plantillas,
+    sin llamar al modelo. Los patrones están anclados: cualquier pregunta
+    abierta no coincide y sigue hacia Gemini.
+    """
+
+    PATTERNS = [
+        ('ayuda', re.compile(r'^(ayuda|help|comandos|que puedes hacer)$')),
+        ('buscar_producto', re.compile(
+            r'^(?:buscar|busca|buscame|encuentra|encontrar)\s+'
+            r'(?:el\s+|los\s+|un\s+)?productos?\s+(?P<termino>.+)$'
+        )),
+        ('resumen_ventas', re.compile(
+            r'^(?:resumen|estadisticas)\s+(?:de\s+)?(?:las\s+)?ventas(?:\s+del\s+mes)?$'
+        )),
+        ('resumen_compras', re.compile(
+            r'^(?:resumen|estadisticas)\s+(?:de\s+)?(?:las\s+)?compras(?:\s+del\s+mes)?$'
+        )),
+        ('stock_bajo', re.compile(
+            r'^(?:(?:los\s+)?productos?\s+)?(?:con\s+)?'
+            r'(?:stock\s+bajo|bajo\s+stock|poco\s+stock|poco\s+inventario|inventario\s+bajo)$'
+        )),
+    ]
+
+    # Máximo de filas listadas en una respuesta
+    LIMIT = 15
+
+    _lock = threading.Lock()
+    _counts = {}
+
+    @staticmethod
+    def classify(message):
+        """Retorna (intención, parámetros) o None si es una pregunta abierta"""
+        text = ResponseCache.normalize(message)
+        for intent, pattern in IntentRouter.PATTERNS:
+            match = pattern.match(text)
+            if match:
+                return intent, match.groupdict()
+        return None
+
+    @staticmethod
+    def answer(message, help_text=None):
+        """Responde el mensaje si es un comando conocido; None para delegar al modelo"""
+        routed = IntentRouter.classify(message)
+        if routed is None:
+            IntentRouter._count('llm')
+            return None
+
+        intent, params = routed
+        if intent == 'ayuda':
+            if help_text is None:
+                IntentRouter._count('llm')
+                return None
+            response = help_text()
+        else:
+            response = getattr(IntentRouter, f"_{intent}")(**params)
+        IntentRouter._count(intent)
+        return response
+
+    @staticmethod
+    def stats():
+        """Mensajes respondidos por cada intención y los delegados al modelo ('llm')"""
+        with IntentRouter._lock:
+            return dict(IntentRouter._counts)
+
+    @staticmethod
+    def _count(intent):
+        with IntentRouter._lock:
+            IntentRouter._counts[intent] = IntentRouter._counts.get(intent, 0) + 1
+
+    @staticmethod
+    def _buscar_producto(termino):
+        products = Product.search(termino, limit=IntentRouter.LIMIT)
+        if not products:
+            return f"🔍 No encontré productos que coincidan con **{termino}**."
+
+        response = f"🔍 **Productos que coinciden con \"{termino}\":**\n\n"
+        response += "| Código | Producto | Categoría | Precio | Stock |\n"
+        response += "|---|---|---|---|---|\n"
+        for p in products:
+            response += (
+                f"| {p.get('codigo')} | {p.get('nombre')} | {p.get('categoria') or '-'} "
+                f"| ${float(p.get('precio_venta') or 0):,.2f} | {p.get('stock_actual')} |\n"
+            )
+        if len(products) == IntentRouter.LIMIT:
+            response += f"\n*Se muestran los primeros {IntentRouter.LIMIT} resultados.*"
+        return response
+
+    @staticmethod
+    def _resumen_ventas():
+        resumen = Report.resumen_general()
+        response = "📊 **Resumen de ventas:**\n\n"
+        response += f"- Ventas del mes: **${float(Sale.total_ventas_mes() or 0):,.2f}**\n"
+        response += (
+            f"- Ventas completadas (histórico): **{int(resumen.get('total_ventas_completadas') or 0)}** "
+            f"por **${float(resumen.get('ingresos_totales') or 0):,.2f}**\n"
+        )
+        response += f"- Clientes activos: **{int(resumen.get('total_clientes_activos') or 0)}**\n"
+        response += IntentRouter._por_estado(Report.ventas_por_estado())
+
+        top = Report.productos_mas_vendidos(limit=5)
+        if top:
+            response += "\n🏆 **Productos más vendidos:**\n"
+            for i, p in enumerate(top, 1):
+                response += f"{i}. {p.get('nombre')}: {p.get('total_vendido')} uds (${float(p.get('ingresos_totales') or 0):,.2f})\n"
+        return response
+
+    @staticmethod
+    def _resumen_compras():
+        response = "🧾 **Resumen de compras:**\n\n"
+        response += f"- Compras del mes: **${float(Purchase.total_compras_mes() or 0):,.2f}**\n"
+        response += IntentRouter._por_estado(Rollup.by_estado(Rollup.COMPRA))
+        return response
+
+    @staticmethod
+    def _por_estado(rows):
+        if not rows:
+            return ""
+        response = "\n**Por estado:**\n"
+        for row in rows:
+            response += (
+                f"- {(row.get('estado') or 'sin estado').capitalize()}: "
+                f"{int(row.get('cantidad') or 0)} (${float(row.get('monto_total') or 0):,.2f})\n"
+            )
+        return response
+
+    @staticmethod
+    def _stock_bajo():
+        products = Product.get_low_stock(limit=IntentRouter.LIMIT)
+        if not products:
+            return "✅ No hay productos con stock bajo (menos de 10 unidades)."
+
+        response = "⚠️ **Productos con stock bajo (menos de 10 unidades):**\n\n"
+        response += "| Producto | Categoría | Stock |\n"
+        response += "|---|---|---|\n"
+        for p in products:
+            marca = " 🔴" if not p.get('stock_actual') else ""
+            response += f"| {p.get('nombre')} | {p.get('categoria') or '-'} | {p.get('stock_actual')}{marca} |\n"
+        if len(products) == IntentRouter.LIMIT:
+            response += f"\n*Se muestran los {IntentRouter.LIMIT} con menos stock.*"
+        return response
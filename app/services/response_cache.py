@@ -0,0 +1,154 @@
+import math
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from config.cache import DataVersion, TTLCache
+
+
+class ResponseCache:
+    """Caché de respuestas del chatbot por pregunta y versión de los datos
+
+    La clave es la pregunta normalizada (minúsculas, sin acentos ni
+    puntuación) más la versión de los datos, así una escritura invalida
+    todas las respuestas. Si no hay coincidencia exacta se busca la
+    pregunta más parecida de la misma versión comparando embeddings
+    calculados localmente; por encima del umbral se reutiliza su respuesta,
+    siempre que ambas preguntas tengan exactamente los mismos números y
+    códigos (un año, un top N o un código de producto cambian la respuesta
+    aunque el resto del texto sea casi igual).
+    """
+
+    # Las preguntas muy cortas suelen depender de la conversación ("¿y ayer?")
+    MIN_WORDS = 3
+
+    def __init__(self, ttl=900, max_entries=256, similarity=0.9, embedder=None):
+        self.similarity = similarity
+        self.embedder = embedder or ResponseCache.hashed_embedding
+        self._cache = TTLCache(ttl=ttl, max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._stats = {
+            'exact_hits': 0,
+            'semantic_hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'skipped': 0,
+        }
+
+    @staticmethod
+    def normalize(text):
+        """Minúsculas, sin acentos, sin puntuación y con espacios simples"""
+        text = unicodedata.normalize('NFKD', text.lower())
+        text = ''.join(c for c in text if not unicodedata.combining(c))
+        text = re.sub(r'[^\w\s]', ' ', text)
+        return ' '.join(text.split())
+
+    @staticmethod
+    def hashed_embedding(text, dimensions=512):
+        """Embedding local: palabras y trigramas de caracteres con hashing, normalizado
+
+        No requiere modelos externos y tolera variaciones de orden, plurales y
+        errores de tipeo menores.
+        """
+        vector = {}
+        words = text.split()
+        features = list(words)
+        for word in words:
+            padded = f" {word} "
+            features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+        for feature in features:
+            index = zlib.crc32(feature.encode('utf-8')) % dimensions
+            vector[index] = vector.get(index, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {k: v / norm for k, v in vector.items()} if norm else {}
+
+    @staticmethod
+    def anchors(normalized):
+        """Palabras con dígitos (años, cantidades, códigos) que deben coincidir exactamente"""
+        return frozenset(word for word in normalized.split() if any(c.isdigit() for c in word))
+
+    @staticmethod
+    def cosine(a, b):
+        """Similitud coseno entre dos vectores dispersos ya normalizados"""
+        if len(a) > len(b):
+            a, b = b, a
+        return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+    def cacheable(self, normalized):
+        return len(normalized.split()) >= ResponseCache.MIN_WORDS
+
+    def get(self, question):
+        """Respuesta cacheada para la pregunta o None"""
+        normalized = ResponseCache.normalize(question)
+        if not self.cacheable(normalized):
+            self._count('skipped')
+            return None
+
+        version = DataVersion.current()
+        entry = self._cache.get((version, normalized))
+        if entry is not None:
+            self._count('exact_hits')
+            return entry[2]
+
+        if self.similarity < 1:
+            vector = self.embedder(normalized)
+            anchors = ResponseCache.anchors(normalized)
+            best_key, best_score = None, self.similarity
+            for key, (candidate, candidate_anchors, _) in self._cache.items():
+                if key[0] != version or candidate_anchors != anchors:
+                    continue
+                score = ResponseCache.cosine(vector, candidate)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is not None:
+                entry = self._cache.get(best_key)
+                if entry is not None:
+                    self._count('semantic_hits')
+                    return entry[2]
+
+        self._count('misses')
+        return None
+
+    def set(self, question, response):
+        """Guarda la respuesta de una pregunta para la versión actual de los datos"""
+        normalized = ResponseCache.normalize(question)
+        if not self.cacheable(normalized) or not response:
+            return
+        self._cache.set(
+            (DataVersion.current(), normalized),
+            (self.embedder(normalized), ResponseCache.anchors(normalized), response),
+        )
+        self._count('stores')
+
+    def invalidate(self):
+        self._cache.invalidate()
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def stats(self):
+        """Aciertos exactos y por similitud, fallos y estado de la caché"""
+        with self._lock:
+            stats = dict(self._stats)
+        cache_stats = self._cache.stats()
+        lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+        hits = stats['exact_hits'] + stats['semantic_hits']
+        stats['hit_rate'] = round(hits / lookups, 4) if lookups else 0.0
+        stats['entries'] = cache_stats['entries']
+        stats['evictions'] = cache_stats['evictions']
+        stats['expirations'] = cache_stats['expirations']
+        stats['ttl'] = cache_stats['ttl']
+        stats['max_entries'] = cache_stats['max_entries']
+        stats['similarity'] = self.similarity
+        return stats
+
+    @staticmethod
+    def from_env():
+        """Crea la caché con la configuración de AI_RESPONSE_CACHE_*"""
+        return ResponseCache(
+            ttl=float(os.getenv('AI_RESPONSE_CACHE_TTL', 900)),
+            max_entries=int(os.getenv('AI_RESPONSE_CACHE_SIZE', 256)),
+            similarity=float(os.getenv('AI_RESPONSE_CACHE_SIMILARITY', 0.9)),
+        )
@@ -0,0 +1,219 @@
+import os
+import re
+import sqlparse
+from sqlparse import tokens as T
+from config.database import Database
+
+
+class SqlSandbox:
+    """Ejecución acotada de consultas SQL generadas por el modelo
+
+    La consulta se analiza con sqlparse: debe ser una única sentencia SELECT
+    (o WITH ... SELECT) sin comentarios, sin funciones peligrosas y que lea
+    solo tablas permitidas. Antes de ejecutarla se fuerza un LIMIT y se añade
+    el hint MAX_EXECUTION_TIME; corre en el pool de solo lectura y el
+    resultado se lee por lotes y se trunca.
+    """
+
+    # Tablas de negocio consultables (quedan fuera usuarios, sesiones e historial del chat)
+    ALLOWED_TABLES = {
+        'almacenes', 'categorias', 'clientes', 'compras', 'detalle_compras',
+        'detalle_ventas', 'movimientos_inventario', 'productos', 'proveedores',
+        'resumen_diario', 'resumen_mensual', 'roles', 'stock_almacen', 'ventas',
+    }
+
+    # Palabras clave que no pueden aparecer en ninguna parte de la consulta
+    FORBIDDEN_KEYWORDS = {
+        'INTO', 'OUTFILE', 'DUMPFILE', 'FOR UPDATE', 'LOCK', 'SHARE', 'HANDLER',
+        'PROCEDURE', 'CALL', 'SET', 'DO',
+    }
+
+    # Funciones que bloquean, leen archivos o consumen CPU deliberadamente
+    FORBIDDEN_FUNCTIONS = {
+        'SLEEP', 'BENCHMARK', 'LOAD_FILE', 'GET_LOCK', 'RELEASE_LOCK',
+        'RELEASE_ALL_LOCKS', 'IS_FREE_LOCK', 'IS_USED_LOCK', 'SYS_EXEC', 'SYS_EVAL',
+    }
+
+    TABLE_KEYWORDS = re.compile(r'^((NATURAL\s+)?((LEFT|RIGHT)\s+)?((INNER|OUTER|CROSS)\s+)?JOIN|STRAIGHT_JOIN|FROM)$')
+
+    MAX_ROWS = int(os.getenv('AI_SQL_MAX_ROWS', 100))
+    MAX_EXECUTION_MS = int(os.getenv('DB_READONLY_MAX_EXECUTION_MS', 5000))
+    MAX_CELL_CHARS = 500
+
+    @staticmethod
+    def execute(sql_query):
+        """Valida y ejecuta la consulta; retorna {"success", "data", "count", "truncated"} o {"error"}"""
+        try:
+            statement = SqlSandbox.validate(sql_query)
+            bounded = SqlSandbox.bound(statement)
+            rows, truncated = Database.fetch_readonly(bounded, max_rows=SqlSandbox.MAX_ROWS)
+        except ValueError as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"Error ejecutando la consulta: {e}"}
+
+        data = [SqlSandbox._serialize(row) for row in rows]
+        return {"success": True, "data": data, "count": len(data), "truncated": truncated}
+
+    @staticmethod
+    def validate(sql_query):
+        """Analiza la consulta y retorna la sentencia si cumple las reglas; ValueError si no"""
+        statements = [s for s in sqlparse.parse(sql_query.strip()) if s.token_first(skip_cm=False)]
+        if len(statements) != 1:
+            raise ValueError("Solo se permite una única sentencia SQL")
+        statement = statements[0]
+
+        if statement.get_type() != 'SELECT':
+            raise ValueError("Solo se permiten consultas SELECT por seguridad")
+
+        tokens = [t for t in statement.flatten()]
+        cte_names = set()
+        previous = None
+        for i, token in enumerate(tokens):
+            value = token.normalized.upper() if token.ttype in T.Keyword else token.value.upper()
+
+            if token.ttype in T.Comment:
+                raise ValueError("La consulta no puede contener comentarios")
+            if token.ttype in T.Keyword.DML and value != 'SELECT':
+                raise ValueError(f"Consulta no permitida: contiene {value}")
+            if token.ttype in T.Keyword.DDL or token.ttype in T.Keyword.DCL:
+                raise ValueError(f"Consulta no permitida: contiene {value}")
+            if token.ttype in T.Keyword and value in SqlSandbox.FORBIDDEN_KEYWORDS:
+                raise ValueError(f"Consulta no permitida: contiene {value}")
+            if token.ttype in T.Name.Variable or token.value.startswith('@'):
+                raise ValueError("La consulta no puede usar variables")
+            if value in SqlSandbox.FORBIDDEN_FUNCTIONS and SqlSandbox._next_value(tokens, i) == '(':
+                raise ValueError(f"Función no permitida: {value}")
+
+            # Nombres de las CTE (WITH nombre AS (...)) cuentan como tablas válidas
+            if previous is not None and token.ttype in T.Keyword and value == 'AS' \
+                    and SqlSandbox._next_value(tokens, i) == '(':
+                cte_names.add(previous.lower())
+            if not token.is_whitespace:
+                previous = token.value.strip('`')
+
+        for table in SqlSandbox.referenced_tables(tokens):
+            if table not in SqlSandbox.ALLOWED_TABLES and table not in cte_names:
+                raise ValueError(f"Tabla no permitida: {table}")
+
+        return statement
+
+    @staticmethod
+    def referenced_tables(tokens):
+        """Tablas que siguen a FROM / JOIN (también en subconsultas y listas con coma)
+
+        Un paréntesis tras FROM / JOIN / coma solo se admite si abre una
+        subconsulta; una tabla entre paréntesis, p. ej. FROM (usuarios), se
+        rechaza con ValueError porque escaparía a la lista de permitidas.
+        """
+        tables = []
+        significant = [t for t in tokens if not t.is_whitespace]
+        expecting = False
+        depth = 0
+        from_depth = None
+        for i, token in enumerate(significant):
+            value = token.normalized.upper() if token.ttype in T.Keyword else token.value
+
+            if token.ttype in T.Punctuation and value == '(':
+                if expecting:
+                    following = SqlSandbox._value_at(significant, i + 1).upper()
+                    if following not in ('SELECT', 'WITH'):
+                        raise ValueError("No se permiten tablas entre paréntesis")
+                depth += 1
+                expecting = False
+                continue
+            if token.ttype in T.Punctuation and value == ')':
+                depth -= 1
+                if from_depth is not None and depth < from_depth:
+                    from_depth = None
+                continue
+
+            if token.ttype in T.Keyword and SqlSandbox.TABLE_KEYWORDS.match(value):
+                expecting = True
+                from_depth = depth
+                continue
+
+            if token.ttype in T.Keyword and from_depth == depth:
+                # Fin de la lista de tablas (WHERE, GROUP BY, ON, ...)
+                from_depth = None
+                expecting = False
+                continue
+
+            if expecting and (token.ttype in T.Name or token.ttype in T.Keyword or token.ttype in T.Literal.String.Symbol):
+                name = token.value.strip('`').lower()
+                # esquema.tabla: se valida el nombre completo
+                if SqlSandbox._value_at(significant, i + 1) == '.':
+                    name += '.' + SqlSandbox._value_at(significant, i + 2).strip('`').lower()
+                tables.append(name)
+                expecting = False
+                continue
+
+            if token.ttype in T.Punctuation and value == ',' and from_depth == depth:
+                expecting = True
+        return tables
+
+    @staticmethod
+    def bound(statement):
+        """Fuerza LIMIT (máximo MAX_ROWS + 1) y añade el hint MAX_EXECUTION_TIME"""
+        limit = SqlSandbox.MAX_ROWS + 1
+        tokens = list(statement.flatten())
+
+        depth = 0
+        select_index = None
+        limit_index = None
+        for i, token in enumerate(tokens):
+            if token.ttype in T.Punctuation and token.value == '(':
+                depth += 1
+            elif token.ttype in T.Punctuation and token.value == ')':
+                depth -= 1
+            elif depth == 0 and token.ttype in T.Keyword.DML and select_index is None:
+                select_index = i
+            elif depth == 0 and token.ttype in T.Keyword and token.normalized.upper() == 'LIMIT':
+                limit_index = i
+
+        # El hint va en el SELECT principal (en un WITH, el primero fuera de las CTE)
+        parts = [t.value for t in tokens]
+        if select_index is not None:
+            parts[select_index] += f" /*+ MAX_EXECUTION_TIME({SqlSandbox.MAX_EXECUTION_MS}) */"
+
+        if limit_index is None:
+            sql = ''.join(parts).rstrip().rstrip(';').rstrip()
+            return f"{sql} LIMIT {limit}"
+
+        head = ''.join(parts[:limit_index])
+        tail = ''.join(parts[limit_index + 1:]).strip().rstrip(';').strip()
+        match = re.match(r'^(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?$', tail, re.IGNORECASE)
+        if not match:
+            raise ValueError("Cláusula LIMIT no soportada")
+        if match.group(2) is not None:
+            offset, count = int(match.group(1)), int(match.group(2))
+        else:
+            offset, count = int(match.group(3) or 0), int(match.group(1))
+        return f"{head}LIMIT {min(count, limit)} OFFSET {offset}"
+
+    @staticmethod
+    def _serialize(row):
+        clean_row = {}
+        for key, value in row.items():
+            if hasattr(value, "isoformat"):
+                clean_row[key] = value.isoformat()
+            elif hasattr(value, "__float__") and not isinstance(value, (int, bool)):
+                clean_row[key] = float(value)
+            elif isinstance(value, (bytes, bytearray)):
+                clean_row[key] = value.decode('utf-8', errors='replace')[:SqlSandbox.MAX_CELL_CHARS]
+            elif isinstance(value, str) and len(value) > SqlSandbox.MAX_CELL_CHARS:
+                clean_row[key] = value[:SqlSandbox.MAX_CELL_CHARS] + '…'
+            else:
+                clean_row[key] = value
+        return clean_row
+
+    @staticmethod
+    def _next_value(tokens, index):
+        for token in tokens[index + 1:]:
+            if not token.is_whitespace:
+                return token.value
+        return None
+
+    @staticmethod
+    def _value_at(tokens, index):
+        return tokens[index].value if index < len(tokens) else ''
@@ -51,20 +51,52 @@ document.addEventListener('DOMContentLoaded', function() {
         refreshInsightsBtn.addEventListener('click', refreshInsights);
     }
     
-    // Botones de sugerencias
-    document.querySelectorAll('.suggestion-btn').forEach(btn => {
-        btn.addEventListener('click', function() {
-            const question = this.getAttribute('data-question');
-            messageInput.value = question;
-            messageInput.focus();
-            // Auto enviar
-            setTimeout(() => sendMessage(), 100);
-        });
+    // Botones de sugerencias (delegado: también cubre los que llegan después)
+    chatMessages.addEventListener('click', function(e) {
+        const btn = e.target.closest('.suggestion-btn');
+        if (!btn) return;
+        const question = btn.getAttribute('data-question');
+        messageInput.value = question;
+        messageInput.focus();
+        // Auto enviar
+        setTimeout(() => sendMessage(), 100);
     });
     
+    // Insights y sugerencias que el servidor aún estaba calculando
+    loadPendingPanels();
+    
     // Scroll automático al final
     scrollToBottom();
     
+    function loadPendingPanels() {
+        const insightsPanel = document.querySelector('#insights-panel[data-pending]');
+        const suggestionsPanel = document.querySelector('#suggestions-panel[data-pending]');
+        
+        // Ambas peticiones en paralelo; cada panel se completa al llegar su respuesta
+        if (insightsPanel) {
+            fetchPanel('/chatbot/get-insights/', insightsPanel, '.insights-content', 'insights_html');
+        }
+        if (suggestionsPanel) {
+            fetchPanel('/chatbot/get-suggestions/', suggestionsPanel, '.suggestions-buttons', 'suggestions_html');
+        }
+    }
+    
+    function fetchPanel(url, panel, contentSelector, field) {
+        fetch(url, { method: 'GET' })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success || !data[field]) {
+                throw new Error(data.error || 'Sin datos');
+            }
+            panel.querySelector(contentSelector).innerHTML = data[field];
+            panel.removeAttribute('data-pending');
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            panel.style.display = 'none';
+        });
+    }
+    
     function sendMessage() {
         const message = messageInput.value.trim();
         
@@ -87,6 +119,113 @@ document.addEventListener('DOMContentLoaded', function() {
         typingIndicator.style.display = 'flex';
         scrollToBottom();
         
+        // Sin soporte de streaming en el navegador, usar la petición completa
+        if (typeof ReadableStream === 'undefined' || typeof TextDecoder === 'undefined') {
+            sendMessageFull(message);
+            return;
+        }
+        
+        streamMessage(message)
+        .catch(error => {
+            typingIndicator.style.display = 'none';
+            addBotMessage('Error de conexión. Por favor, intenta de nuevo.', new Date().toISOString());
+            console.error('Error:', error);
+        })
+        .finally(() => {
+            // Rehabilitar input
+            messageInput.disabled = false;
+            sendBtn.disabled = false;
+            messageInput.focus();
+        });
+    }
+    
+    // Recibe la respuesta por Server-Sent Events y la va renderizando
+    async function streamMessage(message) {
+        const response = await fetch('/chatbot/send-message/stream/', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream',
+                'X-CSRFToken': getCookie('csrftoken')
+            },
+            body: JSON.stringify({ message: message })
+        });
+        
+        // Errores de validación llegan como JSON normal
+        if (!response.ok || !response.body) {
+            const data = await response.json();
+            typingIndicator.style.display = 'none';
+            addBotMessage('Lo siento, hubo un error: ' + data.error, new Date().toISOString());
+            return;
+        }
+        
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let rawText = '';
+        let messageText = null;
+        let renderPending = false;
+        let finished = false;
+        
+        // Renderizar como mucho una vez por frame aunque lleguen muchos fragmentos
+        function scheduleRender() {
+            if (renderPending) return;
+            renderPending = true;
+            requestAnimationFrame(() => {
+                renderPending = false;
+                if (finished) return;
+                messageText.innerHTML = formatMarkdown(rawText);
+                scrollToBottom();
+            });
+        }
+        
+        function handleEvent(event, data) {
+            if (event === 'chunk') {
+                if (!messageText) {
+                    typingIndicator.style.display = 'none';
+                    messageText = addBotMessage('', new Date().toISOString());
+                }
+                rawText += data.text;
+                scheduleRender();
+            } else if (event === 'done') {
+                typingIndicator.style.display = 'none';
+                if (!messageText) {
+                    messageText = addBotMessage('', data.timestamp);
+                }
+                // HTML definitivo renderizado por el servidor
+                finished = true;
+                messageText.innerHTML = data.response_html || formatMarkdown(data.response);
+                scrollToBottom();
+                renderMermaidDiagrams();
+            } else if (event === 'error') {
+                typingIndicator.style.display = 'none';
+                addBotMessage('Lo siento, hubo un error: ' + data.error, new Date().toISOString());
+            }
+        }
+        
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            
+            // Cada evento termina con una línea en blanco
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = buffer.slice(0, boundary);
+                buffer = buffer.slice(boundary + 2);
+                let event = 'message';
+                let data = '';
+                frame.split('\n').forEach(line => {
+                    if (line.startsWith('event:')) event = line.slice(6).trim();
+                    else if (line.startsWith('data:')) data += line.slice(5).trim();
+                });
+                if (data) handleEvent(event, JSON.parse(data));
+            }
+        }
+        typingIndicator.style.display = 'none';
+    }
+    
+    function sendMessageFull(message) {
         // Enviar mensaje al servidor
         fetch('/chatbot/send-message/', {
             method: 'POST',
@@ -161,10 +300,12 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Renderizar diagramas Mermaid si existen
         renderMermaidDiagrams();
+        
+        return messageDiv.querySelector('.message-text');
     }
     
-    // formatMarkdown ya no es necesario para mensajes nuevos,
-    // pero lo mantenemos por si se necesita para fallback o errores
+    // Render de markdown en el cliente: se usa para el texto parcial mientras
+    // llega la respuesta en streaming (el HTML final lo envía el servidor)
     function formatMarkdown(text) {
         // Almacenar bloques de código Mermaid temporalmente
         const mermaidBlocks = [];
@@ -368,7 +509,7 @@ document.addEventListener('DOMContentLoaded', function() {
         btn.disabled = true;
         btn.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Actualizando...';
         
-        fetch('/chatbot/get-insights/', {
+        fetch('/chatbot/get-insights/?refresh=1', {
             method: 'GET',
             headers: {
                 'X-CSRFToken': getCookie('csrftoken')
@@ -381,7 +522,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 addBotMessage('📊 **Insights Actualizados**\n\n' + data.insights, new Date().toISOString());
                 
                 // Obtener nuevas sugerencias
-                return fetch('/chatbot/get-suggestions/', {
+                return fetch('/chatbot/get-suggestions/?refresh=1', {
                     method: 'GET',
                     headers: {
                         'X-CSRFToken': getCookie('csrftoken')
@@ -44,43 +44,34 @@ class ChatbotView:
                 </div>
                 """
         else:
-            # Mensaje de bienvenida mejorado
-            insights_section = ""
+            # Mensaje de bienvenida mejorado. Si los insights o las sugerencias
+            # aún no están calculados se muestra un marcador que chatbot.js
+            # completa al recibirlos
             if quick_insights:
-                insights_section = f"""
-                <div class='insights-section'>
+                insights_content = ChatbotView.format_markdown(quick_insights)
+                insights_pending = ""
+            else:
+                insights_content = "<span class='spinner-border spinner-border-sm'></span> Analizando el inventario..."
+                insights_pending = " data-pending='1'"
+
+            insights_section = f"""
+                <div class='insights-section' id='insights-panel'{insights_pending}>
                     <h4><i class='fas fa-chart-line'></i> Estado Actual del Inventario</h4>
                     <div class='insights-content'>
-                        {ChatbotView.format_markdown(quick_insights)}
+                        {insights_content}
                     </div>
                 </div>
                 """
 
-            suggestions_section = ""
             if suggested_questions:
-                # Parsear las sugerencias y convertirlas en botones clickeables
-                suggestions_lines = suggested_questions.strip().split("\n")
-                suggestions_buttons = ""
-                for line in suggestions_lines:
-                    if line.strip():
-                        # Remover emojis y limpiar
-                        clean_question = line.strip()
-                        # Remover guiones y emojis al inicio
-                        import re
-
-                        clean_question = re.sub(r"^[-•\d.)\s]*", "", clean_question)
-                        clean_question = re.sub(
-                            r"^[\U0001F300-\U0001F9FF\s]+", "", clean_question
-                        )
-                        if clean_question:
-                            suggestions_buttons += f"""
-                            <button class='suggestion-btn' data-question="{clean_question.replace('"', "&quot;")}">
-                                <i class='fas fa-lightbulb'></i> {clean_question}
-                            </button>
-                            """
+                suggestions_buttons = ChatbotView.suggestion_buttons(suggested_questions)
+                suggestions_pending = ""
+            else:
+                suggestions_buttons = "<span class='spinner-border spinner-border-sm'></span> Preparando sugerencias..."
+                suggestions_pending = " data-pending='1'"
 
-                suggestions_section = f"""
-                <div class='suggestions-section'>
+            suggestions_section = f"""
+                <div class='suggestions-section' id='suggestions-panel'{suggestions_pending}>
                     <h4><i class='fas fa-magic'></i> Preguntas Sugeridas</h4>
                     <div class='suggestions-buttons'>
                         {suggestions_buttons}
@@ -498,6 +489,25 @@ class ChatbotView:
 
         return html
 
+    @staticmethod
+    def suggestion_buttons(suggested_questions):
+        """Convierte las sugerencias del modelo (una por línea) en botones clickeables"""
+        suggestions_buttons = ""
+        for line in suggested_questions.strip().split("\n"):
+            if line.strip():
+                # Remover guiones, numeración y emojis al inicio
+                clean_question = re.sub(r"^[-•\d.)\s]*", "", line.strip())
+                clean_question = re.sub(
+                    r"^[\U0001F300-\U0001F9FF\s]+", "", clean_question
+                )
+                if clean_question:
+                    suggestions_buttons += f"""
+                    <button class='suggestion-btn' data-question="{clean_question.replace('"', "&quot;")}">
+                        <i class='fas fa-lightbulb'></i> {clean_question}
+                    </button>
+                    """
+        return suggestions_buttons
+
     @staticmethod
     def format_markdown(text):
         """
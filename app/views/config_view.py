@@ -1,5 +1,7 @@
 from django.http import HttpResponse
+from django.utils.html import escape
 from app.views.layout import Layout
+from app.middleware.auth_middleware import AuthMiddleware
 
 class ConfigView:
     """Vista de Configuración"""
@@ -140,9 +142,16 @@ class ConfigView:
         else:
             db_rows = '<tr><td colspan="3" class="empty-state">No hay información disponible</td></tr>'
         
+        slow_queries_link = ""
+        if AuthMiddleware.is_admin(user):
+            slow_queries_link = '<a href="/configuracion/consultas-lentas/" class="btn btn-secondary">Consultas lentas</a>'
+        
         db_section = f"""
         <div class="card">
-            <div class="card-header"><i class="fas fa-database"></i> Información de Base de Datos</div>
+            <div class="card-header">
+                <span><i class="fas fa-database"></i> Información de Base de Datos</span>
+                {slow_queries_link}
+            </div>
             <div class="table-container">
                 <table>
                     <thead>
@@ -463,4 +472,83 @@ class ConfigView:
         """
         
         return HttpResponse(Layout.render('Cambiar Contraseña', user, 'configuracion', content))
-
+    
+    @staticmethod
+    def slow_queries(user, report, order_by, threshold_ms):
+        """Vista de las consultas SQL agregadas por huella"""
+        
+        rows = ""
+        for item in report:
+            detail = ""
+            example = item.get('example')
+            if example:
+                detail += f"""
+                <p><strong>Ejecución más lenta ({example['ms']} ms):</strong></p>
+                <pre>{escape(example['query'].strip())}</pre>
+                <p>Parámetros: <code>{escape(example['params'])}</code></p>
+                """
+            for plan in item.get('explain') or []:
+                detail += f"""
+                <p>EXPLAIN <strong>{escape(str(plan.get('table')))}</strong>:
+                type={escape(str(plan.get('type')))}, key={escape(str(plan.get('key')))},
+                rows={escape(str(plan.get('rows')))}, {escape(str(plan.get('Extra') or ''))}</p>
+                """
+            if detail:
+                detail = f"<details><summary>Detalle</summary>{detail}</details>"
+            
+            rows += f"""
+            <tr>
+                <td><code>{escape(item['fingerprint'])}</code>{detail}</td>
+                <td>{item['count']:,}</td>
+                <td>{item['slow']:,}</td>
+                <td>{item['total_ms']:,.1f}</td>
+                <td>{item['p50_ms']:,.1f}</td>
+                <td>{item['p95_ms']:,.1f}</td>
+                <td>{item['p99_ms']:,.1f}</td>
+                <td>{item['max_ms']:,.1f}</td>
+                <td>{item['avg_rows']:,.1f}</td>
+            </tr>
+            """
+        if not rows:
+            rows = '<tr><td colspan="9" class="empty-state">Aún no se han registrado consultas</td></tr>'
+        
+        orders = [('total', 'Tiempo total'), ('p95', 'p95'), ('slow', 'Ejecuciones lentas')]
+        order_links = " ".join(
+            f'<a href="?orden={key}" class="btn {"btn-primary" if key == order_by else "btn-secondary"} no-underline">{label}</a>'
+            for key, label in orders
+        )
+        
+        content = f"""
+        <div class="card">
+            <div class="card-header">
+                <span><i class="fas fa-stopwatch"></i> Consultas SQL por huella</span>
+                <a href="/configuracion/" class="btn btn-secondary">← Volver</a>
+            </div>
+            <div class="p-20">
+                <p>Datos del proceso desde su arranque. Se consideran lentas las ejecuciones de {threshold_ms:g} ms o más.</p>
+                <div class="mt-20">Ordenar por: {order_links}</div>
+            </div>
+            <div class="table-container">
+                <table>
+                    <thead>
+                        <tr>
+                            <th>Consulta</th>
+                            <th>Ejecuciones</th>
+                            <th>Lentas</th>
+                            <th>Total (ms)</th>
+                            <th>p50 (ms)</th>
+                            <th>p95 (ms)</th>
+                            <th>p99 (ms)</th>
+                            <th>Máx (ms)</th>
+                            <th>Filas prom.</th>
+                        </tr>
+                    </thead>
+                    <tbody>
+                        {rows}
+                    </tbody>
+                </table>
+            </div>
+        </div>
+        """
+        
+        return HttpResponse(Layout.render('Consultas lentas', user, 'configuracion', content))
@@ -1,9 +1,10 @@
+from html import escape
 from django.http import HttpResponse
 from app.views.layout import Layout
 
 class InventoryMovementView:
     @staticmethod
-    def index(user, movements, request):
+    def index(user, movements, request, page=None, filters=None, filter_options=None):
         """Vista de lista de movimientos de inventario"""
         
         from django.middleware.csrf import get_token
@@ -74,18 +75,87 @@ class InventoryMovementView:
             </div>
             """
         
+        filters = filters or {}
+        filters_html = InventoryMovementView.filters_form(filters, filter_options or {})
+        
+        # Controles de paginación (conservan los filtros aplicados)
+        pagination_html = (
+            Layout.pagination('/movimientos-inventario/', page, filters) if page else ""
+        )
+        
         content = f"""
         <div class="card">
             <div class="card-header">
                 <span>Gestión de Movimientos de Inventario</span>
                 <a href="/movimientos-inventario/crear/" class="btn btn-primary">+ Nuevo Movimiento</a>
             </div>
+            {filters_html}
             {table_content}
+            {pagination_html}
         </div>
         """
         
         return Layout.render('Movimientos de Inventario', user, 'movimientos-inventario', content)
     
+    @staticmethod
+    def filters_form(filters, filter_options):
+        """Formulario de filtros del ledger de movimientos"""
+        
+        def options(items, key, label_key, placeholder):
+            html = f'<option value="">{placeholder}</option>'
+            for item in items or []:
+                selected = "selected" if str(item['id']) == str(filters.get(key, '')) else ""
+                html += f'<option value="{item["id"]}" {selected}>{escape(str(item[label_key]))}</option>'
+            return html
+        
+        product_options = options(filter_options.get('products'), 'producto_id', 'nombre', 'Todos los productos')
+        warehouse_options = options(filter_options.get('warehouses'), 'almacen_id', 'nombre', 'Todos los almacenes')
+        user_options = options(filter_options.get('users'), 'usuario_id', 'username', 'Todos los usuarios')
+        
+        tipo_options = '<option value="">Todos los tipos</option>'
+        for tipo in ('entrada', 'salida', 'ajuste'):
+            selected = "selected" if filters.get('tipo_movimiento') == tipo else ""
+            tipo_options += f'<option value="{tipo}" {selected}>{tipo.capitalize()}</option>'
+        
+        return f"""
+        <form method="GET" action="/movimientos-inventario/" class="p-20">
+            <div class="form-grid">
+                <div>
+                    <label class="form-label">Desde</label>
+                    <input type="date" name="fecha_desde" value="{filters.get('fecha_desde', '')}" class="form-input">
+                </div>
+                <div>
+                    <label class="form-label">Hasta</label>
+                    <input type="date" name="fecha_hasta" value="{filters.get('fecha_hasta', '')}" class="form-input">
+                </div>
+                <div>
+                    <label class="form-label">Producto</label>
+                    <select name="producto_id" class="form-select">{product_options}</select>
+                </div>
+                <div>
+                    <label class="form-label">Almacén</label>
+                    <select name="almacen_id" class="form-select">{warehouse_options}</select>
+                </div>
+                <div>
+                    <label class="form-label">Tipo</label>
+                    <select name="tipo_movimiento" class="form-select">{tipo_options}</select>
+                </div>
+                <div>
+                    <label class="form-label">Usuario</label>
+                    <select name="usuario_id" class="form-select">{user_options}</select>
+                </div>
+                <div>
+                    <label class="form-label">Referencia</label>
+                    <input type="text" name="referencia" value="{escape(str(filters.get('referencia', '')))}" class="form-input" placeholder="Empieza por...">
+                </div>
+            </div>
+            <div class="d-flex justify-end gap-10 mt-20">
+                <a href="/movimientos-inventario/" class="btn btn-secondary">Limpiar</a>
+                <button type="submit" class="btn btn-primary">Filtrar</button>
+            </div>
+        </form>
+        """
+    
     @staticmethod
     def create(user, products, warehouses, request, error=None):
         """Vista de formulario para crear movimiento de inventario"""
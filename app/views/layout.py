@@ -1,3 +1,7 @@
+from html import escape
+from urllib.parse import urlencode
+
+
 class Layout:
     """Layouts y componentes compartidos"""
 
@@ -96,6 +100,72 @@ class Layout:
         </div>
         """
 
+    @staticmethod
+    def pagination(base_url, page, extra_params=None):
+        """Componente de paginación por cursor (orden, tamaño de página y siguiente)"""
+        extra_params = {k: v for k, v in (extra_params or {}).items() if v not in (None, "")}
+
+        def page_url(**params):
+            query = dict(extra_params)
+            query.update({k: v for k, v in params.items() if v not in (None, "")})
+            return f"{base_url}?{urlencode(query)}" if query else base_url
+
+        sort_options_html = ""
+        for key, option in page["sort_options"].items():
+            selected = "selected" if key == page["sort"] else ""
+            sort_options_html += f'<option value="{key}" {selected}>{option["label"]}</option>'
+
+        size_options_html = ""
+        for size in (25, 50, 100, 200):
+            selected = "selected" if size == page["page_size"] else ""
+            size_options_html += f'<option value="{size}" {selected}>{size}</option>'
+
+        hidden_inputs = "".join(
+            f'<input type="hidden" name="{escape(str(k))}" value="{escape(str(v))}">'
+            for k, v in extra_params.items()
+        )
+
+        total_html = ""
+        if page.get("total_estimate") is not None:
+            total_label = f'~{page["total_estimate"]:,}'
+            if page.get("total_exact"):
+                total_label = f'{page["total_estimate"]:,}' + ("+" if page.get("total_capped") else "")
+            total_html = f'<span class="text-muted">Mostrando {len(page["items"])} de {total_label} registros</span>'
+
+        first_link = ""
+        if page.get("after_id"):
+            first_link = f'<a href="{page_url(sort=page["sort"], page_size=page["page_size"])}" class="btn btn-secondary btn-sm">« Primera página</a>'
+
+        next_link = ""
+        if page.get("has_more"):
+            next_url = page_url(
+                sort=page["sort"],
+                page_size=page["page_size"],
+                after_id=page["next_after_id"],
+            )
+            next_link = f'<a href="{next_url}" class="btn btn-primary btn-sm">Siguiente »</a>'
+
+        return f"""
+        <div class="pagination">
+            <form method="GET" action="{base_url}" class="pagination-form">
+                {hidden_inputs}
+                <label class="form-label">Ordenar por</label>
+                <select name="sort" class="form-select" onchange="this.form.submit()">
+                    {sort_options_html}
+                </select>
+                <label class="form-label">Por página</label>
+                <select name="page_size" class="form-select" onchange="this.form.submit()">
+                    {size_options_html}
+                </select>
+            </form>
+            {total_html}
+            <div class="pagination-links">
+                {first_link}
+                {next_link}
+            </div>
+        </div>
+        """
+
     @staticmethod
     def render(title, user, active_page, content):
         """Renderiza el layout completo"""
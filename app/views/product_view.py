@@ -5,7 +5,7 @@ class ProductView:
     """Vista de Productos"""
     
     @staticmethod
-    def index(user, request_path, products):
+    def index(user, request_path, products, page=None):
         """Vista de lista de productos"""
         
         # Generar filas de la tabla
@@ -54,6 +54,9 @@ class ProductView:
             </div>
             """
         
+        # Controles de paginación
+        pagination_html = Layout.pagination('/productos/', page) if page else ""
+        
         content = f"""
         <div class="card">
             <div class="card-header">
@@ -61,6 +64,7 @@ class ProductView:
                 <a href="/productos/crear/" class="btn btn-primary">+ Nuevo Producto</a>
             </div>
             {table_content}
+            {pagination_html}
         </div>
         """
         
@@ -128,7 +132,8 @@ class ProductView:
                     
                     <div>
                         <label class="form-label">Stock Actual</label>
-                        <input type="number" name="stock_actual" value="0" class="form-input">
+                        <input type="number" name="stock_actual" value="0" min="0" class="form-input">
+                        <small class="form-hint">Se registra como ajuste de inventario en el almacén principal</small>
                     </div>
                     
                     <div>
@@ -215,7 +220,8 @@ class ProductView:
                     
                     <div>
                         <label class="form-label">Stock Actual</label>
-                        <input type="number" name="stock_actual" value="{product['stock_actual']}" class="form-input">
+                        <input type="number" name="stock_actual" value="{product['stock_actual']}" min="0" class="form-input">
+                        <small class="form-hint">Un cambio se registra como ajuste de inventario en el almacén principal</small>
                     </div>
                     
                     <div>
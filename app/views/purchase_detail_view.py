@@ -3,7 +3,7 @@ from app.views.layout import Layout
 
 class PurchaseDetailView:
     @staticmethod
-    def index(user, details, request):
+    def index(user, details, request, page=None):
         """Vista de lista de detalles de compras"""
         
         from django.middleware.csrf import get_token
@@ -68,6 +68,9 @@ class PurchaseDetailView:
             </div>
             """
         
+        # Controles de paginación
+        pagination_html = Layout.pagination('/detalle-compras/', page) if page else ""
+        
         content = f"""
         <div class="card">
             <div class="card-header">
@@ -75,6 +78,7 @@ class PurchaseDetailView:
                 <a href="/detalle-compras/crear/" class="btn btn-primary">+ Nuevo Detalle</a>
             </div>
             {table_content}
+            {pagination_html}
         </div>
         """
         
@@ -3,7 +3,7 @@ from app.views.layout import Layout
 
 class SaleDetailView:
     @staticmethod
-    def index(user, details, request):
+    def index(user, details, request, page=None):
         """Vista de lista de detalles de ventas"""
         
         from django.middleware.csrf import get_token
@@ -68,6 +68,9 @@ class SaleDetailView:
             </div>
             """
         
+        # Controles de paginación
+        pagination_html = Layout.pagination('/detalle-ventas/', page) if page else ""
+        
         content = f"""
         <div class="card">
             <div class="card-header">
@@ -75,6 +78,7 @@ class SaleDetailView:
                 <a href="/detalle-ventas/crear/" class="btn btn-primary">+ Nuevo Detalle</a>
             </div>
             {table_content}
+            {pagination_html}
         </div>
         """
         
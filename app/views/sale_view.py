@@ -5,7 +5,7 @@ class SaleView:
     """Vista de Ventas"""
     
     @staticmethod
-    def index(user, sales):
+    def index(user, sales, page=None):
         """Renderiza la página de listado de ventas"""
         
         # Mapeo de estados a badges
@@ -66,6 +66,9 @@ class SaleView:
             </div>
             """
         
+        # Controles de paginación
+        pagination_html = Layout.pagination('/ventas/', page) if page else ""
+        
         content = f"""
         <div class="card">
             <div class="card-header">
@@ -73,6 +76,7 @@ class SaleView:
                 <a href="/ventas/crear/" class="btn btn-primary">+ Nueva Venta</a>
             </div>
             {table_content}
+            {pagination_html}
         </div>
         """
         
@@ -12,12 +12,17 @@ class WarehouseView:
         if warehouses:
             rows = ""
             for idx, warehouse in enumerate(warehouses, 1):
+                if warehouse.get('porcentaje') is not None:
+                    ocupacion = f"{warehouse['ocupado']:,} ({warehouse['porcentaje']}%)"
+                else:
+                    ocupacion = f"{warehouse.get('ocupado', 0):,}"
                 rows += f"""
                 <tr>
                     <td>{idx}</td>
                     <td>{warehouse['nombre']}</td>
                     <td>{warehouse.get('ubicacion', 'N/A')}</td>
                     <td>{warehouse.get('capacidad', 0):,}</td>
+                    <td>{ocupacion}</td>
                     <td>
                         <a href="/almacenes/{warehouse['id']}/editar/" class="btn btn-warning no-underline">Editar</a>
                         <a href="/almacenes/{warehouse['id']}/eliminar/" class="btn btn-danger no-underline" onclick="return confirm('¿Está seguro de eliminar este almacén?');">Eliminar</a>
@@ -34,6 +39,7 @@ class WarehouseView:
                         <th>Nombre</th>
                         <th>Ubicación</th>
                         <th>Capacidad</th>
+                        <th>Ocupación</th>
                         <th>Acciones</th>
                     </tr>
                 </thead>
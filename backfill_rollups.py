@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Backfill de resúmenes de ventas y compras
+Recalcula resumen_diario y resumen_mensual a partir de las tablas ventas y
+compras. Necesario una vez tras crear las tablas con migrate.py en una base
+de datos existente; después se mantienen solas con cada escritura.
+"""
+
+import sys
+import time
+
+from config.database import Database
+from app.models.rollup import Rollup
+
+
+def main():
+    print("=" * 60)
+    print("BACKFILL DE RESÚMENES DE VENTAS Y COMPRAS")
+    print("=" * 60)
+
+    inicio = time.perf_counter()
+    try:
+        Rollup.rebuild()
+    except Exception as e:
+        print(f"✗ ERROR: {str(e)}")
+        return 1
+
+    filas = Database.execute_query("""
+        SELECT documento, COUNT(*) as meses, SUM(cantidad) as documentos, SUM(total) as total
+        FROM resumen_mensual
+        GROUP BY documento
+    """)
+    for fila in filas:
+        print(
+            f"  {fila['documento']:<8} {int(fila['documentos']):>8} documentos "
+            f"en {fila['meses']} filas mensuales, total {float(fila['total']):,.2f}"
+        )
+    print(f"\n✓ Resúmenes reconstruidos en {time.perf_counter() - inicio:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark de guardado de facturas
+Compara la inserción fila a fila de los detalles de venta contra la
+inserción multi-fila de Database.execute_many para 10, 100 y 1000 líneas.
+Cada corrida se ejecuta dentro de una transacción que se revierte, por lo
+que no deja datos en la base de datos.
+"""
+
+import sys
+import time
+from datetime import date
+
+from config.database import Database
+
+SIZES = (10, 100, 1000)
+REPETICIONES = 3
+
+QUERY_VENTA = """
+    INSERT INTO ventas
+    (numero_factura, cliente_id, usuario_id, fecha, total, estado, tipo_pago, notas)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+QUERY_DETALLE = """
+    INSERT INTO detalle_ventas
+    (venta_id, producto_id, cantidad, precio_unitario, subtotal)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+
+
+class _Rollback(Exception):
+    """Fuerza el rollback de la transacción del benchmark"""
+
+
+def obtener_referencias():
+    """Obtiene un cliente, un usuario y productos existentes para las líneas"""
+    cliente = Database.execute_query("SELECT id FROM clientes LIMIT 1")
+    usuario = Database.execute_query("SELECT id FROM usuarios LIMIT 1")
+    productos = Database.execute_query("SELECT id, precio_venta FROM productos LIMIT 50")
+    if not cliente or not usuario or not productos:
+        raise RuntimeError("Se necesita al menos un cliente, un usuario y un producto")
+    return cliente[0]['id'], usuario[0]['id'], productos
+
+
+def guardar_factura(n_lineas, bulk, cliente_id, usuario_id, productos):
+    """Guarda una factura de n_lineas y retorna el tiempo empleado en segundos"""
+    detalles = []
+    for i in range(n_lineas):
+        producto = productos[i % len(productos)]
+        precio = float(producto['precio_venta'])
+        detalles.append((producto['id'], 1, precio, precio))
+
+    inicio = time.perf_counter()
+    try:
+        with Database.transaction():
+            venta_id = Database.execute_query(
+                QUERY_VENTA,
+                (
+                    f"BENCH-{time.time_ns()}",
+                    cliente_id,
+                    usuario_id,
+                    date.today(),
+                    sum(d[3] for d in detalles),
+                    'pendiente',
+                    'efectivo',
+                    'benchmark',
+                ),
+                fetch=False,
+            )
+            filas = [(venta_id,) + d for d in detalles]
+            if bulk:
+                Database.execute_many(QUERY_DETALLE, filas)
+            else:
+                for fila in filas:
+                    Database.execute_query(QUERY_DETALLE, fila, fetch=False)
+            transcurrido = time.perf_counter() - inicio
+            raise _Rollback()
+    except _Rollback:
+        pass
+    return transcurrido
+
+
+def main():
+    cliente_id, usuario_id, productos = obtener_referencias()
+
+    print("=" * 60)
+    print("BENCHMARK DE GUARDADO DE FACTURAS")
+    print("=" * 60)
+    print(f"{'Líneas':>8} {'Fila a fila (ms)':>18} {'execute_many (ms)':>19} {'Mejora':>8}")
+
+    for n in SIZES:
+        fila = min(
+            guardar_factura(n, False, cliente_id, usuario_id, productos)
+            for _ in range(REPETICIONES)
+        )
+        bulk = min(
+            guardar_factura(n, True, cliente_id, usuario_id, productos)
+            for _ in range(REPETICIONES)
+        )
+        mejora = fila / bulk if bulk else 0
+        print(f"{n:>8} {fila * 1000:>18.2f} {bulk * 1000:>19.2f} {mejora:>7.1f}x")
+
+    print("\nPool:", Database.pool_stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import time
+import threading
+from collections import OrderedDict
+from config.database import Database
+
+
+class DataVersion:
+    """Versión de los datos de negocio del proceso
+
+    Los modelos llaman a bump() en cada escritura; las cachés incluyen la
+    versión en sus claves, así cualquier escritura invalida los resultados
+    calculados antes. Dentro de una transacción el incremento se aplica al
+    confirmarla, para que nadie cachee datos sin confirmar con la versión nueva.
+    """
+
+    _version = 0
+    _lock = threading.Lock()
+
+    @staticmethod
+    def current():
+        """Versión actual de los datos"""
+        return DataVersion._version
+
+    @staticmethod
+    def bump():
+        """Marca que los datos cambiaron"""
+        Database.on_commit(DataVersion._increment)
+
+    @staticmethod
+    def _increment():
+        with DataVersion._lock:
+            DataVersion._version += 1
+
+
+class TTLCache:
+    """Caché en memoria, thread-safe, con expiración por TTL y tamaño máximo (LRU)"""
+
+    def __init__(self, ttl=60, max_entries=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # clave -> (instante_expiracion, valor), en orden de uso
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Candados por clave (con su conteo de hilos) para que un solo hilo calcule cada valor ausente
+        self._key_locks = {}
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'expirations': 0,
+            'evictions': 0,
+            'invalidations': 0,
+        }
+
+    def get(self, key, default=None):
+        """Retorna el valor cacheado o default si no existe o expiró"""
+        marker = object()
+        with self._lock:
+            value = self._lookup(key, marker)
+            if value is marker:
+                self._stats['misses'] += 1
+                return default
+            self._stats['hits'] += 1
+            return value
+
+    def _lookup(self, key, default):
+        """Busca una clave vigente (llamar con el lock tomado)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self._stats['expirations'] += 1
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Guarda un valor con el TTL de la caché o uno propio"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            if self.max_entries:
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+
+    def get_or_set(self, key, compute, ttl=None):
+        """Retorna el valor cacheado o lo calcula con compute() y lo guarda
+
+        Si varios hilos piden a la vez una clave ausente, solo uno ejecuta
+        compute(); el resto espera y reutiliza su resultado.
+        """
+        marker = object()
+        value = self.get(key, marker)
+        if value is not marker:
+            return value
+
+        with self._lock:
+            # [candado, hilos que lo usan]: se borra cuando lo suelta el último
+            slot = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                with self._lock:
+                    value = self._lookup(key, marker)
+                if value is marker:
+                    value = compute()
+                    self.set(key, value, ttl)
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1] and self._key_locks.get(key) is slot:
+                    del self._key_locks[key]
+        return value
+
+    def items(self):
+        """Pares (clave, valor) vigentes, sin alterar el orden LRU ni los contadores"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value)
+                for key, (expires_at, value) in self._entries.items()
+                if expires_at > now
+            ]
+
+    def invalidate(self, key=None):
+        """Elimina una clave o, sin clave, toda la caché"""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        """Estadísticas de uso de la caché"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['ttl'] = self.ttl
+        stats['max_entries'] = self.max_entries
+        return stats
@@ -1,33 +1,525 @@
 import os
+import time
+import threading
+from contextlib import contextmanager
 import MySQLdb
+import MySQLdb.cursors
+from config.query_log import QueryCollector
+
+
+class ConnectionPool:
+    """Pool acotado y thread-safe de conexiones MySQL reutilizables"""
+
+    def __init__(self, connect, min_size=1, max_size=10, idle_timeout=300,
+                 checkout_timeout=30, ping_interval=5):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_interval = ping_interval
+
+        # Conexiones libres como (conexion, instante_ultimo_uso)
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        # Cada hilo reutiliza la conexión que ya tiene prestada
+        self._local = threading.local()
+        self._stats = {
+            'checkouts': 0,
+            'reuses': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'connects': 0,
+            'health_check_failures': 0,
+            'discarded': 0,
+        }
+
+    def acquire(self):
+        """Obtiene la conexión del hilo actual o toma una del pool"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.depth += 1
+            with self._cond:
+                self._stats['reuses'] += 1
+            return conn
+
+        conn = self._checkout()
+        self._local.conn = conn
+        self._local.depth = 1
+        self._local.broken = False
+        self._local.dirty = False
+        return conn
+
+    def release(self, broken=False, dirty=False):
+        """Libera la conexión del hilo; vuelve al pool al cerrar el último uso
+
+        dirty marca una conexión que pudo quedar con una transacción a medias
+        (una sentencia falló o no se confirmó): solo a esas se les hace
+        rollback al devolverlas, las demás están en autocommit y limpias.
+        """
+        if broken:
+            self._local.broken = True
+        if dirty:
+            self._local.dirty = True
+
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+
+        conn = self._local.conn
+        discard = self._local.broken
+        dirty = self._local.dirty
+        self._local.conn = None
+        self._local.broken = False
+        self._local.dirty = False
+        self._checkin(conn, discard, dirty)
+
+    def in_use_by_current_thread(self):
+        """Indica si el hilo actual tiene una conexión prestada"""
+        return getattr(self._local, 'conn', None) is not None
+
+    def stats(self):
+        """Retorna las estadísticas del pool para monitoreo"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+            stats['min_size'] = self.min_size
+            stats['max_size'] = self.max_size
+        stats['avg_wait_time'] = (
+            stats['wait_time'] / stats['waits'] if stats['waits'] else 0.0
+        )
+        return stats
+
+    def close_all(self):
+        """Cierra todas las conexiones libres del pool"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._cond.notify_all()
+        for conn, _ in idle:
+            self._close(conn)
+
+    def _checkout(self):
+        """Toma una conexión libre, crea una nueva o espera a que se libere"""
+        expired = []
+        conn = None
+        last_used = None
+        started = None
+
+        with self._cond:
+            self._stats['checkouts'] += 1
+            while True:
+                now = time.monotonic()
+                while self._idle:
+                    candidate, used_at = self._idle.pop()
+                    if (self.idle_timeout and now - used_at > self.idle_timeout
+                            and self._size > self.min_size):
+                        self._size -= 1
+                        expired.append(candidate)
+                        continue
+                    conn, last_used = candidate, used_at
+                    break
+
+                if conn is not None:
+                    break
+
+                if self._size < self.max_size:
+                    # Reservar el hueco antes de conectar fuera del lock
+                    self._size += 1
+                    break
+
+                if started is None:
+                    started = now
+                    self._stats['waits'] += 1
+
+                remaining = self.checkout_timeout - (now - started)
+                if remaining <= 0:
+                    self._stats['timeouts'] += 1
+                    self._stats['wait_time'] += now - started
+                    raise MySQLdb.OperationalError(
+                        'Tiempo de espera agotado obteniendo una conexión del pool'
+                    )
+                self._cond.wait(remaining)
+
+            if started is not None:
+                self._stats['wait_time'] += time.monotonic() - started
+
+        for old in expired:
+            self._close(old)
+
+        if conn is None:
+            return self._new_connection()
+
+        if time.monotonic() - last_used >= self.ping_interval:
+            try:
+                conn.ping()
+            except MySQLdb.Error:
+                with self._cond:
+                    self._stats['health_check_failures'] += 1
+                self._close(conn)
+                return self._new_connection()
+
+        return conn
+
+    def _checkin(self, conn, discard=False, dirty=False):
+        """Devuelve una conexión al pool o la descarta si quedó inservible"""
+        if dirty and not discard:
+            try:
+                # Cerrar cualquier transacción pendiente antes de reutilizarla
+                conn.rollback()
+            except MySQLdb.Error:
+                discard = True
+
+        with self._cond:
+            if discard:
+                self._size -= 1
+                self._stats['discarded'] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+        if discard:
+            self._close(conn)
+
+    def _new_connection(self):
+        """Abre una conexión nueva en un hueco ya reservado"""
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats['connects'] += 1
+        return conn
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except MySQLdb.Error:
+            pass
+
 
 class Database:
     """Gestión de conexiones a la base de datos"""
-    
+
+    _pool = None
+    _readonly_pool = None
+    _pool_lock = threading.Lock()
+    # Estado de la transacción en curso de cada hilo
+    _local = threading.local()
+    # Tamaño máximo de sentencia para inserciones multi-fila (según max_allowed_packet)
+    _max_stmt_length = None
+    # Versión del esquema: se incrementa con cada cambio de DDL hecho por el proceso
+    _schema_version = 0
+
     @staticmethod
     def get_connection():
         """Obtiene una conexión a MySQL"""
-        return MySQLdb.connect(
+        conn = MySQLdb.connect(
             host='mysql',
             user=os.getenv('MYSQL_USER', 'jonathanA'),
             password=os.getenv('MYSQL_PASSWORD', 'password'),
             database=os.getenv('DB_DATABASE', 'wms_management_system'),
             charset='utf8mb4'
         )
-    
+        # Cada sentencia confirma sola salvo dentro de una transacción explícita,
+        # así una conexión reutilizada no arrastra snapshots antiguos
+        conn.autocommit(True)
+        return conn
+
+    @staticmethod
+    def get_pool():
+        """Obtiene el pool de conexiones del proceso, creándolo si no existe"""
+        if Database._pool is None:
+            with Database._pool_lock:
+                if Database._pool is None:
+                    Database._pool = ConnectionPool(
+                        Database.get_connection,
+                        min_size=int(os.getenv('DB_POOL_MIN_SIZE', 1)),
+                        max_size=int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+                        idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+                        checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+                        ping_interval=float(os.getenv('DB_POOL_PING_INTERVAL', 5)),
+                    )
+        return Database._pool
+
+    @staticmethod
+    def get_readonly_connection():
+        """Obtiene una conexión de solo lectura para consultas no confiables
+
+        Usa MYSQL_READONLY_USER si está configurado (un usuario con solo SELECT);
+        además la sesión queda en modo READ ONLY y con un tiempo máximo por
+        consulta, así ni el usuario principal puede escribir desde ella.
+        """
+        readonly_user = os.getenv('MYSQL_READONLY_USER')
+        conn = MySQLdb.connect(
+            host='mysql',
+            user=readonly_user or os.getenv('MYSQL_USER', 'jonathanA'),
+            password=(
+                os.getenv('MYSQL_READONLY_PASSWORD', '') if readonly_user
+                else os.getenv('MYSQL_PASSWORD', 'password')
+            ),
+            database=os.getenv('DB_DATABASE', 'wms_management_system'),
+            charset='utf8mb4'
+        )
+        try:
+            conn.autocommit(True)
+            cursor = conn.cursor()
+            try:
+                cursor.execute("SET SESSION TRANSACTION READ ONLY")
+                cursor.execute(
+                    "SET SESSION max_execution_time = %s",
+                    (int(os.getenv('DB_READONLY_MAX_EXECUTION_MS', 5000)),)
+                )
+            finally:
+                cursor.close()
+        except MySQLdb.Error:
+            # Sin la sesión de solo lectura la conexión no se entrega
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def get_readonly_pool():
+        """Pool separado de conexiones de solo lectura (no compite con el principal)"""
+        if Database._readonly_pool is None:
+            with Database._pool_lock:
+                if Database._readonly_pool is None:
+                    Database._readonly_pool = ConnectionPool(
+                        Database.get_readonly_connection,
+                        min_size=0,
+                        max_size=int(os.getenv('DB_READONLY_POOL_MAX_SIZE', 2)),
+                        idle_timeout=float(os.getenv('DB_POOL_IDLE_TIMEOUT', 300)),
+                        checkout_timeout=float(os.getenv('DB_POOL_TIMEOUT', 30)),
+                        ping_interval=float(os.getenv('DB_POOL_PING_INTERVAL', 5)),
+                    )
+        return Database._readonly_pool
+
+    @staticmethod
+    def fetch_readonly(query, params=None, max_rows=100, batch_size=50):
+        """Ejecuta una consulta en el pool de solo lectura leyendo a lo sumo max_rows filas
+
+        Las filas se leen del servidor por lotes (cursor sin buffer) y la lectura
+        se corta al llegar al máximo. Retorna (filas, truncado).
+        """
+        pool = Database.get_readonly_pool()
+        conn = pool.acquire()
+        broken = False
+        dirty = False
+        cursor = None
+        rows = []
+        truncated = False
+        start = time.perf_counter()
+        try:
+            cursor = conn.cursor(MySQLdb.cursors.SSDictCursor)
+            cursor.execute(query, params or ())
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                room = max_rows - len(rows)
+                if len(batch) > room:
+                    rows.extend(batch[:room])
+                    truncated = True
+                    break
+                rows.extend(batch)
+            QueryCollector.record(query, params, time.perf_counter() - start, len(rows))
+            return rows, truncated
+        except MySQLdb.OperationalError:
+            broken = True
+            raise
+        except Exception:
+            dirty = True
+            raise
+        finally:
+            # Cerrar el cursor descarta las filas no leídas (acotadas por el LIMIT de la consulta)
+            Database._close_cursor(cursor, pool, broken, dirty)
+
+    @staticmethod
+    def pool_stats():
+        """Retorna las estadísticas del pool de conexiones"""
+        return Database.get_pool().stats()
+
+    @staticmethod
+    def in_transaction():
+        """Indica si el hilo actual está dentro de Database.transaction()"""
+        return getattr(Database._local, 'tx_depth', 0) > 0
+
+    @staticmethod
+    def on_commit(callback):
+        """Ejecuta callback al confirmar la transacción en curso (o de inmediato si no hay)"""
+        if Database.in_transaction():
+            Database._local.on_commit.append(callback)
+        else:
+            callback()
+
+    @staticmethod
+    @contextmanager
+    def transaction():
+        """Ejecuta un bloque en una sola transacción: un commit al final, rollback ante error
+
+        Todas las consultas de Database.execute_query del mismo hilo usan la conexión
+        de la transacción. Las transacciones anidadas se unen a la externa.
+        """
+        if Database.in_transaction():
+            Database._local.tx_depth += 1
+            try:
+                yield Database._local.tx_conn
+            finally:
+                Database._local.tx_depth -= 1
+            return
+
+        pool = Database.get_pool()
+        conn = pool.acquire()
+        broken = False
+        committed = False
+        Database._local.tx_depth = 1
+        Database._local.tx_conn = conn
+        Database._local.on_commit = []
+        try:
+            conn.begin()
+            yield conn
+            conn.commit()
+            committed = True
+        except BaseException as e:
+            broken = isinstance(e, MySQLdb.OperationalError)
+            try:
+                conn.rollback()
+            except MySQLdb.Error:
+                broken = True
+            raise
+        finally:
+            callbacks = Database._local.on_commit
+            Database._local.tx_depth = 0
+            Database._local.tx_conn = None
+            Database._local.on_commit = []
+            # El commit o rollback de arriba ya dejó la conexión limpia
+            pool.release(broken=broken)
+
+        if committed:
+            for callback in callbacks:
+                callback()
+
     @staticmethod
     def execute_query(query, params=None, fetch=True):
-        """Ejecuta una consulta SQL"""
-        conn = Database.get_connection()
-        cursor = conn.cursor(MySQLdb.cursors.DictCursor)
+        """Ejecuta una consulta SQL
+
+        Cada sentencia se registra en el QueryCollector de la petición en curso.
+        """
+        pool = Database.get_pool()
+        conn = pool.acquire()
+        broken = False
+        dirty = False
+        cursor = None
+        start = time.perf_counter()
         try:
+            cursor = conn.cursor(MySQLdb.cursors.DictCursor)
             cursor.execute(query, params or ())
             if fetch:
                 result = cursor.fetchall()
+                rows = len(result)
             else:
-                conn.commit()
+                # Fuera de una transacción la conexión está en autocommit; dentro,
+                # el commit lo hace Database.transaction()
                 result = cursor.lastrowid
+                rows = max(cursor.rowcount, 0)
+            QueryCollector.record(query, params, time.perf_counter() - start, rows)
             return result
+        except MySQLdb.OperationalError:
+            # Conexión caída o inestable: no devolverla al pool
+            broken = True
+            raise
+        except Exception:
+            dirty = True
+            raise
         finally:
-            cursor.close()
-            conn.close()
+            Database._close_cursor(cursor, pool, broken, dirty)
+
+    @staticmethod
+    def schema_version():
+        """Versión del esquema para invalidar cachés de introspección"""
+        return Database._schema_version
+
+    @staticmethod
+    def bump_schema_version():
+        """Marca que el esquema cambió (CREATE / ALTER)"""
+        with Database._pool_lock:
+            Database._schema_version += 1
+
+    @staticmethod
+    def ensure_index(table, index_name, columns):
+        """Crea un índice si no existe; retorna True si fue creado"""
+        query = """
+            SELECT 1
+            FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s
+            LIMIT 1
+        """
+        if Database.execute_query(query, (table, index_name)):
+            return False
+        Database.execute_query(
+            f"ALTER TABLE {table} ADD INDEX {index_name} ({columns})", fetch=False
+        )
+        Database.bump_schema_version()
+        return True
+
+    @staticmethod
+    def execute_many(query, params_list):
+        """Ejecuta un INSERT ... VALUES para muchas filas en sentencias multi-fila
+
+        MySQLdb reescribe el INSERT como VALUES (...), (...), ... y lo parte en
+        lotes que no superan max_allowed_packet del servidor.
+        """
+        rows = list(params_list)
+        if not rows:
+            return 0
+
+        pool = Database.get_pool()
+        conn = pool.acquire()
+        broken = False
+        dirty = False
+        cursor = None
+        try:
+            cursor = conn.cursor()
+            cursor.max_stmt_length = Database._get_max_stmt_length(cursor)
+            start = time.perf_counter()
+            affected = cursor.executemany(query, rows)
+            QueryCollector.record(query, rows[0], time.perf_counter() - start, affected or 0)
+            return affected
+        except MySQLdb.OperationalError:
+            broken = True
+            raise
+        except Exception:
+            dirty = True
+            raise
+        finally:
+            Database._close_cursor(cursor, pool, broken, dirty)
+
+    @staticmethod
+    def _close_cursor(cursor, pool, broken, dirty=False):
+        """Cierra el cursor (si llegó a crearse) y devuelve siempre la conexión al pool"""
+        try:
+            if cursor is not None:
+                cursor.close()
+        except MySQLdb.Error:
+            broken = True
+        finally:
+            pool.release(broken=broken, dirty=dirty)
+
+    @staticmethod
+    def _get_max_stmt_length(cursor):
+        """Calcula (una vez por proceso) el tamaño máximo de cada lote multi-fila"""
+        if Database._max_stmt_length is None:
+            cursor.execute("SELECT @@max_allowed_packet")
+            max_packet = int(cursor.fetchone()[0])
+            # Margen para la cabecera del paquete y caracteres escapados
+            Database._max_stmt_length = max(64 * 1024, int(max_packet * 0.9) - 1024)
+        return Database._max_stmt_length
@@ -0,0 +1,194 @@
+import threading
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas, en el formato de Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        # etiquetas -> [conteos por bucket..., conteo total, suma]
+        self._series = {}
+
+    def observe(self, labels, value):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += 1
+        series[-1] += value
+
+    def samples(self):
+        """(etiquetas, [(le, conteo)...], conteo, suma) de cada serie"""
+        for labels, series in self._series.items():
+            buckets = [(bound, series[i]) for i, bound in enumerate(self.buckets)]
+            yield labels, buckets, series[-2], series[-1]
+
+
+class RequestMetrics:
+    """Métricas de las peticiones HTTP por ruta
+
+    MetricsMiddleware registra cada petición: conteo por estado, latencia
+    total y su desglose en tiempo de base de datos, de llamadas al LLM y de
+    render (el resto: lógica del controlador y construcción del HTML/JSON).
+    Database y GeminiClient suman su tiempo a la petición en curso del hilo
+    con add_time(). En las respuestas en streaming la medición sigue hasta
+    que se envía el último fragmento (stream()). Las métricas son del proceso y se exponen en /metrics
+    en el formato de texto de Prometheus.
+    """
+
+    # Segundos; los últimos buckets cubren respuestas del chatbot
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    PHASES = ('db', 'llm', 'render')
+
+    _lock = threading.Lock()
+    _local = threading.local()
+    _requests = {}
+    _duration = Histogram(BUCKETS)
+    _phases = Histogram(BUCKETS)
+    _in_flight = 0
+
+    @staticmethod
+    def begin():
+        """Marca el inicio de una petición en el hilo actual"""
+        RequestMetrics._local.times = {'db': 0.0, 'llm': 0.0}
+        with RequestMetrics._lock:
+            RequestMetrics._in_flight += 1
+
+    @staticmethod
+    def add_time(phase, seconds):
+        """Suma tiempo de una fase ('db' o 'llm') a la petición en curso del hilo"""
+        times = getattr(RequestMetrics._local, 'times', None)
+        if times is not None:
+            times[phase] += seconds
+
+    @staticmethod
+    def detach():
+        """Suelta los tiempos de la petición del hilo y los retorna (ver stream())"""
+        times = getattr(RequestMetrics._local, 'times', None)
+        RequestMetrics._local.times = None
+        return times
+
+    @staticmethod
+    def stream(times, iterable, finish):
+        """Sigue midiendo una respuesta en streaming hasta que se termina de enviar
+
+        Antes de cada fragmento se restauran los tiempos de la petición en el
+        hilo (el LLM y las consultas del stream se suman a ella) y al
+        terminar, fallar o cerrarse el stream se llama a finish(), que debe
+        llamar a end().
+        """
+        iterator = iter(iterable)
+        try:
+            while True:
+                RequestMetrics._local.times = times
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    RequestMetrics._local.times = None
+                yield chunk
+        finally:
+            RequestMetrics._local.times = times
+            try:
+                close = getattr(iterator, 'close', None)
+                if close is not None:
+                    close()
+            finally:
+                finish()
+
+    @staticmethod
+    def end(method, route, status, elapsed):
+        """Registra la petición terminada y retorna el desglose de tiempos"""
+        times = getattr(RequestMetrics._local, 'times', None) or {'db': 0.0, 'llm': 0.0}
+        RequestMetrics._local.times = None
+        times['render'] = max(elapsed - times['db'] - times['llm'], 0.0)
+
+        with RequestMetrics._lock:
+            RequestMetrics._in_flight -= 1
+            key = (method, route, str(status))
+            RequestMetrics._requests[key] = RequestMetrics._requests.get(key, 0) + 1
+            RequestMetrics._duration.observe((method, route), elapsed)
+            for phase in RequestMetrics.PHASES:
+                RequestMetrics._phases.observe((method, route, phase), times[phase])
+        return times
+
+    @staticmethod
+    def render_prometheus(extra_gauges=None, extra_counters=None):
+        """Texto en formato de exposición de Prometheus
+
+        extra_gauges y extra_counters son listas de (nombre, ayuda, valor) que
+        se añaden al final; los contadores solo crecen y su nombre termina en _total.
+        """
+        with RequestMetrics._lock:
+            requests = dict(RequestMetrics._requests)
+            duration = list(RequestMetrics._duration.samples())
+            phases = list(RequestMetrics._phases.samples())
+            in_flight = RequestMetrics._in_flight
+
+        lines = [
+            "# HELP http_requests_total Peticiones HTTP atendidas por ruta y estado.",
+            "# TYPE http_requests_total counter",
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            labels = RequestMetrics._labels(method=method, route=route, status=status)
+            lines.append(f"http_requests_total{{{labels}}} {count}")
+
+        lines += [
+            "# HELP http_requests_in_flight Peticiones HTTP en curso.",
+            "# TYPE http_requests_in_flight gauge",
+            f"http_requests_in_flight {in_flight}",
+        ]
+
+        lines += [
+            "# HELP http_request_duration_seconds Latencia de las peticiones HTTP por ruta.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), buckets, count, total in sorted(duration):
+            lines += RequestMetrics._histogram_lines(
+                "http_request_duration_seconds", {'method': method, 'route': route}, buckets, count, total
+            )
+
+        lines += [
+            "# HELP http_request_phase_seconds Tiempo de cada petición en base de datos, LLM y render.",
+            "# TYPE http_request_phase_seconds histogram",
+        ]
+        for (method, route, phase), buckets, count, total in sorted(phases):
+            lines += RequestMetrics._histogram_lines(
+                "http_request_phase_seconds",
+                {'method': method, 'route': route, 'phase': phase}, buckets, count, total
+            )
+
+        extra = [(metric, 'gauge') for metric in extra_gauges or []]
+        extra += [(metric, 'counter') for metric in extra_counters or []]
+        for (name, help_text, value), metric_type in extra:
+            lines += [
+                f"# HELP {name} {help_text}",
+                f"# TYPE {name} {metric_type}",
+                f"{name} {value}",
+            ]
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _histogram_lines(name, labels, buckets, count, total):
+        lines = []
+        for bound, bucket_count in buckets:
+            bucket_labels = RequestMetrics._labels(**labels, le=f"{bound:g}")
+            lines.append(f"{name}_bucket{{{bucket_labels}}} {bucket_count}")
+        base = RequestMetrics._labels(**labels)
+        lines.append(f"{name}_bucket{{{RequestMetrics._labels(**labels, le='+Inf')}}} {count}")
+        lines.append(f"{name}_sum{{{base}}} {total:.6f}")
+        lines.append(f"{name}_count{{{base}}} {count}")
+        return lines
+
+    @staticmethod
+    def _labels(**labels):
+        return ",".join(
+            f'{key}="{RequestMetrics._escape(value)}"' for key, value in labels.items()
+        )
+
+    @staticmethod
+    def _escape(value):
+        return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,340 @@
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from config.metrics import RequestMetrics
+from config.tracing import Span, Tracer
+
+
+class QueryCollector:
+    """Registro de las consultas SQL ejecutadas durante una petición
+
+    Database registra cada sentencia (huella normalizada, duración, filas y
+    el código que la lanzó) en el colector activo del hilo; fuera de una
+    petición no hay colector y el registro no hace nada. Al terminar se
+    marcan los patrones sospechosos: la misma consulta con los mismos
+    parámetros repetida (duplicada) o la misma consulta lanzada muchas
+    veces con parámetros distintos (N+1).
+    """
+
+    # Ejecuciones de una misma huella a partir de las cuales se considera N+1
+    N_PLUS_ONE_THRESHOLD = int(os.getenv('DB_N_PLUS_ONE_THRESHOLD', 5))
+
+    _local = threading.local()
+
+    _STRINGS = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"")
+    _NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+    _IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+    _VALUES_LISTS = re.compile(r"(\(\s*\?(?:\s*,\s*\?)*\s*\))(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))+")
+
+    # Directorio raíz del proyecto, para mostrar rutas relativas del llamador
+    _ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    _CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
+
+    def __init__(self, label=''):
+        self.label = label
+        self.count = 0
+        self.total_seconds = 0.0
+        self.rows = 0
+        # huella -> estadísticas agregadas
+        self.queries = {}
+
+    @staticmethod
+    def start(label=''):
+        """Activa un colector nuevo en el hilo actual y lo retorna"""
+        collector = QueryCollector(label)
+        QueryCollector._local.collector = collector
+        return collector
+
+    @staticmethod
+    def stop():
+        """Desactiva el colector del hilo actual y lo retorna"""
+        collector = getattr(QueryCollector._local, 'collector', None)
+        QueryCollector._local.collector = None
+        return collector
+
+    @staticmethod
+    def current():
+        return getattr(QueryCollector._local, 'collector', None)
+
+    @staticmethod
+    @lru_cache(maxsize=1024)
+    def fingerprint(query):
+        """Consulta normalizada: literales y parámetros como ?, listas IN colapsadas"""
+        text = QueryCollector._STRINGS.sub('?', query)
+        text = text.replace('%s', '?')
+        text = QueryCollector._NUMBERS.sub('?', text)
+        text = QueryCollector._VALUES_LISTS.sub(r'\1, ...', text)
+        text = QueryCollector._IN_LISTS.sub('(?+)', text)
+        return ' '.join(text.split())
+
+    @staticmethod
+    def caller():
+        """Primer marco fuera de config/ (el modelo o servicio que lanzó la consulta)"""
+        frame = sys._getframe(1)
+        while frame is not None:
+            filename = frame.f_code.co_filename
+            if not filename.startswith(QueryCollector._CONFIG_DIR):
+                if filename.startswith(QueryCollector._ROOT):
+                    filename = os.path.relpath(filename, QueryCollector._ROOT)
+                return f"{filename}:{frame.f_lineno} {frame.f_code.co_name}"
+            frame = frame.f_back
+        return '?'
+
+    @staticmethod
+    def record(query, params, elapsed, rows):
+        """Registra una sentencia en el log de consultas lentas y en el colector del hilo"""
+        fingerprint = QueryCollector.fingerprint(query)
+        SlowQueryLog.observe(fingerprint, query, params, elapsed, rows)
+        RequestMetrics.add_time('db', elapsed)
+        Tracer.add_span('db.query', elapsed, kind=Span.CLIENT, **{
+            'db.system': 'mysql', 'db.statement': fingerprint, 'db.rows': rows,
+        })
+        collector = QueryCollector.current()
+        if collector is None:
+            return
+        collector.add(fingerprint, params, elapsed, rows, QueryCollector.caller())
+
+    def add(self, fingerprint, params, elapsed, rows, caller):
+        self.count += 1
+        self.total_seconds += elapsed
+        self.rows += rows
+        stats = self.queries.get(fingerprint)
+        if stats is None:
+            stats = self.queries[fingerprint] = {
+                'count': 0,
+                'total_seconds': 0.0,
+                'max_seconds': 0.0,
+                'rows': 0,
+                'callers': {},
+                'params': {},
+            }
+        stats['count'] += 1
+        stats['total_seconds'] += elapsed
+        stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+        stats['rows'] += rows
+        stats['callers'][caller] = stats['callers'].get(caller, 0) + 1
+        key = repr(params)
+        stats['params'][key] = stats['params'].get(key, 0) + 1
+
+    def issues(self):
+        """Patrones sospechosos: lista de {"kind", "fingerprint", "count", "callers"}"""
+        found = []
+        for fingerprint, stats in self.queries.items():
+            repeated = max(stats['params'].values())
+            if stats['count'] >= QueryCollector.N_PLUS_ONE_THRESHOLD and len(stats['params']) > 1:
+                kind = 'n+1'
+            elif repeated > 1:
+                kind = 'duplicada'
+            else:
+                continue
+            found.append({
+                'kind': kind,
+                'fingerprint': fingerprint,
+                'count': stats['count'],
+                'callers': sorted(stats['callers'], key=stats['callers'].get, reverse=True),
+            })
+        return found
+
+    def summary(self):
+        """Totales de la petición, las consultas más lentas y los patrones detectados"""
+        slowest = sorted(self.queries.items(), key=lambda item: item[1]['total_seconds'], reverse=True)
+        return {
+            'label': self.label,
+            'queries': self.count,
+            'distinct': len(self.queries),
+            'total_ms': round(self.total_seconds * 1000, 2),
+            'rows': self.rows,
+            'slowest': [
+                {
+                    'fingerprint': fingerprint,
+                    'count': stats['count'],
+                    'total_ms': round(stats['total_seconds'] * 1000, 2),
+                    'max_ms': round(stats['max_seconds'] * 1000, 2),
+                    'rows': stats['rows'],
+                    'callers': list(stats['callers']),
+                }
+                for fingerprint, stats in slowest[:5]
+            ],
+            'issues': self.issues(),
+        }
+
+    def log_line(self, partial=False):
+        """Una línea de log con los totales y, debajo, los patrones detectados
+
+        partial marca totales que no cubren toda la petición (respuestas en streaming).
+        """
+        line = (
+            f"SQL {self.label}: {self.count} consultas ({len(self.queries)} distintas), "
+            f"{self.total_seconds * 1000:.1f} ms, {self.rows} filas"
+        )
+        if partial:
+            line += " (parcial: solo hasta el inicio del stream)"
+        for issue in self.issues():
+            line += (
+                f"\n  [{issue['kind']}] x{issue['count']} {issue['fingerprint'][:160]}"
+                f"\n    desde {', '.join(issue['callers'][:3])}"
+            )
+        return line
+
+
+class SlowQueryLog:
+    """Agregados de todas las consultas del proceso por huella
+
+    Por cada huella se acumulan ejecuciones, filas y una ventana de las
+    últimas duraciones para calcular p50/p95/p99. Las sentencias que superan
+    DB_SLOW_QUERY_MS se escriben completas en el log junto con su EXPLAIN,
+    que se calcula en segundo plano y como mucho una vez cada
+    EXPLAIN_INTERVAL segundos por huella.
+    """
+
+    THRESHOLD_MS = float(os.getenv('DB_SLOW_QUERY_MS', 200))
+    # Duraciones recientes guardadas por huella para los percentiles
+    SAMPLES = int(os.getenv('DB_SLOW_QUERY_SAMPLES', 200))
+    # Huellas distintas que se conservan (se descartan las usadas hace más tiempo)
+    MAX_FINGERPRINTS = 500
+    EXPLAIN_INTERVAL = 600
+
+    _stats = OrderedDict()
+    _lock = threading.Lock()
+    _local = threading.local()
+    _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+
+    @staticmethod
+    def observe(fingerprint, query, params, elapsed, rows):
+        """Acumula una ejecución; si es lenta la registra con su EXPLAIN"""
+        if getattr(SlowQueryLog._local, 'explaining', False):
+            return
+
+        slow = elapsed * 1000 >= SlowQueryLog.THRESHOLD_MS
+        explain = False
+        now = time.time()
+        with SlowQueryLog._lock:
+            stats = SlowQueryLog._stats.get(fingerprint)
+            if stats is None:
+                stats = SlowQueryLog._stats[fingerprint] = {
+                    'count': 0,
+                    'slow': 0,
+                    'total_seconds': 0.0,
+                    'max_seconds': 0.0,
+                    'rows': 0,
+                    'samples': deque(maxlen=SlowQueryLog.SAMPLES),
+                    'last_seen': now,
+                    'example': None,
+                    'explain': None,
+                    'explained_at': 0,
+                }
+                if len(SlowQueryLog._stats) > SlowQueryLog.MAX_FINGERPRINTS:
+                    SlowQueryLog._stats.popitem(last=False)
+            else:
+                SlowQueryLog._stats.move_to_end(fingerprint)
+            stats['count'] += 1
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            stats['rows'] += rows
+            stats['samples'].append(elapsed)
+            stats['last_seen'] = now
+            if slow:
+                stats['slow'] += 1
+                if elapsed >= stats['max_seconds']:
+                    stats['example'] = {'query': query, 'params': repr(params), 'ms': round(elapsed * 1000, 2)}
+                if now - stats['explained_at'] >= SlowQueryLog.EXPLAIN_INTERVAL:
+                    stats['explained_at'] = now
+                    explain = True
+
+        if slow:
+            caller = QueryCollector.caller()
+            SlowQueryLog._executor.submit(
+                SlowQueryLog._log_slow, fingerprint, query, params, elapsed, rows, caller, explain
+            )
+
+    @staticmethod
+    def _log_slow(fingerprint, query, params, elapsed, rows, caller, explain):
+        message = (
+            f"Consulta lenta: {elapsed * 1000:.1f} ms, {rows} filas, desde {caller}\n"
+            f"  {' '.join(query.split())}\n"
+            f"  parámetros: {params!r}"
+        )
+        if explain:
+            plan = SlowQueryLog.explain(query, params)
+            if plan:
+                with SlowQueryLog._lock:
+                    if fingerprint in SlowQueryLog._stats:
+                        SlowQueryLog._stats[fingerprint]['explain'] = plan
+                for row in plan:
+                    message += (
+                        f"\n  EXPLAIN {row.get('table')}: type={row.get('type')} "
+                        f"key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}"
+                    )
+        print(message)
+
+    @staticmethod
+    def explain(query, params):
+        """Plan de ejecución de una consulta SELECT (None si no aplica o falla)"""
+        if not query.lstrip().upper().startswith(('SELECT', 'WITH', '(SELECT')):
+            return None
+        from config.database import Database
+
+        SlowQueryLog._local.explaining = True
+        try:
+            plan = Database.execute_query("EXPLAIN " + query, params)
+        except Exception as e:
+            print(f"No se pudo obtener el EXPLAIN de la consulta lenta: {e}")
+            return None
+        finally:
+            SlowQueryLog._local.explaining = False
+        return [
+            {key: row.get(key) for key in ('table', 'type', 'possible_keys', 'key', 'rows', 'Extra')}
+            for row in plan
+        ]
+
+    @staticmethod
+    def percentile(values, fraction):
+        """Percentil por el método del rango más cercano sobre valores ordenados"""
+        if not values:
+            return 0.0
+        index = max(0, min(len(values) - 1, math.ceil(fraction * len(values)) - 1))
+        return values[index]
+
+    @staticmethod
+    def top(limit=20, order_by='total'):
+        """Huellas con más tiempo total (order_by='total'), p95 ('p95') o ejecuciones lentas ('slow')"""
+        with SlowQueryLog._lock:
+            snapshot = [
+                (fingerprint, dict(stats, samples=sorted(stats['samples'])))
+                for fingerprint, stats in SlowQueryLog._stats.items()
+            ]
+
+        report = []
+        for fingerprint, stats in snapshot:
+            samples = stats['samples']
+            report.append({
+                'fingerprint': fingerprint,
+                'count': stats['count'],
+                'slow': stats['slow'],
+                'total_ms': round(stats['total_seconds'] * 1000, 2),
+                'avg_ms': round(stats['total_seconds'] * 1000 / stats['count'], 2),
+                'p50_ms': round(SlowQueryLog.percentile(samples, 0.50) * 1000, 2),
+                'p95_ms': round(SlowQueryLog.percentile(samples, 0.95) * 1000, 2),
+                'p99_ms': round(SlowQueryLog.percentile(samples, 0.99) * 1000, 2),
+                'max_ms': round(stats['max_seconds'] * 1000, 2),
+                'rows': stats['rows'],
+                'avg_rows': round(stats['rows'] / stats['count'], 1),
+                'last_seen': stats['last_seen'],
+                'example': stats['example'],
+                'explain': stats['explain'],
+            })
+
+        keys = {'total': 'total_ms', 'p95': 'p95_ms', 'slow': 'slow'}
+        report.sort(key=lambda item: item[keys.get(order_by, 'total_ms')], reverse=True)
+        return report[:limit]
+
+    @staticmethod
+    def reset():
+        with SlowQueryLog._lock:
+            SlowQueryLog._stats.clear()
@@ -21,10 +21,14 @@ def configure_django():
                 },
             }],
             MIDDLEWARE=[
+                'app.middleware.metrics_middleware.MetricsMiddleware',
                 'django.middleware.security.SecurityMiddleware',
                 'django.contrib.sessions.middleware.SessionMiddleware',
                 'django.middleware.common.CommonMiddleware',
                 'django.middleware.csrf.CsrfViewMiddleware',
+                'app.middleware.query_middleware.QueryMiddleware',
+                'app.middleware.profiling_middleware.ProfilingMiddleware',
+                'app.middleware.tracing_middleware.TracingMiddleware',
             ],
             DATABASES={
                 'default': {
@@ -0,0 +1,388 @@
+import functools
+import importlib
+import inspect
+import json
+import os
+import pkgutil
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+
+
+class Span:
+    """Tramo de una traza: operación con inicio, fin, atributos y padre"""
+
+    # Tipos de tramo de OTLP
+    INTERNAL = 1
+    SERVER = 2
+    CLIENT = 3
+
+    def __init__(self, name, trace_id, parent_id=None, kind=INTERNAL, attributes=None, start_ns=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.start_ns = start_ns or time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_otlp(self):
+        """Tramo en el formato JSON de OTLP"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [Tracer.otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class InMemoryExporter:
+    """Exportador que guarda los tramos en memoria, para pruebas
+
+    Sustituye al colector real: Tracer.configure(InMemoryExporter()) y luego
+    se consultan los tramos terminados con spans / find().
+    """
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        with self._lock:
+            self.spans.extend(spans)
+
+    def find(self, name):
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+    def clear(self):
+        with self._lock:
+            self.spans = []
+
+
+class FileExporter:
+    """Escribe cada lote como una línea JSON en formato OTLP (como el exportador de archivo de OpenTelemetry)"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(Tracer.otlp_payload(spans), ensure_ascii=False) + "\n")
+
+
+class OtlpHttpExporter:
+    """Envía los lotes a un colector OTLP/HTTP con codificación JSON (p. ej. .../v1/traces)"""
+
+    def __init__(self, endpoint, timeout=5):
+        self.endpoint = endpoint
+        self.timeout = timeout
+
+    def export(self, spans):
+        request = urllib.request.Request(
+            self.endpoint,
+            data=json.dumps(Tracer.otlp_payload(spans)).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+
+class Tracer:
+    """Trazas ligeras: identificador de traza y tramos anidados por hilo
+
+    TracingMiddleware abre el tramo raíz de cada petición y uno por el
+    método del controlador; los modelos y AIService se instrumentan con
+    instrument_package / instrument_class, y Database y GeminiClient
+    agregan un tramo ya medido por cada consulta o llamada al modelo
+    (add_span). Las respuestas en streaming siguen la traza con stream(). Sin una traza activa en el hilo no se crea nada, así los
+    hilos de segundo plano no generan ruido. Los tramos terminados se
+    exportan por lotes desde un hilo aparte.
+    """
+
+    SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "wms")
+    SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", 1))
+    BATCH_SIZE = 200
+    FLUSH_INTERVAL = 2.0
+
+    _exporter = None
+    _queue = queue.Queue(maxsize=10000)
+    _worker = None
+    _lock = threading.Lock()
+    _local = threading.local()
+
+    @staticmethod
+    def configure(exporter):
+        """Activa el trazado con un exportador (None lo desactiva)"""
+        Tracer._exporter = exporter
+        if exporter is not None and not isinstance(exporter, InMemoryExporter):
+            Tracer._start_worker()
+
+    @staticmethod
+    def from_env():
+        """Configura el exportador según TRACING_EXPORTER (file, otlp o vacío para desactivar)"""
+        kind = os.getenv("TRACING_EXPORTER", "").lower()
+        if kind == "file":
+            Tracer.configure(FileExporter(os.getenv("TRACING_FILE", "/tmp/trazas/trazas.jsonl")))
+        elif kind == "otlp":
+            Tracer.configure(OtlpHttpExporter(
+                os.getenv("TRACING_OTLP_ENDPOINT", "http://otel-collector:4318/v1/traces")
+            ))
+        return Tracer.enabled()
+
+    @staticmethod
+    def enabled():
+        return Tracer._exporter is not None
+
+    @staticmethod
+    def current():
+        """Tramo activo del hilo o None"""
+        stack = getattr(Tracer._local, "stack", None)
+        return stack[-1] if stack else None
+
+    @staticmethod
+    def start_trace(name, traceparent=None, attributes=None):
+        """Abre el tramo raíz de una traza; retorna None si el trazado está apagado o no se muestrea
+
+        traceparent es la cabecera W3C de un llamador; si es válida la traza lo continúa.
+        """
+        if not Tracer.enabled():
+            return None
+        trace_id, parent_id = Tracer.parse_traceparent(traceparent)
+        if trace_id is None:
+            if random.random() >= Tracer.SAMPLE_RATE:
+                return None
+            trace_id = f"{random.getrandbits(128):032x}"
+        span = Span(name, trace_id, parent_id, Span.SERVER, attributes)
+        Tracer._local.stack = [span]
+        return span
+
+    @staticmethod
+    def end_trace(span):
+        """Cierra el tramo raíz y limpia el estado del hilo"""
+        Tracer._finish(span)
+        Tracer._local.stack = []
+
+    @staticmethod
+    def detach():
+        """Suelta la traza del hilo sin cerrarla (la sigue un stream, ver stream())"""
+        Tracer._local.stack = []
+
+    @staticmethod
+    def stream(root, iterable):
+        """Mantiene la traza abierta mientras se consume una respuesta en streaming
+
+        El cuerpo de una StreamingHttpResponse se genera después de que el
+        middleware retorna, así que antes de cada fragmento se restaura la
+        pila de tramos del hilo (con los tramos que el generador dejó
+        abiertos) y se suelta al entregarlo. El tramo raíz se cierra cuando
+        el stream termina, falla o el servidor lo cierra.
+        """
+        iterator = iter(iterable)
+        stack = [root]
+        try:
+            while True:
+                Tracer._local.stack = stack
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    Tracer._local.stack = []
+                yield chunk
+        except BaseException as e:
+            if not isinstance(e, GeneratorExit):
+                root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            # close() del generador interno todavía cierra sus tramos abiertos
+            Tracer._local.stack = stack
+            try:
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+            finally:
+                Tracer.end_trace(root)
+
+    @staticmethod
+    @contextmanager
+    def span(name, kind=Span.INTERNAL, **attributes):
+        """Tramo hijo del tramo activo; no hace nada fuera de una traza"""
+        parent = Tracer.current()
+        if parent is None:
+            yield None
+            return
+        span = Span(name, parent.trace_id, parent.span_id, kind, attributes)
+        Tracer._local.stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            Tracer._local.stack.pop()
+            Tracer._finish(span)
+
+    @staticmethod
+    def add_span(name, elapsed, kind=Span.INTERNAL, error=None, **attributes):
+        """Registra un tramo ya medido que terminó ahora y duró elapsed segundos"""
+        parent = Tracer.current()
+        if parent is None:
+            return None
+        end_ns = time.time_ns()
+        span = Span(name, parent.trace_id, parent.span_id, kind, attributes,
+                    start_ns=end_ns - int(elapsed * 1e9))
+        span.error = error
+        Tracer._finish(span, end_ns)
+        return span
+
+    @staticmethod
+    def traced(func, name):
+        """Envuelve una función para que cada llamada sea un tramo"""
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(Tracer._local, "stack", None):
+                with Tracer.span(name):
+                    return func(*args, **kwargs)
+            return func(*args, **kwargs)
+        wrapper.__traced__ = True
+        return wrapper
+
+    @staticmethod
+    def instrument_class(cls):
+        """Traza los métodos definidos en la clase (no los dunder ni los generadores)"""
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith("__"):
+                continue
+            wrapper_type = None
+            func = value
+            if isinstance(value, (staticmethod, classmethod)):
+                wrapper_type = type(value)
+                func = value.__func__
+            if not inspect.isfunction(func) or getattr(func, "__traced__", False):
+                continue
+            # Un generador termina al consumirse, fuera de la pila del hilo
+            if inspect.isgeneratorfunction(func):
+                continue
+            traced = Tracer.traced(func, f"{cls.__name__}.{attr}")
+            setattr(cls, attr, wrapper_type(traced) if wrapper_type else traced)
+
+    @staticmethod
+    def instrument_package(package_name):
+        """Traza todas las clases definidas en los módulos de un paquete"""
+        package = importlib.import_module(package_name)
+        for module_info in pkgutil.iter_modules(package.__path__):
+            module = importlib.import_module(f"{package_name}.{module_info.name}")
+            for _, cls in inspect.getmembers(module, inspect.isclass):
+                if cls.__module__ == module.__name__:
+                    Tracer.instrument_class(cls)
+
+    @staticmethod
+    def parse_traceparent(header):
+        """(trace_id, parent_id) de una cabecera W3C traceparent, o (None, None)"""
+        parts = (header or "").strip().split("-")
+        if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+            return None, None
+        try:
+            int(parts[1], 16)
+            int(parts[2], 16)
+        except ValueError:
+            return None, None
+        if parts[1] == "0" * 32:
+            return None, None
+        return parts[1], parts[2]
+
+    @staticmethod
+    def traceparent(span):
+        return f"00-{span.trace_id}-{span.span_id}-01"
+
+    @staticmethod
+    def otlp_attribute(key, value):
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        return {"key": key, "value": typed}
+
+    @staticmethod
+    def otlp_payload(spans):
+        """Cuerpo ExportTraceServiceRequest de OTLP/JSON para una lista de tramos"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [Tracer.otlp_attribute("service.name", Tracer.SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "config.tracing"},
+                    "spans": [span.to_otlp() for span in spans],
+                }],
+            }]
+        }
+
+    @staticmethod
+    def _finish(span, end_ns=None):
+        if span is None:
+            return
+        span.end_ns = end_ns or time.time_ns()
+        exporter = Tracer._exporter
+        if exporter is None:
+            return
+        if isinstance(exporter, InMemoryExporter):
+            exporter.export([span])
+            return
+        try:
+            Tracer._queue.put_nowait(span)
+        except queue.Full:
+            # Con el colector caído se pierden tramos en lugar de frenar las peticiones
+            pass
+
+    @staticmethod
+    def _start_worker():
+        with Tracer._lock:
+            if Tracer._worker is None:
+                Tracer._worker = threading.Thread(target=Tracer._export_loop, name="trace-exporter", daemon=True)
+                Tracer._worker.start()
+
+    @staticmethod
+    def _export_loop():
+        while True:
+            batch = []
+            deadline = time.monotonic() + Tracer.FLUSH_INTERVAL
+            while len(batch) < Tracer.BATCH_SIZE:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(Tracer._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if not batch or Tracer._exporter is None:
+                continue
+            try:
+                Tracer._exporter.export(batch)
+            except Exception as e:
+                print(f"No se pudieron exportar {len(batch)} tramos: {e}")
@@ -19,6 +19,7 @@ from app.controllers.report_controller import ReportController
 from app.controllers.config_controller import ConfigController
 from app.controllers.documentation_controller import DocumentationController
 from app.controllers.chatbot_controller import ChatbotController
+from app.controllers.metrics_controller import MetricsController
 
 urlpatterns = [
     path("", DashboardController.index, name="dashboard"),
@@ -27,6 +28,11 @@ urlpatterns = [
         DashboardController.api_chart_data,
         name="api_chart_data",
     ),
+    path(
+        "api/dashboard/cache/",
+        DashboardController.api_cache_stats,
+        name="api_dashboard_cache",
+    ),
     path("login/", AuthController.login, name="login"),
     path("register/", AuthController.register, name="register"),
     path("logout/", AuthController.logout, name="logout"),
@@ -42,6 +48,11 @@ urlpatterns = [
         ProductController.delete,
         name="products_delete",
     ),
+    path(
+        "api/productos/<int:product_id>/ubicaciones/",
+        ProductController.api_locations,
+        name="api_product_locations",
+    ),
     path("categorias/", CategoryController.index, name="categories"),
     path("categorias/crear/", CategoryController.create, name="categories_create"),
     path(
@@ -92,6 +103,16 @@ urlpatterns = [
         WarehouseController.delete,
         name="warehouses_delete",
     ),
+    path(
+        "api/almacenes/ocupacion/",
+        WarehouseController.api_occupancy,
+        name="api_warehouses_occupancy",
+    ),
+    path(
+        "api/almacenes/<int:warehouse_id>/ocupacion/",
+        WarehouseController.api_occupancy,
+        name="api_warehouse_occupancy",
+    ),
     path("ventas/", SaleController.index, name="sales"),
     path("ventas/crear/", SaleController.create, name="sales_create"),
     path("ventas/<int:sale_id>/editar/", SaleController.edit, name="sales_edit"),
@@ -157,6 +178,11 @@ urlpatterns = [
         InventoryMovementController.index,
         name="inventory_movements",
     ),
+    path(
+        "api/movimientos-inventario/",
+        InventoryMovementController.api_index,
+        name="api_inventory_movements",
+    ),
     path(
         "movimientos-inventario/crear/",
         InventoryMovementController.create,
@@ -205,6 +231,11 @@ urlpatterns = [
         ConfigController.delete_user,
         name="config_delete_user",
     ),
+    path(
+        "configuracion/consultas-lentas/",
+        ConfigController.slow_queries,
+        name="config_slow_queries",
+    ),
     # Chatbot con IA
     # Vista principal del chatbot
     path("chatbot/", ChatbotController.index, name="chatbot_index"),
@@ -214,6 +245,12 @@ urlpatterns = [
         csrf_exempt(ChatbotController.send_message),
         name="chatbot_send_message",
     ),
+    # Enviar mensaje con respuesta en streaming (Server-Sent Events)
+    path(
+        "chatbot/send-message/stream/",
+        csrf_exempt(ChatbotController.send_message_stream),
+        name="chatbot_send_message_stream",
+    ),
     # Obtener insights rápidos
     path(
         "chatbot/get-insights/",
@@ -238,6 +275,14 @@ urlpatterns = [
         ChatbotController.get_history,
         name="chatbot_get_history",
     ),
+    # Métricas de las llamadas a Gemini
+    path(
+        "api/chatbot/metricas/",
+        ChatbotController.api_llm_metrics,
+        name="chatbot_llm_metrics",
+    ),
+    # Métricas por ruta en formato Prometheus
+    path("metrics", MetricsController.metrics, name="metrics"),
 ]
 
 # Servir archivos estáticos en desarrollo
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Verificación de planes de ejecución de las consultas críticas
+Ejecuta los métodos de los modelos que sirven el dashboard, los reportes y
+los listados, captura las consultas SELECT que emiten y corre EXPLAIN sobre
+cada una. Falla (código de salida 1) si alguna recorre completa una tabla
+grande sin ningún índice aplicable, que es lo que ocurre cuando un filtro
+envuelve la columna en una función (MONTH(fecha), YEAR(fecha), ...) o
+falta el índice, o si la recorre completa leyendo más de
+EXPLAIN_MAX_SCAN_ROWS filas aunque exista un índice que el optimizador
+descartó.
+"""
+
+import os
+import sys
+from datetime import date, timedelta
+
+from config.database import Database
+from app.models.sale import Sale
+from app.models.purchase import Purchase
+from app.models.report import Report
+from app.models.stock import Stock
+from app.models.inventory_movement import InventoryMovement
+
+# Tablas que crecen con el uso; en las de catálogo un recorrido completo es aceptable
+LARGE_TABLES = {
+    'ventas', 'compras', 'detalle_ventas', 'detalle_compras', 'movimientos_inventario',
+    'resumen_diario', 'resumen_mensual', 'stock_almacen',
+}
+
+# Filas a partir de las cuales un recorrido completo de una tabla grande falla aunque tenga índices
+MAX_SCAN_ROWS = int(os.getenv('EXPLAIN_MAX_SCAN_ROWS', 1000))
+
+
+def obtener_ids():
+    """Obtiene una venta y un producto existentes para parametrizar las consultas"""
+    venta = Database.execute_query("SELECT id FROM ventas ORDER BY id DESC LIMIT 1")
+    producto = Database.execute_query("SELECT id FROM productos ORDER BY id DESC LIMIT 1")
+    return (venta[0]['id'] if venta else 1), (producto[0]['id'] if producto else 1)
+
+
+def consultas_criticas(venta_id, producto_id):
+    """(descripción, función) de cada operación a verificar"""
+    hoy = date.today()
+    return [
+        ("Ventas del mes", Sale.total_ventas_mes),
+        ("Compras del mes", Purchase.total_compras_mes),
+        ("Resumen general de reportes", Report.resumen_general),
+        ("Ventas por mes del año", Report.ventas_por_mes),
+        ("Ventas por estado", Report.ventas_por_estado),
+        ("Líneas de una venta", lambda: Sale.get_details(venta_id)),
+        ("Aporte al stock de una venta", lambda: Stock.sale_contribution(venta_id)),
+        ("Movimientos de un producto en un rango de fechas", lambda: InventoryMovement.get_page(
+            filters={
+                'producto_id': producto_id,
+                'fecha_desde': hoy - timedelta(days=30),
+                'fecha_hasta': hoy,
+            }
+        )),
+    ]
+
+
+def capturar_consultas(funcion):
+    """Ejecuta funcion y retorna las consultas SELECT que emitió"""
+    capturadas = []
+    original = Database.execute_query
+
+    def registrar(query, params=None, fetch=True):
+        if query.lstrip().upper().startswith(('SELECT', '(SELECT')):
+            capturadas.append((query, params))
+        return original(query, params, fetch)
+
+    Database.execute_query = registrar
+    try:
+        funcion()
+    finally:
+        Database.execute_query = original
+    return capturadas
+
+
+def analizar(query, params):
+    """Corre EXPLAIN y retorna (filas del plan, recorridos completos que fallan)"""
+    plan = Database.execute_query("EXPLAIN " + query, params)
+    fallos = [
+        fila for fila in plan
+        if fila.get('type') == 'ALL'
+        and fila.get('table') in LARGE_TABLES
+        and (not fila.get('possible_keys') or int(fila.get('rows') or 0) > MAX_SCAN_ROWS)
+    ]
+    return plan, fallos
+
+
+def main():
+    venta_id, producto_id = obtener_ids()
+
+    print("=" * 60)
+    print("VERIFICACIÓN DE PLANES DE EJECUCIÓN (EXPLAIN)")
+    print("=" * 60)
+
+    total_fallos = 0
+    for descripcion, funcion in consultas_criticas(venta_id, producto_id):
+        print(f"\n{descripcion}")
+        for query, params in capturar_consultas(funcion):
+            plan, fallos = analizar(query, params)
+            for fila in plan:
+                marca = "✗" if fila in fallos else " "
+                print(
+                    f"  {marca} {str(fila.get('table')):<24} type={str(fila.get('type')):<7} "
+                    f"key={fila.get('key')} rows={fila.get('rows')}"
+                )
+            total_fallos += len(fallos)
+
+    print("\n" + "=" * 60)
+    if total_fallos:
+        print(
+            f"✗ {total_fallos} recorrido(s) completo(s) de tablas grandes sin índice "
+            f"o de más de {MAX_SCAN_ROWS} filas"
+        )
+        return 1
+    print("✓ Ninguna consulta crítica recorre completa una tabla grande")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,11 +15,16 @@ def init_chatbot():
     
     try:
         # Crear tabla de mensajes del chatbot
-        print("\n[1/2] Creando tabla chatbot_messages...")
+        print("\n[1/3] Creando tabla chatbot_messages...")
         ChatbotMessage.create_table()
         print("✓ Tabla chatbot_messages creada correctamente")
         
-        print("\n[2/2] Verificando dependencias...")
+        print("\n[2/3] Creando tabla chatbot_summaries...")
+        ChatbotMessage.create_summary_table()
+        ChatbotMessage.create_indexes()
+        print("✓ Tabla chatbot_summaries creada correctamente")
+        
+        print("\n[3/3] Verificando dependencias...")
         try:
             import google.generativeai as genai
             print("google-generativeai instalado correctamente")
@@ -35,6 +35,15 @@ function Build   { iex "$DOCKER_COMPOSE build" }
 function StopC   { iex "$DOCKER_COMPOSE stop" }
 function Shell   { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker bash" }
 function InitChatbot { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python init_chatbot.py" }
+function Migrate   { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python migrate.py" }
+function Benchmark { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python benchmark_invoices.py" }
+function ReconcileStock { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python reconcile_stock.py --apply" }
+function CheckStock     { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python reconcile_stock.py" }
+function BackfillRollups { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python backfill_rollups.py" }
+function ExplainCheck    { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python explain_check.py" }
+function SandboxCheck    { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python sandbox_check.py" }
+function TraceCheck      { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python trace_check.py" }
+function SeedCheck       { iex "$DOCKER_COMPOSE exec --user jonathanA server_docker python seed_check.py" }
 
 function Clean-Docker {
     docker rmi -f $(docker images -q) 2>$null
@@ -64,6 +73,15 @@ switch ($command) {
     "stop"     { StopC }
     "shell"    { Shell }
     "init-chatbot" { InitChatbot }
+    "migrate"      { Migrate }
+    "benchmark"    { Benchmark }
+    "check-stock"     { CheckStock }
+    "reconcile-stock" { ReconcileStock }
+    "backfill-rollups" { BackfillRollups }
+    "explain-check"    { ExplainCheck }
+    "sandbox-check"    { SandboxCheck }
+    "trace-check"      { TraceCheck }
+    "seed-check"       { SeedCheck }
 
     "clean-docker" { Clean-Docker }
 
@@ -71,7 +89,8 @@ switch ($command) {
         Write-Host "Comandos disponibles:"
         Write-Host "  init-app"
         Write-Host "  up, down, restart, ps, logs, build, stop"
-        Write-Host "  shell, init-chatbot"
+        Write-Host "  shell, init-chatbot, migrate, benchmark"
+        Write-Host "  check-stock, reconcile-stock, backfill-rollups, explain-check, sandbox-check, trace-check, seed-check"
         Write-Host "  copy-env, create-symlink, print-urls"
         Write-Host "  clean-docker"
     }
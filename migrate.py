@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Script de migraciones de la base de datos
+Aplica sobre una base de datos existente los índices y tablas auxiliares
+que init.sql ya incluye en instalaciones nuevas. Es idempotente: cada paso
+comprueba si el cambio ya existe antes de aplicarlo.
+"""
+
+import sys
+
+from app.models.inventory_movement import InventoryMovement
+from app.models.sale import Sale
+from app.models.purchase import Purchase
+from app.models.stock import Stock
+from app.models.rollup import Rollup
+from app.models.chatbot_message import ChatbotMessage
+
+# Pasos de migración en orden: (descripción, función)
+STEPS = [
+    ("Índices del ledger de movimientos de inventario", InventoryMovement.create_indexes),
+    ("Tabla de saldos de stock por almacén", Stock.create_table),
+    ("Saldos iniciales de stock como ajustes del ledger", Stock.initialize),
+    ("Tablas de resúmenes diarios y mensuales de ventas y compras", Rollup.create_tables),
+    ("Índices por estado y fecha de ventas y líneas de venta", Sale.create_indexes),
+    ("Índices por fecha de compras y líneas de compra", Purchase.create_indexes),
+    ("Índice del historial del chatbot por usuario", ChatbotMessage.create_indexes),
+    ("Tabla de resúmenes de conversación del chatbot", ChatbotMessage.create_summary_table),
+]
+
+
+def migrate():
+    """Ejecuta todos los pasos de migración"""
+    print("=" * 60)
+    print("MIGRACIONES DE BASE DE DATOS")
+    print("=" * 60)
+
+    total = len(STEPS)
+    for i, (description, step) in enumerate(STEPS, 1):
+        print(f"\n[{i}/{total}] {description}...")
+        try:
+            result = step()
+        except Exception as e:
+            print(f"✗ ERROR: {str(e)}")
+            return False
+
+        if isinstance(result, list):
+            if result:
+                for name in result:
+                    print(f"  + {name}")
+            else:
+                print("  (sin cambios)")
+        print("✓ Completado")
+
+    print("\n" + "=" * 60)
+    print("✓ MIGRACIONES APLICADAS CORRECTAMENTE")
+    print("=" * 60)
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if migrate() else 1)
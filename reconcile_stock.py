@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Reconciliación de stock
+Compara productos.stock_actual y los saldos de stock_almacen con el stock que
+resulta de recorrer el ledger completo (movimientos de inventario, ventas y
+compras completadas; los movimientos que solo documentan una venta o compra
+no se cuentan dos veces). Por defecto solo informa las diferencias; con --apply
+reconstruye los saldos desde el ledger.
+"""
+
+import sys
+
+from app.models.stock import Stock
+
+
+def main(argv):
+    apply = '--apply' in argv
+
+    print("=" * 60)
+    print("RECONCILIACIÓN DE STOCK")
+    print("=" * 60)
+
+    discrepancies = Stock.find_discrepancies()
+    if not discrepancies:
+        print("\n✓ El stock coincide con el ledger")
+        return 0
+
+    print(f"\n{'ID':>6} {'Producto':<30} {'Actual':>8} {'Ledger':>8} {'Saldos':>8}")
+    for row in discrepancies:
+        print(
+            f"{row['producto_id']:>6} {str(row['nombre'])[:30]:<30} "
+            f"{row['stock_actual']:>8} {int(row['stock_ledger']):>8} {int(row['stock_saldos']):>8}"
+        )
+    print(f"\n{len(discrepancies)} producto(s) con diferencias")
+
+    if not apply:
+        print("Ejecuta con --apply para reconstruir los saldos desde el ledger")
+        return 1
+
+    Stock.rebuild()
+    print("✓ Saldos reconstruidos desde el ledger")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Verificación de las reglas del sandbox SQL del chatbot
+Valida (sin conectarse a la base de datos) consultas que deben aceptarse y
+consultas que deben rechazarse, entre ellas las que intentan leer tablas
+fuera de la lista permitida. Falla (código de salida 1) si alguna consulta
+no obtiene el resultado esperado.
+"""
+
+import sys
+
+from app.services.sql_sandbox import SqlSandbox
+
+PERMITIDAS = [
+    "SELECT nombre, stock_actual FROM productos WHERE stock_actual < 10",
+    "SELECT p.nombre FROM productos p JOIN categorias c ON c.id = p.categoria_id",
+    "SELECT * FROM (SELECT id, total FROM ventas) v",
+    "SELECT * FROM productos WHERE id IN (SELECT producto_id FROM detalle_ventas)",
+    "WITH t AS (SELECT producto_id FROM detalle_ventas) SELECT * FROM t",
+]
+
+RECHAZADAS = [
+    "SELECT * FROM usuarios",
+    "SELECT * FROM (usuarios)",
+    "SELECT * FROM ((usuarios))",
+    "SELECT * FROM productos LEFT JOIN (usuarios) ON 1",
+    "SELECT * FROM productos, (usuarios)",
+    "SELECT * FROM (SELECT * FROM usuarios) u",
+    "SELECT * FROM productos; DELETE FROM productos",
+    "SELECT SLEEP(10)",
+    "UPDATE productos SET stock_actual = 0",
+]
+
+
+def main():
+    fallos = 0
+    for query in PERMITIDAS:
+        try:
+            SqlSandbox.bound(SqlSandbox.validate(query))
+            print(f"  ✓ aceptada   {query}")
+        except ValueError as e:
+            fallos += 1
+            print(f"  ✗ rechazada  {query} ({e})")
+
+    for query in RECHAZADAS:
+        try:
+            SqlSandbox.validate(query)
+            fallos += 1
+            print(f"  ✗ aceptada   {query}")
+        except ValueError as e:
+            print(f"  ✓ rechazada  {query} ({e})")
+
+    if fallos:
+        print(f"\n✗ {fallos} consulta(s) con un resultado distinto del esperado")
+        return 1
+    print("\n✓ El sandbox acepta y rechaza lo esperado")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
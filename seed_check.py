@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Verificación de los datos iniciales
+Pensada para correr sobre una base recién creada con init.sql, seed_data.sql
+y zz_rollups.sql (o sobre una base migrada con migrate.py): el stock de los
+productos y los saldos por almacén deben coincidir con el ledger, es decir,
+reconcile_stock.py no debe encontrar diferencias, y ningún almacén debe
+superar su capacidad (si no, toda entrada en él se rechaza). Falla (código
+de salida 1) si alguna comprobación no se cumple.
+"""
+
+import sys
+
+from config.database import Database
+from app.models.stock import Stock
+
+
+def comprobar_ledger():
+    """Productos cuyo stock no coincide con el ledger"""
+    fallos = []
+    for row in Stock.find_discrepancies() or []:
+        fallos.append(
+            f"producto {row['producto_id']} ({row['nombre']}): actual {row['stock_actual']}, "
+            f"ledger {int(row['stock_ledger'])}, saldos {int(row['stock_saldos'])}"
+        )
+    return fallos
+
+
+def comprobar_saldos_negativos():
+    """Saldos negativos por almacén"""
+    rows = Database.execute_query(
+        "SELECT almacen_id, producto_id, cantidad FROM stock_almacen WHERE cantidad < 0"
+    ) or []
+    return [
+        f"almacén {row['almacen_id']}, producto {row['producto_id']}: saldo {row['cantidad']}"
+        for row in rows
+    ]
+
+
+def comprobar_capacidad():
+    """Almacenes cuyo stock supera la capacidad"""
+    return [
+        f"{row['nombre']}: ocupado {row['ocupado']:,} de {int(row['capacidad']):,}"
+        for row in Stock.warehouse_occupancy()
+        if row['capacidad'] and row['ocupado'] > int(row['capacidad'])
+    ]
+
+
+COMPROBACIONES = [
+    ("El stock coincide con el ledger (reconcile_stock.py sin diferencias)", comprobar_ledger),
+    ("Ningún almacén tiene saldos negativos", comprobar_saldos_negativos),
+    ("Ningún almacén supera su capacidad", comprobar_capacidad),
+]
+
+
+def main():
+    print("=" * 60)
+    print("VERIFICACIÓN DE LOS DATOS INICIALES")
+    print("=" * 60)
+
+    total_fallos = 0
+    for descripcion, comprobacion in COMPROBACIONES:
+        fallos = comprobacion()
+        print(f"\n{'✓' if not fallos else '✗'} {descripcion}")
+        for fallo in fallos:
+            print(f"    {fallo}")
+        total_fallos += len(fallos)
+
+    print("\n" + "=" * 60)
+    if total_fallos:
+        print(f"✗ {total_fallos} problema(s) en los datos iniciales")
+        return 1
+    print("✓ Los datos iniciales son consistentes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
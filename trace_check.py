@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Verificación del trazado de las respuestas en streaming
+Usa InMemoryExporter en lugar del colector y simula lo que hace
+TracingMiddleware con la respuesta SSE del chatbot: el cuerpo se genera
+después de soltar la traza del hilo. Comprueba que los tramos generados
+durante el stream cuelgan de la traza de la petición y que el tramo raíz
+se cierra al terminar el stream (o al cortarse la conexión). Falla (código
+de salida 1) si algo no se cumple.
+"""
+
+import sys
+
+from config.tracing import InMemoryExporter, Span, Tracer
+
+
+def respuesta_sse():
+    """Imita AIService.stream_query: contexto, llamada al modelo y fragmentos"""
+    with Tracer.span("AIService.stream_query"):
+        Tracer.add_span("AIService._build_chat_request", 0.01)
+        with Tracer.span("GeminiClient.generate_stream", Span.CLIENT):
+            for texto in ("Hola", ", ", "mundo"):
+                yield texto
+            Tracer.add_span("gemini.chat_stream", 0.2, kind=Span.CLIENT)
+
+
+def peticion(exporter):
+    """Traza de una petición cuya respuesta se envía en streaming"""
+    exporter.clear()
+    root = Tracer.start_trace("POST /chatbot/send-message/stream/")
+    with Tracer.span("ChatbotController.send_message_stream"):
+        pass
+    cuerpo = Tracer.stream(root, respuesta_sse())
+    Tracer.detach()
+    return root, cuerpo
+
+
+def main():
+    exporter = InMemoryExporter()
+    Tracer.configure(exporter)
+    fallos = []
+
+    def comprobar(condicion, descripcion):
+        print(f"  {'✓' if condicion else '✗'} {descripcion}")
+        if not condicion:
+            fallos.append(descripcion)
+
+    print("Stream consumido completo:")
+    root, cuerpo = peticion(exporter)
+    comprobar(Tracer.current() is None, "el hilo queda libre al retornar el middleware")
+    comprobar(root.end_ns is None, "el tramo raíz sigue abierto antes de enviar el cuerpo")
+    fragmentos = []
+    for fragmento in cuerpo:
+        fragmentos.append(fragmento)
+        comprobar(Tracer.current() is None, f"el hilo queda libre entre fragmentos ({fragmento!r})")
+    comprobar("".join(fragmentos) == "Hola, mundo", "el cuerpo llega completo")
+    comprobar(root.end_ns is not None, "el tramo raíz se cierra al terminar el stream")
+    nombres = ("AIService.stream_query", "AIService._build_chat_request",
+               "GeminiClient.generate_stream", "gemini.chat_stream")
+    for nombre in nombres:
+        tramos = exporter.find(nombre)
+        comprobar(len(tramos) == 1 and tramos[0].trace_id == root.trace_id,
+                  f"{nombre} pertenece a la traza de la petición")
+    stream_query = exporter.find("AIService.stream_query")
+    generate = exporter.find("GeminiClient.generate_stream")
+    gemini = exporter.find("gemini.chat_stream")
+    if stream_query and generate and gemini:
+        comprobar(stream_query[0].parent_id == root.span_id, "stream_query cuelga del tramo raíz")
+        comprobar(generate[0].parent_id == stream_query[0].span_id, "generate_stream cuelga de stream_query")
+        comprobar(gemini[0].parent_id == generate[0].span_id, "la llamada a Gemini cuelga de generate_stream")
+        comprobar(root.end_ns >= stream_query[0].end_ns, "el tramo raíz termina después del stream")
+
+    print("Conexión cortada a mitad del stream:")
+    root, cuerpo = peticion(exporter)
+    next(cuerpo)
+    cuerpo.close()
+    comprobar(root.end_ns is not None, "el tramo raíz se cierra al cerrar el stream")
+    comprobar(len(exporter.find("GeminiClient.generate_stream")) == 1, "los tramos abiertos del stream se cierran")
+    comprobar(Tracer.current() is None, "el hilo queda libre tras el cierre")
+
+    Tracer.configure(None)
+    if fallos:
+        print(f"\n✗ {len(fallos)} comprobaciones fallaron")
+        sys.exit(1)
+    print("\n✓ El trazado de las respuestas en streaming funciona")
+
+
+if __name__ == "__main__":
+    main()